@@ -2,14 +2,28 @@ import os
 from typing import Optional, Union
 from fastapi import Request, HTTPException, Security, status, WebSocket
 from fastapi.security import APIKeyHeader
+from starlette.requests import HTTPConnection
 from .logger import logger
 
 # Configuration
 API_KEY_NAME = "X-API-Key"
 BRIDGE_API_KEY = os.getenv("BRIDGE_API_KEY")
 
+# API_KEY_PRIORITIES: Default admission priority per API key, e.g. "key-a:10,key-b:-5". Unlisted keys get 0.
+API_KEY_PRIORITIES = {
+    key.strip(): int(priority)
+    for key, _, priority in (item.rpartition(":") for item in os.getenv("API_KEY_PRIORITIES", "").split(",") if ":" in item)
+}
+
 api_key_header_scheme = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
+def api_key_from(connection: HTTPConnection) -> Optional[str]:
+    """The API key a request or WebSocket presented, from the header or the `api_key` query parameter."""
+    return connection.headers.get(API_KEY_NAME) or connection.query_params.get("api_key")
+
+def priority_for_api_key(api_key: Optional[str]) -> int:
+    return API_KEY_PRIORITIES.get(api_key, 0) if api_key else 0
+
 async def verify_api_key(
     request: Request,
     api_key_header: Optional[str] = Security(api_key_header_scheme),
@@ -1,8 +1,27 @@
 import asyncio
-from typing import Any, Dict, List, AsyncGenerator, Callable, Literal, Union, Optional
-from pydantic import BaseModel, Field, validate_call
+from abc import ABC, abstractmethod
+import functools
+import hashlib
+import heapq
+import inspect
+import itertools
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, AsyncGenerator, Callable, Literal, Tuple, Union, Optional, TYPE_CHECKING
+from pydantic import BaseModel, ConfigDict, Field, validate_call
+from pydantic_core import to_json
 from .logger import logger
-from .metrics import ACTIVE_TASKS, STALE_TASKS_CLEANED_TOTAL
+from .metrics import STALE_TASKS_CLEANED_TOTAL, SINGLE_FLIGHT_JOINS_TOTAL
+from .scheduler import scheduler
+from .cache import is_replay
+from .validation import args_model, parameters_schema, validate_args
+
+if TYPE_CHECKING:
+    from .stream import TaskStream, TaskAlias
+    from .redis_registry import RemoteTaskStream
+    from .relay import RelayTaskStream
 
 class ProgressPayload(BaseModel):
     """
@@ -40,9 +59,9 @@ class ProgressEvent(BaseModel):
         description="The unique identifier for this specific task execution session.",
         examples=["550e8400-e29b-41d4-a716-446655440000"]
     )
-    type: Literal["progress", "result", "error", "input_request", "task_started"] = Field(
+    type: Literal["progress", "result", "error", "input_request", "task_started", "queued"] = Field(
         ..., 
-        description="The nature of the event being streamed. 'progress' indicates an interim update, 'result' is the final output, 'error' signifies a failure, and 'input_request' prompts the user for information.",
+        description="The nature of the event being streamed. 'progress' indicates an interim update, 'result' is the final output, 'error' signifies a failure, 'input_request' prompts the user for information, and 'queued' reports the task's place in the admission queue before it starts.",
         examples=["progress", "result", "error", "input_request"]
     )
     payload: Union[ProgressPayload, Dict[str, Any]] = Field(
@@ -50,6 +69,68 @@ class ProgressEvent(BaseModel):
         description="The actual data payload. Contains a ProgressPayload object for 'progress' types, or the final result/error details.",
     )
 
+class ToolOptions(BaseModel):
+    """
+    Per-tool execution options declared through `progress_tool(...)`.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    coalesce: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Time window (seconds) in which consecutive progress updates collapse to the latest one. "
+                    "Results, errors and input requests are always delivered immediately.",
+        examples=[0.25]
+    )
+    executor: Optional[Literal["async", "thread", "process", "worker"]] = Field(
+        None,
+        description="Where the tool body runs. Defaults to 'thread' for synchronous generator functions and 'async' "
+                    "otherwise. 'thread' runs a blocking generator in the shared tool thread pool. 'process' runs the "
+                    "tool in the shared worker process pool so CPU-bound work doesn't block the event loop; the tool "
+                    "must be importable by module and name, and its arguments and yielded items picklable. 'worker' "
+                    "queues the run for the worker tier behind the broker; arguments and items must be JSON-serializable.",
+        examples=["process"]
+    )
+    max_concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        description="The most tasks of this tool running at once. Further starts wait in the admission queue.",
+        examples=[2]
+    )
+    cache_ttl: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Enables the result cache: a successful run is reused for this many seconds by starts with the "
+                    "same (validated, canonicalized) arguments. Only for tools whose result depends on nothing else.",
+        examples=[300]
+    )
+    cache_size: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Most cached results kept for this tool (least recently used are evicted first). Defaults to 128.",
+        examples=[64]
+    )
+    cache_replay: Optional[float] = Field(
+        None,
+        gt=0,
+        description="On a cache hit, also replay the recorded progress updates, this many times faster than they "
+                    "originally happened. By default a hit delivers only the result.",
+        examples=[10]
+    )
+    max_threads: Optional[int] = Field(
+        None,
+        ge=1,
+        description="For 'thread' tools: the most runs of this tool holding a pool thread at once. Further runs wait.",
+        examples=[4]
+    )
+    single_flight: bool = Field(
+        False,
+        description="Starts with the same (validated, canonicalized) arguments as a run of this tool still in flight "
+                    "attach to that run instead of starting another one. Each requester keeps its own call_id; the "
+                    "run is only cancelled once every requester has stopped or left.",
+        examples=[True]
+    )
+
 class InputManager:
     def __init__(self):
         self._pending_inputs: Dict[str, asyncio.Future] = {}
@@ -75,26 +156,86 @@ class InputManager:
 
 input_manager = InputManager()
 
-class ToolRegistry:
+@dataclass(slots=True)
+class TaskRecord:
+    """
+    A task held by the registry, keyed by call_id. `gen` is None for tasks running on another instance.
+    `owner` is the API key the task was started with, if any.
+    """
+    gen: Optional[AsyncGenerator]
+    stream: Union["TaskStream", "TaskAlias", "RemoteTaskStream", "RelayTaskStream"]
+    tool_name: str
+    created_at: float = field(default_factory=time.time)
+    consumed: bool = False
+    owner: Optional[str] = None
+
+class BaseRegistry(ABC):
+    """
+    Tool registration plus the task store interface shared by all registry backends.
+    Backends decide where task state lives; endpoints only use the methods below.
+    """
     def __init__(self):
         self._tools: Dict[str, Callable] = {}
-        # Stores call_id -> {"gen": gen, "tool_name": str, "created_at": timestamp, "consumed": bool}
-        self._active_tasks: Dict[str, Dict[str, Any]] = {}
-        self._lock = asyncio.Lock()
+        self._tool_options: Dict[str, ToolOptions] = {}
+        # Argument models built at registration, for canonical keys and the published schemas
+        self._arg_models: Dict[str, Optional[type]] = {}
+        # Tools keyed by their arguments (cache, single-flight): start(key, values) with validated arguments
+        self._keyed_tools: Dict[str, Callable[[str, Dict[str, Any]], AsyncGenerator]] = {}
+        self._tool_docs: Dict[str, Optional[str]] = {}
+        # (schemas, JSON body, ETag) of the tool schema document, rebuilt after a registration
+        self._schema_document: Optional[Tuple[List[Dict[str, Any]], bytes, str]] = None
 
-    def register(self, name: Optional[str] = None):
-        import inspect
+    def register(self, name: Optional[str] = None, **options):
+        tool_options = ToolOptions(**options)
         def decorator(func: Callable):
             tool_name = name or func.__name__
             
-            # Verify it's an async generator
-            if not inspect.isasyncgenfunction(func):
+            executor = tool_options.executor
+            if executor is None:
+                executor = "thread" if inspect.isgeneratorfunction(func) else "async"
+            
+            # Verify it's a generator the chosen executor can drive
+            if executor == "thread" and not inspect.isgeneratorfunction(func):
+                raise TypeError(f"Tool {tool_name} uses executor='thread' but is not a generator function")
+            drivable = inspect.isasyncgenfunction(func) or (executor in ("process", "worker") and inspect.isgeneratorfunction(func))
+            if executor != "thread" and not drivable:
                 logger.warning(f"Tool {tool_name} is not an async generator function. It might fail during execution.")
             
-            # Apply pydantic validation to the tool
-            validated_func = validate_call(func)
+            # The argument model backs cache and single-flight keys and the published schema. Keyed tools
+            # validate against it once, while making their key; every other call goes through validate_call.
+            model = args_model(func)
+            keyed = bool(tool_options.cache_ttl or tool_options.single_flight)
+            validate = not (keyed and model is not None)
+            if executor == "process":
+                from .executors import process_executor
+                validated_func = process_executor.wrap(func, validate=validate)
+            elif executor == "worker":
+                from .executors import worker_executor
+                validated_func = worker_executor.wrap(func, tool_name, validate=validate)
+            elif executor == "thread":
+                from .executors import thread_executor
+                validated_func = thread_executor.wrap(func, tool_name, max_threads=tool_options.max_threads, validate=validate)
+            else:
+                validated_func = validate_call(func) if validate else func
+            if keyed:
+                if tool_options.cache_ttl:
+                    from .cache import result_cache
+                    run = result_cache.wrap(
+                        validated_func, tool_name,
+                        ttl=tool_options.cache_ttl, max_entries=tool_options.cache_size, replay=tool_options.cache_replay
+                    )
+                else:
+                    run = lambda key, values, runner=validated_func: runner(**values)
+                self._keyed_tools[tool_name] = run
+                validated_func = _keyed_start(func, model, run)
+            else:
+                self._keyed_tools.pop(tool_name, None)
             # No lock needed for simple dict insertion during startup
             self._tools[tool_name] = validated_func
+            self._tool_options[tool_name] = tool_options
+            self._arg_models[tool_name] = model
+            self._tool_docs[tool_name] = inspect.getdoc(func)
+            self._schema_document = None
             logger.info(f"Tool registered: {tool_name}", extra={"tool_name": tool_name})
             return func
         return decorator
@@ -105,9 +246,198 @@ class ToolRegistry:
     def get_tool(self, name: str):
         return self._tools.get(name)
 
-    async def store_task(self, call_id: str, gen: AsyncGenerator, tool_name: str):
-        import inspect
-        import time
+    def get_tool_options(self, name: str) -> ToolOptions:
+        return self._tool_options.get(name) or ToolOptions()
+
+    def tool_schemas(self) -> Tuple[List[Dict[str, Any]], bytes, str]:
+        """
+        `{"name", "description", "parameters"}` for every tool, where `parameters` is the JSON Schema of its
+        arguments, plus the same list encoded as a `{"tools": [...]}` JSON document and that document's ETag.
+        Built on first use after a registration and served as is afterwards.
+        """
+        if self._schema_document is None:
+            tools = [
+                {
+                    "name": name,
+                    "description": self._tool_docs.get(name),
+                    "parameters": parameters_schema(self._arg_models.get(name)),
+                }
+                for name in self._tools
+            ]
+            body = to_json({"tools": tools})
+            self._schema_document = (tools, body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+        return self._schema_document
+
+    def new_call_id(self) -> str:
+        """A fresh call_id for a task started through this registry."""
+        return str(uuid.uuid4())
+
+    async def start_task(
+        self, call_id: str, tool_name: str, args: Dict[str, Any], priority: int = 0, owner: Optional[str] = None
+    ) -> Union["TaskStream", "TaskAlias"]:
+        """
+        Calls the tool with `args` and stores the task under `call_id` (see `store_task`), recording
+        `owner` (the API key it was started with). Raises for invalid arguments.
+        Single-flight backends may attach the task to an identical run instead.
+        """
+        gen = self.get_tool(tool_name)(**args)
+        return await self.store_task(call_id, gen, tool_name, priority=priority, owner=owner)
+
+    async def start_tasks(
+        self, entries: List[Tuple[str, str, Dict[str, Any], int]], owner: Optional[str] = None
+    ) -> List[Union["TaskStream", "TaskAlias", Exception]]:
+        """
+        Starts many tasks given as (call_id, tool_name, args, priority) in one registry operation.
+        Returns each task's stream in order, or the exception that kept it from starting.
+        """
+        results = []
+        for call_id, tool_name, args, priority in entries:
+            try:
+                results.append(await self.start_task(call_id, tool_name, args, priority=priority, owner=owner))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    @abstractmethod
+    def list_tasks(self) -> List[Tuple[str, TaskRecord]]:
+        """The tasks whose producers run in this process, as (call_id, record) pairs."""
+
+    @abstractmethod
+    def watch(self, callback: Callable[[str, TaskRecord], None]) -> Callable[[], None]:
+        """Calls `callback(call_id, record)` for every task started through `start_task` from now on. Returns the unwatch function."""
+
+    @abstractmethod
+    async def store_task(
+        self, call_id: str, gen: AsyncGenerator, tool_name: str, priority: int = 0, owner: Optional[str] = None
+    ) -> "TaskStream":
+        """
+        Stores the task, recording `owner`, and starts its producer. Returns the running TaskStream.
+        The tool body starts once the admission scheduler lets it; `priority` orders it in the queue.
+        """
+
+    @abstractmethod
+    async def get_task(self, call_id: str) -> Optional[TaskRecord]:
+        """Retrieves the task record and marks it as consumed."""
+
+    @abstractmethod
+    async def mark_consumed(self, call_id: str):
+        """Marks a task as consumed without retrieving it."""
+
+    @abstractmethod
+    async def get_task_no_consume(self, call_id: str) -> Optional[TaskRecord]:
+        """Retrieves the task record without marking it as consumed."""
+
+    @abstractmethod
+    async def remove_task(self, call_id: str):
+        """Removes the task, cancelling its producer if still running."""
+
+    async def remove_tasks(self, call_ids: List[str]) -> List[str]:
+        """Removes many tasks like `remove_task`. Returns the call_ids that were found."""
+        removed = []
+        for call_id in call_ids:
+            if await self.get_task_no_consume(call_id):
+                await self.remove_task(call_id)
+                removed.append(call_id)
+        return removed
+
+    async def provide_input(self, call_id: str, value: Any) -> bool:
+        """
+        Answers the input request of task `call_id`, here or on its worker. A single-flight alias answers
+        for the run it shares.
+        Returns False if no task is waiting for input under that call_id.
+        """
+        record = await self.get_task_no_consume(call_id)
+        run_call_id = record.stream.run_call_id if record else call_id
+        if await input_manager.provide_input(run_call_id, value):
+            return True
+        # Tools on the worker tier wait for input in their worker process
+        from .executors import worker_executor
+        return await worker_executor.provide_input(run_call_id, value)
+
+    @abstractmethod
+    async def cleanup_tasks(self):
+        """Stops all producers owned by this process."""
+
+    @abstractmethod
+    async def cleanup_stale_tasks(self, max_age_seconds: float):
+        """Closes tasks that were never consumed within max_age_seconds."""
+
+    async def start(self):
+        """Acquires backend resources on startup."""
+
+    async def close(self):
+        """Releases backend resources on shutdown."""
+
+class InMemoryRegistry(BaseRegistry):
+    """Keeps every task in this process. Tasks are only reachable through the instance that started them."""
+    def __init__(self):
+        super().__init__()
+        # call_id -> TaskRecord. All access happens on the event loop and single-key operations never
+        # await, so each one is atomic without a lock and concurrent starts don't serialize on one another.
+        self._active_tasks: Dict[str, TaskRecord] = {}
+        # Min-heap of (created_at, tiebreak, call_id, record) so stale cleanup only visits tasks that are due.
+        # Entries for tasks that were consumed or removed in the meantime are skipped when they surface.
+        self._expiry: List[Tuple[float, int, str, TaskRecord]] = []
+        self._expiry_seq = itertools.count()
+        # Admission control shared by every registry in the process; tests swap in their own
+        self.scheduler = scheduler
+        # (tool_name, canonical args) -> the in-flight run of a single-flight tool
+        self._in_flight: Dict[Tuple[str, str], "TaskStream"] = {}
+        self._watchers: List[Callable[[str, TaskRecord], None]] = []
+
+    async def start_task(self, call_id: str, tool_name: str, args: Dict[str, Any], priority: int = 0, owner: Optional[str] = None):
+        """
+        Starts the task like BaseRegistry.start_task. For single-flight tools, a start whose canonical
+        arguments match a run still in flight attaches to it under its own call_id instead.
+        """
+        if self.get_tool_options(tool_name).single_flight:
+            stream = await self._start_single_flight(call_id, tool_name, args, priority, owner)
+        else:
+            stream = await super().start_task(call_id, tool_name, args, priority=priority, owner=owner)
+        record = self._active_tasks[call_id]
+        for watcher in list(self._watchers):
+            watcher(call_id, record)
+        return stream
+
+    def list_tasks(self) -> List[Tuple[str, TaskRecord]]:
+        return list(self._active_tasks.items())
+
+    def watch(self, callback: Callable[[str, TaskRecord], None]) -> Callable[[], None]:
+        self._watchers.append(callback)
+        return lambda: self._watchers.remove(callback) if callback in self._watchers else None
+
+    async def _start_single_flight(
+        self, call_id: str, tool_name: str, args: Dict[str, Any], priority: int, owner: Optional[str]
+    ) -> "TaskAlias":
+        values, canonical = validate_args(self._arg_models.get(tool_name), args)
+        key = (tool_name, canonical)
+        shared = self._in_flight.get(key)
+        # A run whose last requester left is still closing its generator; it will never yield a result
+        if shared is not None and shared.joinable:
+            SINGLE_FLIGHT_JOINS_TOTAL.labels(tool_name=tool_name).inc()
+            logger.info(f"Task {call_id} joined in-flight task {shared.call_id}", extra={"call_id": call_id, "tool_name": tool_name})
+            return self._store_alias(call_id, shared, owner)
+        # Started with the values validated for the key, so they aren't validated again
+        stream = await self.store_task(call_id, self._keyed_tools[tool_name](canonical, values), tool_name, priority=priority, owner=owner)
+        self._in_flight[key] = stream
+        stream.task.add_done_callback(lambda _: self._in_flight.pop(key) if self._in_flight.get(key) is stream else None)
+        return self._store_alias(call_id, stream, owner)
+
+    def _store_alias(self, call_id: str, shared: "TaskStream", owner: Optional[str]) -> "TaskAlias":
+        from .stream import TaskAlias
+        alias = TaskAlias(shared, call_id)
+        record = self._active_tasks.get(call_id)
+        if record is not None and record.stream is shared:
+            # The requester that started the run holds an alias too, so it can leave without ending it for the others
+            record.stream = alias
+            return alias
+        record = TaskRecord(gen=shared.gen, stream=alias, tool_name=shared.tool_name, owner=owner)
+        self._active_tasks[call_id] = record
+        heapq.heappush(self._expiry, (record.created_at, next(self._expiry_seq), call_id, record))
+        return alias
+
+    async def store_task(self, call_id: str, gen: AsyncGenerator, tool_name: str, priority: int = 0, owner: Optional[str] = None):
+        """Stores the task and starts its producer. Returns the running TaskStream."""
         # Final safety check: ensure gen is actually an async generator
         if not inspect.isasyncgen(gen):
             # If it's a coroutine, we MUST await it or close it to avoid RuntimeWarning
@@ -119,98 +449,130 @@ class ToolRegistry:
                     pass
             raise TypeError(f"Tool {tool_name} did not return an async generator. Got {type(gen)}")
 
-        async with self._lock:
-            self._active_tasks[call_id] = {
-                "gen": gen,
-                "tool_name": tool_name,
-                "created_at": time.time(),
-                "consumed": False
-            }
-            ACTIVE_TASKS.labels(tool_name=tool_name).inc()
+        stream = self._create_stream(call_id, gen, tool_name, priority)
+        record = TaskRecord(gen=gen, stream=stream, tool_name=tool_name, owner=owner)
+        self._active_tasks[call_id] = record
+        heapq.heappush(self._expiry, (record.created_at, next(self._expiry_seq), call_id, record))
+        stream.start()
         logger.debug(f"Task stored in registry: {call_id}", extra={"call_id": call_id, "tool_name": tool_name})
+        return stream
 
-    async def get_task(self, call_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieves the task data and marks it as consumed."""
-        async with self._lock:
-            task_data = self._active_tasks.get(call_id)
-            if task_data and not task_data["consumed"]:
-                task_data["consumed"] = True
-                return task_data
-            return None
+    def _create_stream(self, call_id: str, gen: AsyncGenerator, tool_name: str, priority: int = 0) -> "TaskStream":
+        from .stream import TaskStream
+        options = self.get_tool_options(tool_name)
+        # Cache hits only replay a recorded run, so they don't wait for (or take) an execution slot
+        admission = None if is_replay(gen) else self.scheduler.ticket(tool_name, priority=priority, limit=options.max_concurrency)
+        return TaskStream(call_id, tool_name, gen, coalesce=options.coalesce, admission=admission)
+
+    async def get_task(self, call_id: str) -> Optional[TaskRecord]:
+        """Retrieves the task record and marks it as consumed. Any number of subscribers may attach to the same task."""
+        record = self._active_tasks.get(call_id)
+        if record:
+            record.consumed = True
+        return record
     
     async def mark_consumed(self, call_id: str):
         """Marks a task as consumed without retrieving it. Used for WebSocket tasks."""
-        async with self._lock:
-            task_data = self._active_tasks.get(call_id)
-            if task_data:
-                task_data["consumed"] = True
-                logger.debug(f"Task marked as consumed: {call_id}", extra={"call_id": call_id})
+        record = self._active_tasks.get(call_id)
+        if record:
+            record.consumed = True
+            logger.debug(f"Task marked as consumed: {call_id}", extra={"call_id": call_id})
 
-    async def get_task_no_consume(self, call_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieves the task data without marking it as consumed."""
-        async with self._lock:
-            return self._active_tasks.get(call_id)
+    async def get_task_no_consume(self, call_id: str) -> Optional[TaskRecord]:
+        """Retrieves the task record without marking it as consumed."""
+        return self._active_tasks.get(call_id)
 
     async def remove_task(self, call_id: str):
-        """Removes the task from the registry if it exists."""
-        async with self._lock:
-            task_data = self._active_tasks.pop(call_id, None)
-            if task_data:
-                tool_name = task_data["tool_name"]
-                ACTIVE_TASKS.labels(tool_name=tool_name).dec()
-                logger.debug(f"Task removed from registry: {call_id}", extra={"call_id": call_id})
+        """Removes the task from the registry if it exists, cancelling its producer if still running."""
+        record = self._active_tasks.pop(call_id, None)
+        if record:
+            record.stream.cancel()
+            logger.debug(f"Task removed from registry: {call_id}", extra={"call_id": call_id})
+
+    async def remove_tasks(self, call_ids: List[str]) -> List[str]:
+        """Removes many tasks at once, cancelling their producers. Returns the call_ids that were found."""
+        removed = []
+        for call_id in call_ids:
+            record = self._active_tasks.pop(call_id, None)
+            if record:
+                record.stream.cancel()
+                removed.append(call_id)
+        if removed:
+            logger.debug(f"Removed {len(removed)} tasks from registry")
+        return removed
 
     async def cleanup_tasks(self):
-        """Closes all active generators currently in the registry."""
-        async with self._lock:
-            tasks = list(self._active_tasks.items())
+        """Stops all producers currently in the registry."""
+        tasks = list(self._active_tasks.items())
         
         if tasks:
             logger.info(f"Cleaning up {len(tasks)} active tasks during shutdown")
         
-        for call_id, task_data in tasks:
-            gen = task_data["gen"]
-            tool_name = task_data["tool_name"]
+        for call_id, record in tasks:
             try:
-                await gen.aclose()
+                await record.stream.stop()
             except Exception as e:
-                logger.error(f"Error closing generator {call_id}: {e}", extra={"call_id": call_id, "tool_name": tool_name})
+                logger.error(f"Error stopping task {call_id}: {e}", extra={"call_id": call_id, "tool_name": record.tool_name})
             finally:
                 await self.remove_task(call_id)
 
-    async def cleanup_stale_tasks(self, max_age_seconds: int):
+    async def cleanup_stale_tasks(self, max_age_seconds: float):
         """Closes tasks that were created more than max_age_seconds ago and never consumed."""
-        import time
-        now = time.time()
+        cutoff = time.time() - max_age_seconds
+        # Only tasks created before the cutoff are popped, so a sweep costs O(due * log n) rather than O(n)
         stale_tasks = []
-        
-        async with self._lock:
-            for call_id, task_data in self._active_tasks.items():
-                if not task_data["consumed"] and now - task_data["created_at"] > max_age_seconds:
-                    stale_tasks.append((call_id, task_data["gen"], task_data["tool_name"]))
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, _, call_id, record = heapq.heappop(self._expiry)
+            if not record.consumed and self._active_tasks.get(call_id) is record:
+                stale_tasks.append((call_id, record))
         
         if not stale_tasks:
             return
 
         logger.info(f"Cleaning up {len(stale_tasks)} stale tasks")
-        for call_id, gen, tool_name in stale_tasks:
+        for call_id, record in stale_tasks:
             try:
-                await gen.aclose()
+                await record.stream.stop()
             except Exception as e:
-                logger.error(f"Error closing stale generator {call_id}: {e}", extra={"call_id": call_id, "tool_name": tool_name})
+                logger.error(f"Error stopping stale task {call_id}: {e}", extra={"call_id": call_id, "tool_name": record.tool_name})
             finally:
-                await self.remove_task(call_id)
+                # Only drop the entry if it still refers to the task we stopped
+                if self._active_tasks.get(call_id) is record:
+                    await self.remove_task(call_id)
                 STALE_TASKS_CLEANED_TOTAL.inc()
 
-registry = ToolRegistry()
+# Kept for existing imports; the in-process registry is the default backend
+ToolRegistry = InMemoryRegistry
+
+def _keyed_start(func: Callable, model: Optional[type], run: Callable[[str, Dict[str, Any]], AsyncGenerator]) -> Callable:
+    """The registered callable of a keyed tool: validates its arguments once and hands them on with their key."""
+    @functools.wraps(func)
+    def start(**kwargs):
+        values, key = validate_args(model, kwargs)
+        return run(key, values)
+    return start
+
+def create_registry() -> BaseRegistry:
+    """
+    Builds the process-wide registry. Setting REDIS_URL selects the Redis backend; otherwise setting
+    WORKER_IPC_DIR selects multi-worker mode for several worker processes on one host.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        from .redis_registry import RedisRegistry
+        return RedisRegistry.from_url(redis_url)
+    ipc_dir = os.getenv("WORKER_IPC_DIR")
+    if ipc_dir:
+        from .relay import RelayRegistry
+        return RelayRegistry(ipc_dir)
+    return InMemoryRegistry()
 
-def progress_tool(name: Optional[str] = None):
+registry = create_registry()
+
+def progress_tool(name: Optional[str] = None, **options):
     """
     Decorator to register an async generator as a tool.
     The generator should yield ProgressPayload objects and finally a Dict for result.
+    Keyword options are validated against ToolOptions, e.g. `progress_tool("scan", coalesce=0.25)`.
     """
-    return registry.register(name)
-
-async def format_sse(event: ProgressEvent) -> str:
-    """Formats a ProgressEvent as an SSE data string."""
-    return f"data: {event.model_dump_json()}\n\n"
\ No newline at end of file
+    return registry.register(name, **options)
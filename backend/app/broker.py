@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+import os
+import sys
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from pydantic_core import from_json, to_json
+from .logger import logger
+
+# WORKER_BROKER_URL: Broker between API instances and the worker tier. "memory://" keeps the queues in
+# this process (with an in-process worker); "tcp://host:port" or "unix:///path" reach a broker server.
+WORKER_BROKER_URL = os.getenv("WORKER_BROKER_URL", "memory://")
+
+class BaseBroker(ABC):
+    """
+    Named FIFO queues shared by API instances and workers; each message is taken by exactly one getter.
+    Backends (e.g. a Redis list broker) only need these operations. Messages are JSON-serializable dicts.
+    """
+    @abstractmethod
+    async def put(self, queue: str, message: Dict[str, Any], front: bool = False):
+        """Appends `message` to `queue`, or puts it first with `front`."""
+
+    @abstractmethod
+    async def get(self, queue: str) -> Dict[str, Any]:
+        """Takes the oldest message from `queue`, waiting for one if it is empty."""
+
+    @abstractmethod
+    async def delete(self, queue: str):
+        """Drops `queue` and any messages left in it."""
+
+    async def close(self):
+        """Releases connections on shutdown."""
+
+class MemoryBroker(BaseBroker):
+    """The queues themselves, in this process. Used directly for a single process and behind `BrokerServer`."""
+    def __init__(self):
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._getters: Dict[str, Deque[asyncio.Future]] = {}
+
+    def pending(self, queue: str) -> int:
+        """Messages waiting in `queue`."""
+        return len(self._queues.get(queue, ()))
+
+    def put_nowait(self, queue: str, message: Dict[str, Any], front: bool = False):
+        getters = self._getters.get(queue)
+        while getters:
+            getter = getters.popleft()
+            if not getter.done():
+                getter.set_result(message)
+                break
+        else:
+            items = self._queues.setdefault(queue, deque())
+            if front:
+                items.appendleft(message)
+            else:
+                items.append(message)
+        if getters is not None and not getters:
+            del self._getters[queue]
+
+    async def put(self, queue: str, message: Dict[str, Any], front: bool = False):
+        self.put_nowait(queue, message, front=front)
+
+    async def get(self, queue: str) -> Dict[str, Any]:
+        items = self._queues.get(queue)
+        if items:
+            message = items.popleft()
+            if not items:
+                del self._queues[queue]
+            return message
+        getter = asyncio.get_running_loop().create_future()
+        self._getters.setdefault(queue, deque()).append(getter)
+        try:
+            return await getter
+        except asyncio.CancelledError:
+            if getter.done() and not getter.cancelled():
+                # Handed a message just as this getter gave up: it goes to the next one instead
+                self.put_nowait(queue, getter.result(), front=True)
+            else:
+                getters = self._getters.get(queue)
+                if getters is not None and getter in getters:
+                    getters.remove(getter)
+                    if not getters:
+                        del self._getters[queue]
+            raise
+
+    async def delete(self, queue: str):
+        self._queues.pop(queue, None)
+
+def _endpoint(url: str) -> Tuple[str, Any]:
+    parsed = urlparse(url)
+    if parsed.scheme == "tcp" and parsed.hostname and parsed.port:
+        return "tcp", (parsed.hostname, parsed.port)
+    if parsed.scheme == "unix" and parsed.path:
+        return "unix", parsed.path
+    raise ValueError(f"Unsupported broker URL: {url!r} (expected tcp://host:port or unix:///path)")
+
+class SocketBroker(BaseBroker):
+    """
+    Client of a `BrokerServer` over TCP or a unix socket. One connection carries every operation as a
+    JSON line tagged with an id, so many blocking `get`s can wait on it at once. A `get` given up by
+    its caller is withdrawn on the server, and a message that was already on its way is put back.
+    """
+    def __init__(self, url: str):
+        self.url = url
+        self.kind, self.address = _endpoint(url)
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+
+    async def _connection(self) -> asyncio.StreamWriter:
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                if self.kind == "tcp":
+                    reader, self._writer = await asyncio.open_connection(*self.address)
+                else:
+                    reader, self._writer = await asyncio.open_unix_connection(self.address)
+                self._reader_task = asyncio.create_task(self._read(reader, self._writer))
+            return self._writer
+
+    async def _call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        writer = await self._connection()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            writer.write(to_json({**request, "id": request_id}) + b"\n")
+            await writer.drain()
+            return await future
+        except asyncio.CancelledError:
+            if request["op"] == "get":
+                if future.done() and not future.cancelled() and not future.exception():
+                    self._give_back(writer, future.result())
+                elif not writer.is_closing():
+                    writer.write(to_json({"op": "cancel", "cancel_id": request_id, "id": 0}) + b"\n")
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _give_back(self, writer: asyncio.StreamWriter, response: Dict[str, Any]):
+        if "message" in response and not writer.is_closing():
+            writer.write(to_json({"op": "put", "queue": response["queue"], "message": response["message"], "front": True, "id": 0}) + b"\n")
+
+    async def _read(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                response = from_json(line)
+                future = self._pending.get(response["id"])
+                if future is not None and not future.done():
+                    future.set_result(response)
+                else:
+                    # The answer to a get that was withdrawn too late
+                    self._give_back(writer, response)
+        except Exception as e:
+            logger.error(f"Broker connection to {self.url} failed: {e}")
+        finally:
+            writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Lost connection to broker {self.url}"))
+
+    async def put(self, queue: str, message: Dict[str, Any], front: bool = False):
+        await self._call({"op": "put", "queue": queue, "message": message, "front": front})
+
+    async def get(self, queue: str) -> Dict[str, Any]:
+        return (await self._call({"op": "get", "queue": queue}))["message"]
+
+    async def delete(self, queue: str):
+        await self._call({"op": "delete", "queue": queue})
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+
+class BrokerServer:
+    """Serves a MemoryBroker to `SocketBroker` clients on a TCP port or unix socket (`python -m app.broker <url>`)."""
+    def __init__(self, url: str, broker: Optional[MemoryBroker] = None):
+        self.url = url
+        self.kind, self.address = _endpoint(url)
+        self.broker = broker or MemoryBroker()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if self.kind == "tcp":
+            self._server = await asyncio.start_server(self._serve, *self.address)
+        else:
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = await asyncio.start_unix_server(self._serve, path=self.address)
+        logger.info(f"Broker listening on {self.url}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            if self.kind == "unix" and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        gets: Dict[int, asyncio.Task] = {}
+        try:
+            while line := await reader.readline():
+                request = from_json(line)
+                op, request_id = request.get("op"), request.get("id")
+                if op == "get":
+                    gets[request_id] = asyncio.create_task(self._get(request_id, request["queue"], writer, gets))
+                    continue
+                if op == "cancel":
+                    task = gets.pop(request.get("cancel_id"), None)
+                    if task:
+                        task.cancel()
+                    continue
+                if op == "put":
+                    self.broker.put_nowait(request["queue"], request["message"], front=request.get("front", False))
+                elif op == "delete":
+                    await self.broker.delete(request["queue"])
+                if request_id:
+                    writer.write(to_json({"id": request_id}) + b"\n")
+        except asyncio.CancelledError:
+            # Connections still open when the server shuts down
+            pass
+        except Exception as e:
+            logger.error(f"Broker client error: {e}")
+        finally:
+            for task in gets.values():
+                task.cancel()
+            writer.close()
+
+    async def _get(self, request_id: int, queue: str, writer: asyncio.StreamWriter, gets: Dict[int, asyncio.Task]):
+        message = await self.broker.get(queue)
+        gets.pop(request_id, None)
+        if writer.is_closing():
+            self.broker.put_nowait(queue, message, front=True)
+            return
+        writer.write(to_json({"id": request_id, "queue": queue, "message": message}) + b"\n")
+
+def create_broker(url: str = WORKER_BROKER_URL) -> BaseBroker:
+    if url == "memory://":
+        return MemoryBroker()
+    return SocketBroker(url)
+
+async def serve(url: str):
+    server = BrokerServer(url)
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    asyncio.run(serve(sys.argv[1] if len(sys.argv) > 1 else os.getenv("WORKER_BROKER_URL", "tcp://0.0.0.0:7070")))
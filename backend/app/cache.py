@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+from pydantic_core import from_json, to_json
+from .validation import args_model, validate_args
+from .metrics import RESULT_CACHE_HITS_TOTAL, RESULT_CACHE_MISSES_TOTAL, RESULT_CACHE_EVICTIONS_TOTAL, RESULT_CACHE_BYTES
+
+# RESULT_CACHE_MAX_BYTES: Upper bound on the encoded size of all cached results (and recorded progress) in the process.
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# RESULT_CACHE_DEFAULT_SIZE: Entries kept per cached tool when it doesn't set `cache_size`.
+RESULT_CACHE_DEFAULT_SIZE = 128
+
+@dataclass(slots=True)
+class CacheEntry:
+    """A finished run: (kind, encoded item, seconds since start) per yielded item, result last."""
+    items: List[Tuple[str, bytes, float]]
+    size: int
+    expires_at: float
+
+def canonical_args(model: Optional[type], kwargs: Dict[str, Any]) -> str:
+    """The canonical JSON of the validated arguments (see `validate_args`), used as the cache key."""
+    return validate_args(model, kwargs)[1]
+
+class ResultCache:
+    """
+    Results of finished runs of tools declared with `cache_ttl`, keyed by tool name and canonical
+    arguments. Entries expire after the tool's TTL, each tool keeps at most `cache_size` of them (LRU),
+    and all tools together stay under `max_bytes` of encoded data (global LRU).
+    """
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # (tool_name, key) -> entry, least recently used first; per-tool views hold the same keys
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._per_tool: Dict[str, "OrderedDict[str, None]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, tool_name: str, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get((tool_name, key))
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._evict(tool_name, key, "ttl")
+            return None
+        self._entries.move_to_end((tool_name, key))
+        self._per_tool[tool_name].move_to_end(key)
+        return entry
+
+    def put(self, tool_name: str, key: str, items: List[Tuple[str, bytes, float]], ttl: float, max_entries: int):
+        size = sum(len(data) for _, data, _ in items)
+        if size > self.max_bytes:
+            return
+        if (tool_name, key) in self._entries:
+            self._evict(tool_name, key, None)
+        self._entries[(tool_name, key)] = CacheEntry(items, size, time.monotonic() + ttl)
+        self._per_tool.setdefault(tool_name, OrderedDict())[key] = None
+        self.size += size
+        while len(self._per_tool[tool_name]) > max_entries:
+            self._evict(tool_name, next(iter(self._per_tool[tool_name])), "size")
+        while self.size > self.max_bytes:
+            oldest_tool, oldest_key = next(iter(self._entries))
+            self._evict(oldest_tool, oldest_key, "memory")
+        RESULT_CACHE_BYTES.set(self.size)
+
+    def clear(self):
+        self._entries.clear()
+        self._per_tool.clear()
+        self.size = 0
+        RESULT_CACHE_BYTES.set(0)
+
+    def _evict(self, tool_name: str, key: str, reason: Optional[str]):
+        entry = self._entries.pop((tool_name, key))
+        keys = self._per_tool[tool_name]
+        del keys[key]
+        if not keys:
+            del self._per_tool[tool_name]
+        self.size -= entry.size
+        RESULT_CACHE_BYTES.set(self.size)
+        if reason:
+            RESULT_CACHE_EVICTIONS_TOTAL.labels(tool_name=tool_name, reason=reason).inc()
+
+    def wrap(self, tool: Callable, tool_name: str, ttl: float, max_entries: Optional[int], replay: Optional[float]) -> Callable:
+        """
+        Puts the cache in front of a registered tool callable. Returns `start(key, values)`, called with the
+        arguments already validated and canonicalized by `validate_args`. A hit returns a generator that
+        replays the recorded run (progress only with `replay`, at that speed-up); a miss runs the tool
+        with `values` and records it.
+        """
+        max_entries = max_entries or RESULT_CACHE_DEFAULT_SIZE
+
+        def start(key: str, values: Dict[str, Any]):
+            entry = self.get(tool_name, key)
+            if entry is not None:
+                RESULT_CACHE_HITS_TOTAL.labels(tool_name=tool_name).inc()
+                return _replay(entry, replay)
+            RESULT_CACHE_MISSES_TOTAL.labels(tool_name=tool_name).inc()
+            return self._record(tool(**values), tool_name, key, ttl, max_entries, keep_progress=bool(replay))
+        return start
+
+    async def _record(
+        self, gen: AsyncGenerator, tool_name: str, key: str, ttl: float, max_entries: int, keep_progress: bool
+    ) -> AsyncGenerator[Any, None]:
+        from .bridge import ProgressPayload
+        started = time.monotonic()
+        items: Optional[List[Tuple[str, bytes, float]]] = []
+        size = 0
+        try:
+            async for item in gen:
+                if items is not None:
+                    recorded = None
+                    if isinstance(item, ProgressPayload):
+                        if keep_progress:
+                            recorded = ("progress", item.model_dump_json().encode(), time.monotonic() - started)
+                    elif isinstance(item, dict) and item.get("type") == "input_request":
+                        # Interactive runs depend on more than their arguments
+                        items = None
+                    else:
+                        recorded = ("result", to_json(item), time.monotonic() - started)
+                    if recorded is not None:
+                        items.append(recorded)
+                        size += len(recorded[1])
+                        if size > self.max_bytes:
+                            # Too big to ever fit; stop holding on to it
+                            items = None
+                yield item
+        finally:
+            await gen.aclose()
+        # Only runs that finished normally get here; errors and cancellations are never cached
+        if items and items[-1][0] == "result":
+            self.put(tool_name, key, items, ttl, max_entries)
+
+async def _replay(entry: CacheEntry, speedup: Optional[float]) -> AsyncGenerator[Any, None]:
+    from .bridge import ProgressPayload
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for kind, data, offset in entry.items:
+        if kind == "progress":
+            if not speedup:
+                continue
+            delay = started + offset / speedup - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield ProgressPayload.model_validate_json(data)
+        else:
+            yield from_json(data)
+
+def is_replay(gen: Any) -> bool:
+    """True for generators that serve a cache hit; they skip admission control since they do no real work."""
+    return getattr(gen, "ag_code", None) is _replay.__code__
+
+result_cache = ResultCache()
@@ -0,0 +1,479 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Optional, Tuple
+from pydantic import validate_call
+from .logger import logger
+from .context import call_id_var
+
+# PROCESS_POOL_SIZE: Number of worker processes shared by all tools registered with executor="process".
+PROCESS_POOL_SIZE = int(os.getenv("PROCESS_POOL_SIZE", str(os.cpu_count() or 1)))
+# PROCESS_START_METHOD: multiprocessing start method for the pool. "spawn" keeps workers free of the API's threads and loop.
+PROCESS_START_METHOD = os.getenv("PROCESS_START_METHOD", "spawn")
+# PROCESS_CANCEL_POLL_INTERVAL: Seconds between checks of a task's cancel flag inside a worker.
+PROCESS_CANCEL_POLL_INTERVAL = float(os.getenv("PROCESS_CANCEL_POLL_INTERVAL", "0.1"))
+# PROCESS_READ_TIMEOUT: Longest a reader thread blocks on a task's channel before re-checking for cancellation.
+PROCESS_READ_TIMEOUT = 1.0
+# PROCESS_READER_THREADS: Threads that wait on process tools' channels, one per task being read. Kept apart from the loop's default executor.
+PROCESS_READER_THREADS = int(os.getenv("PROCESS_READER_THREADS", "64"))
+# THREAD_POOL_SIZE: Threads shared by all synchronous generator tools. Kept apart from the loop's default executor.
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "32"))
+# THREAD_BRIDGE_BUFFER: Items a sync tool may run ahead of the event loop before its thread waits.
+THREAD_BRIDGE_BUFFER = int(os.getenv("THREAD_BRIDGE_BUFFER", "256"))
+# WORKER_QUEUE: Broker queue that start requests for executor="worker" tools are sent to.
+# Each run also uses `<WORKER_QUEUE>:events:<job>` (worker to API) and `<WORKER_QUEUE>:control:<job>` (API to worker).
+WORKER_QUEUE = os.getenv("WORKER_QUEUE", "adk:jobs")
+
+class ProcessToolError(RuntimeError):
+    """An exception raised by a tool inside a worker process, re-raised in the API process with the same message."""
+
+class WorkerToolError(RuntimeError):
+    """An exception raised by a tool on the worker tier, re-raised in the API process with the same message."""
+
+def _run_tool_in_worker(func: Callable, args: tuple, kwargs: dict, channel, cancel) -> None:
+    """Worker-side entry point: drives the tool's generator and ships every item back over `channel`."""
+    gen = validate_call(func)(*args, **kwargs)
+    if inspect.isgenerator(gen):
+        # Sync generator tools can only be stopped between items
+        try:
+            for item in gen:
+                channel.put(("item", item))
+                if cancel.is_set():
+                    gen.close()
+                    channel.put(("cancelled", None))
+                    return
+            channel.put(("done", None))
+        except Exception as e:
+            channel.put(("error", str(e) or type(e).__name__))
+        return
+
+    async def drive():
+        try:
+            async for item in gen:
+                channel.put(("item", item))
+        finally:
+            await gen.aclose()
+
+    async def main():
+        task = asyncio.create_task(drive())
+        # stop/stop_task in the API process set `cancel`; the tool sees it as a CancelledError at its current await
+        while not task.done():
+            if cancel.is_set():
+                task.cancel()
+                break
+            await asyncio.wait({task}, timeout=PROCESS_CANCEL_POLL_INTERVAL)
+        try:
+            await task
+        except asyncio.CancelledError:
+            return "cancelled"
+        return "done"
+
+    try:
+        channel.put((asyncio.run(main()), None))
+    except Exception as e:
+        channel.put(("error", str(e) or type(e).__name__))
+
+def _warm_up() -> int:
+    return os.getpid()
+
+class ProcessExecutor:
+    """
+    A warm pool of worker processes for CPU-bound tools. Each task gets a manager-backed channel
+    for the items its generator yields and a cancel flag the worker polls while the tool runs.
+    Channels are read on a dedicated thread pool, so waiting tasks never hold the loop's default executor.
+    The pools and the manager are created on first use, or up front by `warm()` at startup.
+    """
+    def __init__(
+        self, max_workers: int = PROCESS_POOL_SIZE, start_method: str = PROCESS_START_METHOD, reader_threads: int = PROCESS_READER_THREADS
+    ):
+        self.max_workers = max(1, max_workers)
+        self.start_method = start_method
+        self.reader_threads = max(1, reader_threads)
+        self.in_use = False
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._readers: Optional[ThreadPoolExecutor] = None
+        self._manager = None
+
+    def _ensure_started(self):
+        if self._pool is None:
+            context = multiprocessing.get_context(self.start_method)
+            self._manager = context.Manager()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            self._readers = ThreadPoolExecutor(max_workers=self.reader_threads, thread_name_prefix="adk-process-reader")
+            logger.info(f"Process pool started with {self.max_workers} workers ({self.start_method})")
+        return self._pool
+
+    async def warm(self):
+        """Starts every worker now so the first process tool doesn't pay for interpreter start-up."""
+        loop = asyncio.get_running_loop()
+        pool = await loop.run_in_executor(None, self._ensure_started)
+        await asyncio.gather(*(loop.run_in_executor(pool, _warm_up) for _ in range(self.max_workers)))
+
+    def wrap(self, func: Callable, validate: bool = True) -> Callable:
+        """
+        Returns a callable with the tool's signature that validates arguments in the API process
+        (unless the caller already did) and returns an async generator streaming the tool's items
+        back from a worker.
+        """
+        self.in_use = True
+        validated = validate_call(func) if validate else None
+
+        @functools.wraps(func)
+        def start(*args, **kwargs):
+            # Raises ValidationError here, exactly like an in-process tool; the generator is never iterated
+            if validated is not None:
+                validated(*args, **kwargs)
+            return self._stream(func, args, kwargs)
+        return start
+
+    async def _stream(self, func: Callable, args: tuple, kwargs: dict) -> AsyncGenerator[Any, None]:
+        loop = asyncio.get_running_loop()
+        pool = await loop.run_in_executor(None, self._ensure_started)
+        channel = self._manager.Queue()
+        cancel = self._manager.Event()
+        future = loop.run_in_executor(pool, _run_tool_in_worker, func, args, kwargs, channel, cancel)
+        try:
+            while True:
+                batch = await loop.run_in_executor(self._readers, self._read, channel, cancel)
+                for kind, value in batch:
+                    if kind == "item":
+                        yield value
+                    elif kind == "error":
+                        raise ProcessToolError(value)
+                    elif kind in ("done", "cancelled"):
+                        return
+        finally:
+            if not future.done():
+                # Covers both a stop while the tool is running and one while it is still waiting for a worker
+                future.cancel()
+                cancel.set()
+
+    @staticmethod
+    def _read(channel, cancel) -> list:
+        # Blocks a reader thread; returns everything already queued so items cross threads in bulk
+        while True:
+            try:
+                batch = [channel.get(timeout=PROCESS_READ_TIMEOUT)]
+                break
+            except queue.Empty:
+                if cancel.is_set():
+                    return [("cancelled", None)]
+        while True:
+            try:
+                batch.append(channel.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._readers.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._pool = None
+            self._readers = None
+            self._manager = None
+
+process_executor = ProcessExecutor()
+
+_thread_state = threading.local()
+
+def cancellation_requested() -> bool:
+    """
+    For synchronous generator tools: True once the task was stopped. The thread bridge closes the generator
+    at its next yield anyway; long blocking stretches between yields can poll this to give up early.
+    """
+    bridge = getattr(_thread_state, "bridge", None)
+    return bridge is not None and bridge.cancelled.is_set()
+
+class _ThreadBridge:
+    """
+    Hands items from a tool thread to the event loop. The thread appends to a locked deque and only
+    wakes the loop when the deque goes from empty to non-empty, so the loop picks items up in batches
+    with one `call_soon_threadsafe` per batch instead of one per item.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = THREAD_BRIDGE_BUFFER):
+        self.loop = loop
+        self.maxsize = max(1, maxsize)
+        self.items: Deque[Any] = deque()
+        self.cond = threading.Condition()
+        self.cancelled = threading.Event()
+        # Set by the tool thread once it picked the run up
+        self.started = False
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._wake_pending = False
+
+    # Thread side
+
+    def put(self, item: Any):
+        with self.cond:
+            while len(self.items) >= self.maxsize and not self.cancelled.is_set():
+                self.cond.wait()
+            self.items.append(item)
+            wake = self._schedule_wake()
+        if wake:
+            self.loop.call_soon_threadsafe(self._wake)
+
+    def finish(self, error: Optional[BaseException] = None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            wake = self._schedule_wake()
+        if wake:
+            try:
+                self.loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                # The loop is already closed (shutdown); nobody is waiting any more
+                pass
+
+    def _schedule_wake(self) -> bool:
+        if self._wake_pending:
+            return False
+        self._wake_pending = True
+        return True
+
+    # Loop side
+
+    def _wake(self):
+        with self.cond:
+            self._wake_pending = False
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def get_batch(self) -> Tuple[List[Any], bool]:
+        """Waits for items and returns all of them, plus whether the tool has finished."""
+        while True:
+            with self.cond:
+                if self.items or self.done:
+                    batch = list(self.items)
+                    self.items.clear()
+                    self.cond.notify_all()
+                    return batch, self.done
+                self._waiter = self.loop.create_future()
+                waiter = self._waiter
+            await waiter
+
+    def cancel(self):
+        self.cancelled.set()
+        with self.cond:
+            self.cond.notify_all()
+
+def _run_sync_tool(gen, bridge: _ThreadBridge):
+    bridge.started = True
+    if bridge.cancelled.is_set():
+        # Stopped while it waited for a thread: the tool body never runs
+        gen.close()
+        bridge.finish()
+        return
+    _thread_state.bridge = bridge
+    try:
+        for item in gen:
+            bridge.put(item)
+            if bridge.cancelled.is_set():
+                break
+    except BaseException as e:
+        bridge.finish(e)
+    else:
+        bridge.finish()
+    finally:
+        # Runs the tool's own cleanup (finally blocks) on this thread when it was stopped early
+        gen.close()
+        _thread_state.bridge = None
+
+class ThreadExecutor:
+    """
+    Runs synchronous generator tools in a bounded thread pool and streams their items back onto the
+    event loop. `max_threads` on a tool caps how many of its runs hold a thread at once.
+    """
+    def __init__(self, max_workers: int = THREAD_POOL_SIZE):
+        self.max_workers = max(1, max_workers)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._limit_sizes: Dict[str, int] = {}
+
+    def _ensure_started(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="adk-tool")
+        return self._pool
+
+    def wrap(self, func: Callable, tool_name: str, max_threads: Optional[int] = None, validate: bool = True) -> Callable:
+        """
+        Returns a callable that validates its arguments (unless the caller already did) and returns
+        an async generator fed by the tool running on a thread.
+        """
+        validated = validate_call(func) if validate else func
+        if max_threads is not None:
+            self._limit_sizes[tool_name] = max_threads
+
+        @functools.wraps(func)
+        def start(*args, **kwargs):
+            # Validates and creates the generator here; its body only runs on the thread
+            return self._stream(tool_name, validated(*args, **kwargs))
+        return start
+
+    def _limit(self, tool_name: str) -> Optional[asyncio.Semaphore]:
+        size = self._limit_sizes.get(tool_name)
+        if size is None:
+            return None
+        if tool_name not in self._limits:
+            self._limits[tool_name] = asyncio.Semaphore(size)
+        return self._limits[tool_name]
+
+    async def _stream(self, tool_name: str, gen) -> AsyncGenerator[Any, None]:
+        loop = asyncio.get_running_loop()
+        limit = self._limit(tool_name)
+        if limit is not None:
+            await limit.acquire()
+        bridge = _ThreadBridge(loop)
+        try:
+            # The tool thread sees the task's context (call_id, tool_name) for logging
+            future = loop.run_in_executor(self._ensure_started(), contextvars.copy_context().run, _run_sync_tool, gen, bridge)
+        except BaseException:
+            if limit is not None:
+                limit.release()
+            raise
+        if limit is not None:
+            # The slot is held until the thread is really free, not just until the consumer goes away
+            future.add_done_callback(lambda _: limit.release())
+        try:
+            while True:
+                batch, done = await bridge.get_batch()
+                for item in batch:
+                    yield item
+                if done:
+                    if bridge.error is not None:
+                        raise bridge.error
+                    return
+        finally:
+            bridge.cancel()
+            if not bridge.started:
+                # Still queued for a thread: drop it from the pool's queue. A run that started keeps its
+                # future (and its max_threads slot) until the thread is free.
+                future.cancel()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+thread_executor = ThreadExecutor()
+
+def job_queues(job: str) -> Tuple[str, str]:
+    """The (events, control) queues of one worker run."""
+    return f"{WORKER_QUEUE}:events:{job}", f"{WORKER_QUEUE}:control:{job}"
+
+class WorkerExecutor:
+    """
+    Runs tools on the worker tier (`worker.py`), reached through a broker (`broker.py`). The API side
+    validates arguments, queues a start request and relays the items the worker sends back into the
+    normal TaskStream. Stopping the task cancels the tool on its worker, and input for a run that
+    yielded an `input_request` is forwarded to the worker's `input_manager`.
+    Workers import the same tool modules, so each registration also records the callable a worker runs.
+    """
+    def __init__(self, broker_url: Optional[str] = None):
+        self.broker_url = broker_url
+        self.broker = None
+        self.in_use = False
+        self._local: Dict[str, Callable] = {}
+        # call_id -> control queue of a worker run that yielded an input_request
+        self._awaiting_input: Dict[str, str] = {}
+        self._inline_worker = None
+
+    def get_broker(self):
+        if self.broker is None:
+            from .broker import create_broker, WORKER_BROKER_URL
+            self.broker = create_broker(self.broker_url or WORKER_BROKER_URL)
+        return self.broker
+
+    def local_tool(self, tool_name: str) -> Optional[Callable]:
+        """The validated callable a worker runs for `tool_name`."""
+        return self._local.get(tool_name)
+
+    def wrap(self, func: Callable, tool_name: str, validate: bool = True) -> Callable:
+        """
+        Returns a callable with the tool's signature that validates arguments in the API process
+        (unless the caller already did) and returns an async generator relaying the run from a worker.
+        Arguments are sent to the worker as JSON and validated again there.
+        """
+        self.in_use = True
+        validated = validate_call(func)
+        # What a worker runs: synchronous generator tools go to its thread pool
+        self._local[tool_name] = thread_executor.wrap(func, tool_name) if inspect.isgeneratorfunction(func) else validated
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def start(*args, **kwargs):
+            # Raises ValidationError here, exactly like an in-process tool; the generator is never iterated
+            if validate:
+                validated(*args, **kwargs)
+            return self._stream(tool_name, dict(signature.bind(*args, **kwargs).arguments))
+        return start
+
+    async def _stream(self, tool_name: str, arguments: Dict[str, Any]) -> AsyncGenerator[Any, None]:
+        from .bridge import ProgressPayload
+        broker = self.get_broker()
+        call_id = call_id_var.get()
+        job = uuid.uuid4().hex
+        events, control = job_queues(job)
+        await broker.put(WORKER_QUEUE, {"job": job, "call_id": call_id, "tool_name": tool_name, "args": arguments})
+        finished = False
+        try:
+            while True:
+                message = await broker.get(events)
+                kind = message["kind"]
+                if kind == "progress":
+                    yield ProgressPayload.model_validate(message["item"])
+                elif kind == "item":
+                    item = message["item"]
+                    if isinstance(item, dict) and item.get("type") == "input_request":
+                        self._awaiting_input[call_id] = control
+                    yield item
+                elif kind == "error":
+                    finished = True
+                    raise WorkerToolError(message["message"])
+                else:
+                    finished = True
+                    return
+        finally:
+            self._awaiting_input.pop(call_id, None)
+            if not finished:
+                try:
+                    await broker.put(control, {"cancel": True})
+                    await broker.delete(events)
+                except Exception as e:
+                    logger.warning(f"Could not cancel worker run of task {call_id}: {e}", extra={"call_id": call_id})
+
+    async def provide_input(self, call_id: str, value: Any) -> bool:
+        """Forwards input to the worker running task `call_id`. False unless that run asked for input."""
+        control = self._awaiting_input.pop(call_id, None)
+        if control is None:
+            return False
+        await self.get_broker().put(control, {"input": value})
+        return True
+
+    async def start(self):
+        """With the in-process broker nothing else can reach the queue, so a worker runs in this process."""
+        from .broker import MemoryBroker
+        if self.in_use and isinstance(self.get_broker(), MemoryBroker) and self._inline_worker is None:
+            from .worker import Worker
+            self._inline_worker = Worker(self.get_broker())
+            self._inline_worker.start()
+
+    async def close(self):
+        if self._inline_worker is not None:
+            await self._inline_worker.stop()
+            self._inline_worker = None
+        if self.broker is not None:
+            await self.broker.close()
+            self.broker = None
+
+worker_executor = WorkerExecutor()
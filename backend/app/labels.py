@@ -0,0 +1,9 @@
+import re
+
+# Node and worker labels carried by call_ids (`<uuid>.<node>.<worker>`). They end up in URLs and
+# socket paths, so only plain names are accepted.
+_LABEL = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def is_label(value: str) -> bool:
+    """True for a valid node or worker label."""
+    return bool(_LABEL.match(value))
@@ -0,0 +1,127 @@
+import asyncio
+import math
+import os
+from typing import Any, Dict, Optional
+from .logger import logger
+from .metrics import EVENT_LOOP_LAG, LOAD_SHED_TOTAL
+
+# LOOP_LAG_INTERVAL: Seconds between event-loop lag samples.
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+# LOOP_LAG_SMOOTHING: Weight of the newest sample in the lag moving average (0-1].
+LOOP_LAG_SMOOTHING = float(os.getenv("LOOP_LAG_SMOOTHING", "0.3"))
+# LOAD_SHED_LAG: Smoothed loop lag (seconds) above which new task starts are shed.
+LOAD_SHED_LAG = float(os.getenv("LOAD_SHED_LAG", "0.25"))
+# LOAD_RECOVER_LAG: Smoothed loop lag (seconds) below which starts are accepted again. Lower than LOAD_SHED_LAG to avoid flapping.
+LOAD_RECOVER_LAG = float(os.getenv("LOAD_RECOVER_LAG", "0.1"))
+# LOAD_SHED_MODE: "reject" answers overloaded HTTP starts right away; "defer" holds them up to LOAD_SHED_MAX_DEFER seconds first.
+LOAD_SHED_MODE = os.getenv("LOAD_SHED_MODE", "reject")
+# LOAD_SHED_MAX_DEFER: Longest a deferred HTTP start waits for the overload to clear before it is rejected.
+LOAD_SHED_MAX_DEFER = float(os.getenv("LOAD_SHED_MAX_DEFER", "2.0"))
+# LOAD_SHED_RETRY_AFTER: Base Retry-After hint (seconds), scaled up with saturation and capped at LOAD_SHED_MAX_RETRY_AFTER.
+LOAD_SHED_RETRY_AFTER = float(os.getenv("LOAD_SHED_RETRY_AFTER", "1.0"))
+LOAD_SHED_MAX_RETRY_AFTER = 30.0
+
+class OverloadController:
+    """
+    Samples event-loop lag (how late a short sleep wakes up) and decides whether new task starts
+    should be shed. Shedding begins once the smoothed lag exceeds `shed_lag` and ends only when it
+    falls below `recover_lag`. Only task starts are gated; ping, stop and input are always served.
+    """
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        shed_lag: float = LOAD_SHED_LAG,
+        recover_lag: float = LOAD_RECOVER_LAG,
+        mode: str = LOAD_SHED_MODE,
+        max_defer: float = LOAD_SHED_MAX_DEFER
+    ):
+        if mode not in ("reject", "defer"):
+            raise ValueError(f"Unknown load shedding mode: {mode}")
+        self.interval = interval
+        self.shed_lag = shed_lag
+        self.recover_lag = min(recover_lag, shed_lag)
+        self.mode = mode
+        self.max_defer = max_defer
+        self.lag = 0.0
+        self.last_lag = 0.0
+        self.overloaded = False
+        self.shed = 0
+        self._recovered: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def saturation(self) -> float:
+        """Smoothed lag relative to the shedding threshold: 1.0 or more means new starts are being shed."""
+        return self.lag / self.shed_lag if self.shed_lag > 0 else 0.0
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def record(self, lag: float):
+        """Feeds one lag sample (seconds) into the moving average and updates the overload state."""
+        self.last_lag = max(0.0, lag)
+        self.lag += LOOP_LAG_SMOOTHING * (self.last_lag - self.lag)
+        EVENT_LOOP_LAG.set(self.lag)
+        if not self.overloaded and self.lag > self.shed_lag:
+            self.overloaded = True
+            logger.warning(f"Event loop lag {self.lag * 1000:.0f}ms above {self.shed_lag * 1000:.0f}ms, shedding new task starts")
+        elif self.overloaded and self.lag < self.recover_lag:
+            self.overloaded = False
+            logger.info(f"Event loop lag back to {self.lag * 1000:.0f}ms, accepting new task starts")
+            if self._recovered is not None:
+                self._recovered.set()
+                self._recovered = None
+
+    def retry_after(self) -> float:
+        """Seconds a shed client should wait before retrying; grows with how far past the threshold the loop is."""
+        return min(LOAD_SHED_MAX_RETRY_AFTER, max(LOAD_SHED_RETRY_AFTER, LOAD_SHED_RETRY_AFTER * self.saturation))
+
+    def check(self, transport: str) -> Optional[float]:
+        """Returns None if a task start may proceed, otherwise the retry-after hint for the rejection."""
+        if not self.overloaded:
+            return None
+        self.shed += 1
+        LOAD_SHED_TOTAL.labels(transport=transport).inc()
+        return self.retry_after()
+
+    async def admit(self, transport: str) -> Optional[float]:
+        """Like `check`, but in "defer" mode waits up to `max_defer` seconds for the overload to clear first."""
+        if self.overloaded and self.mode == "defer":
+            if self._recovered is None:
+                self._recovered = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._recovered.wait(), timeout=self.max_defer)
+            except asyncio.TimeoutError:
+                pass
+        return self.check(transport)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "overloaded": self.overloaded,
+            "saturation": round(self.saturation, 3),
+            "loop_lag_ms": round(self.lag * 1000, 2),
+            "last_loop_lag_ms": round(self.last_lag * 1000, 2),
+            "shed_lag_ms": round(self.shed_lag * 1000, 2),
+            "retry_after": math.ceil(self.retry_after()) if self.overloaded else 0,
+            "shed_total": self.shed,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - started - self.interval)
+
+load_controller = OverloadController()
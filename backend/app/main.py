@@ -1,30 +1,42 @@
 import asyncio
-import json
-import uuid
-import time
+import functools
+import math
 import os
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect, status
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from .bridge import registry, ProgressEvent, ProgressPayload, format_sse, input_manager
+from .bridge import registry
+from .stream import TaskStream, Subscription, EncodedEvent, EventEncoder
+from .ws_writer import WebSocketWriter, WebSocketClosed, WS_OVERFLOW_POLICY
+from .wire import negotiate_codec, accepted_subprotocol
+from .executors import process_executor, thread_executor, worker_executor
+from .load import load_controller
+from .cache import is_replay
+from .mux import StreamMux, muxes
+from .routing import router
+from .scheduler import scheduler
 from .logger import logger
 from .context import call_id_var, tool_name_var
-from .auth import verify_api_key, verify_api_key_ws
-from .metrics import TASK_DURATION, TASKS_TOTAL, TASK_PROGRESS_STEPS_TOTAL
+from .auth import verify_api_key, verify_api_key_ws, api_key_from, priority_for_api_key
 
 # Configuration Constants for WebSocket and Task Lifecycle Management
 # WS_HEARTBEAT_TIMEOUT: Max time to wait for a client message (ping/pong) before closing connection.
 WS_HEARTBEAT_TIMEOUT = 60.0
 # CLEANUP_INTERVAL: Frequency (seconds) of the background stale task cleanup task.
-CLEANUP_INTERVAL = 60.0
+# Sweeps only visit tasks that are due, so this can be as low as about a second regardless of the number of tasks.
+CLEANUP_INTERVAL = float(os.getenv("CLEANUP_INTERVAL", "1.0"))
 # STALE_TASK_MAX_AGE: Maximum age (seconds) of an unconsumed task before it is cleaned up.
-STALE_TASK_MAX_AGE = 300.0
+STALE_TASK_MAX_AGE = float(os.getenv("STALE_TASK_MAX_AGE", "300.0"))
 # WS_MESSAGE_SIZE_LIMIT: Maximum allowed size (bytes) for an incoming WebSocket message.
 WS_MESSAGE_SIZE_LIMIT = 1024 * 1024  # 1MB
+# SSE_RESUME_GRACE: Seconds a task stays resumable (and keeps running) after its last SSE subscriber disconnects.
+SSE_RESUME_GRACE = 30.0
+# START_BATCH_MAX: Most tasks one `/start_tasks` request or WS `start_batch` message may start.
+START_BATCH_MAX = int(os.getenv("START_BATCH_MAX", "1000"))
 
 # CORS Configuration
 # Defaults to "*" for development but can be restricted via environment variable.
@@ -35,10 +47,21 @@ async def lifespan(app: FastAPI):
     # Startup: Start stale task cleanup in the background
     cleanup_task = asyncio.create_task(cleanup_background_task())
     logger.info("Background cleanup task started")
+    load_controller.start()
+    await registry.start()
+    if process_executor.in_use:
+        await process_executor.warm()
+    await worker_executor.start()
     yield
     # Shutdown: Clean up tasks
     cleanup_task.cancel()
+    await load_controller.stop()
     await registry.cleanup_tasks()
+    await registry.close()
+    await worker_executor.close()
+    await router.close()
+    process_executor.shutdown()
+    thread_executor.shutdown()
     logger.info("Server shutdown: Cleaned up active tasks")
 
 async def cleanup_background_task():
@@ -67,10 +90,33 @@ app.add_middleware(
 
 class TaskStartRequest(BaseModel):
     args: Dict[str, Any] = {}
+    # Admission priority (higher starts first when tasks are queued); defaults to the API key's priority
+    priority: Optional[int] = None
 
 class TaskStartResponse(BaseModel):
     call_id: str
     stream_url: str
+    # True when the result comes from the result cache rather than a new run
+    cached: bool = False
+    # True when the start attached to an identical run already in flight (single-flight tools)
+    shared: bool = False
+
+class BatchTaskItem(BaseModel):
+    tool_name: str
+    args: Dict[str, Any] = {}
+    priority: Optional[int] = None
+
+class BatchStartRequest(BaseModel):
+    tasks: List[BatchTaskItem] = Field(..., max_length=START_BATCH_MAX)
+
+class BatchStopRequest(BaseModel):
+    call_ids: List[str] = []
+    # Also stop every task of this tool started with the caller's API key
+    tool_name: Optional[str] = None
+
+class MuxUpdateRequest(BaseModel):
+    add: List[str] = []
+    remove: List[str] = []
 
 class InputProvideRequest(BaseModel):
     call_id: str
@@ -83,105 +129,359 @@ async def list_tools(authenticated: bool = Depends(verify_api_key)):
     """
     return registry.list_tools()
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    `If-None-Match` as RFC 9110 evaluates it: `*` matches any current representation, and tags are
+    compared weakly, so `W/"x"` matches `"x"`.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+@app.get("/tools/schema")
+async def tool_schemas(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    authenticated: bool = Depends(verify_api_key)
+):
+    """
+    JSON Schemas of every tool's arguments, so clients can validate before starting a task.
+    The document is built once and carries an ETag; a matching `If-None-Match` gets an empty 304.
+    """
+    _, body, etag = registry.tool_schemas()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.post("/start_task/{tool_name}", response_model=TaskStartResponse)
 async def start_task(
     tool_name: str, 
+    http_request: Request,
     request: Optional[TaskStartRequest] = None, 
     authenticated: bool = Depends(verify_api_key)
 ):
     """
     Starts a tool execution and returns a call_id to stream progress.
+    If the server is at its concurrency limit the task waits in the admission queue,
+    reporting its place through `queued` events on the stream.
+    """
+    call_id, stream = await launch_task(tool_name, http_request, request)
+    return TaskStartResponse(
+        call_id=call_id,
+        stream_url=f"/stream/{call_id}",
+        cached=is_replay(stream.gen),
+        shared=stream.run_call_id != call_id
+    )
+
+@app.post("/start_stream/{tool_name}")
+async def start_and_stream_task(
+    tool_name: str,
+    http_request: Request,
+    request: Optional[TaskStartRequest] = None,
+    coalesce: Optional[float] = Query(None, gt=0, description="Collapse progress events within this window (seconds) to the latest one for this subscriber."),
+    delta: bool = Query(False, description="Send progress as `progress_delta` events carrying only changed fields, with periodic full keyframes."),
+    authenticated: bool = Depends(verify_api_key)
+):
+    """
+    Starts a tool execution and streams it in the same response, saving the round trip to `/stream/{call_id}`.
+    The first event is `task_started` (id 0) carrying the call_id; the rest is exactly what `/stream/{call_id}`
+    delivers, so a dropped connection can resume there with `Last-Event-ID`.
+    """
+    call_id, stream = await launch_task(tool_name, http_request, request)
+    await registry.mark_consumed(call_id)
+    started = {"tool_name": tool_name, "cached": is_replay(stream.gen), "shared": stream.run_call_id != call_id}
+    first = EventEncoder(call_id).encode(0, "task_started", started)
+    return sse_response(stream, call_id, tool_name, coalesce=coalesce, delta=delta, first=first)
+
+@app.post("/start_tasks")
+async def start_tasks(
+    batch: BatchStartRequest,
+    http_request: Request,
+    authenticated: bool = Depends(verify_api_key)
+):
+    """
+    Starts many tasks with one request. Results come back in request order: each is either
+    `{"call_id", "tool_name", "stream_url", ...}` or `{"tool_name", "error"}` for a task that could not start.
+    """
+    await admit_http()
+    results = await start_batch([(item.tool_name, item.args, item.priority) for item in batch.tasks], api_key_from(http_request))
+    for result in results:
+        if "call_id" in result:
+            result["stream_url"] = f"/stream/{result['call_id']}"
+    return {"results": results}
+
+async def start_batch(items: List[Any], api_key: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Starts (tool_name, args, priority) items with a single registry operation. Unknown tools and malformed
+    items are reported without reaching the registry; the rest are validated and registered together.
+    """
+    results: List[Dict[str, Any]] = []
+    entries = []
+    for tool_name, args, priority in items:
+        if not registry.get_tool(tool_name):
+            results.append({"tool_name": tool_name, "error": f"Tool not found: {tool_name}"})
+        elif not isinstance(args, dict):
+            results.append({"tool_name": tool_name, "error": "args must be an object"})
+        else:
+            call_id = new_call_id()
+            entries.append((call_id, tool_name, args, resolve_priority(priority, api_key)))
+            results.append({"call_id": call_id, "tool_name": tool_name})
+    started = iter(await registry.start_tasks(entries, owner=api_key))
+    for result in results:
+        if "call_id" not in result:
+            continue
+        stream = next(started)
+        if isinstance(stream, Exception):
+            logger.error(f"Error starting tool {result['tool_name']} in batch: {stream}")
+            del result["call_id"]
+            result["error"] = str(stream)
+            continue
+        if is_replay(stream.gen):
+            result["cached"] = True
+        if stream.run_call_id != result["call_id"]:
+            result["shared"] = True
+    return results
+
+OVERLOADED_DETAIL = "Server overloaded, retry later"
+
+async def admit_http():
+    """Admission for HTTP task starts: raises 503 with a Retry-After header while the server is overloaded."""
+    retry_after = await load_controller.admit("http")
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=OVERLOADED_DETAIL,
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def ws_overload_error(request_id: Optional[str]) -> Optional[Dict[str, Any]]:
     """
+    The retryable error for a WS start while the server is overloaded, or None if it may go ahead.
+    Never deferred: waiting would hold up the connection's pings, stops and input.
+    """
+    retry_after = load_controller.check("ws")
+    if retry_after is None:
+        return None
+    return {
+        "type": "error",
+        "request_id": request_id,
+        "payload": {"detail": OVERLOADED_DETAIL, "retryable": True, "retry_after": retry_after}
+    }
+
+def new_call_id() -> str:
+    """A call_id naming the node (and, in multi-worker mode, the worker) that runs the task."""
+    return router.tag(registry.new_call_id())
+
+async def launch_task(tool_name: str, http_request: Request, request: Optional[TaskStartRequest]):
+    """Validates and starts a task for the HTTP endpoints. Returns its call_id and stream."""
     tool = registry.get_tool(tool_name)
     if not tool:
         raise HTTPException(status_code=404, detail=f"Tool not found: {tool_name}")
     
-    call_id = str(uuid.uuid4())
+    await admit_http()
+    
+    call_id = new_call_id()
     
     args = request.args if request else {}
+    priority = resolve_priority(request.priority if request else None, api_key_from(http_request))
     
     try:
-        # Create the generator but don't start consuming yet
-        gen = tool(**args)
-        await registry.store_task(call_id, gen, tool_name)
+        # The producer starts right away (or attaches to an identical run of a single-flight tool)
+        stream = await registry.start_task(call_id, tool_name, args, priority=priority, owner=api_key_from(http_request))
     except Exception as e:
         logger.error(f"Error starting tool {tool_name}: {e}")
         raise HTTPException(status_code=400, detail=str(e))
-    
-    return TaskStartResponse(
-        call_id=call_id,
-        stream_url=f"/stream/{call_id}"
-    )
+    return call_id, stream
 
 @app.get("/stream/{call_id}")
 @app.get("/stream")
 async def stream_task(
+    http_request: Request,
     call_id: Optional[str] = None,
     cid: Optional[str] = Query(None, alias="call_id"),
+    since: Optional[int] = Query(None, ge=0, description="Resume after this event id. Equivalent to the Last-Event-ID header."),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    coalesce: Optional[float] = Query(None, gt=0, description="Collapse progress events within this window (seconds) to the latest one for this subscriber."),
+    delta: bool = Query(False, description="Send progress as `progress_delta` events carrying only changed fields, with periodic full keyframes."),
     authenticated: bool = Depends(verify_api_key)
 ):
     """
     SSE endpoint to stream progress and results for a task.
+    Every event carries an `id:` field; reconnecting with `Last-Event-ID` (or `?since=`)
+    replays only the missed events from the task's ring buffer and then continues live.
     """
     actual_call_id = call_id or cid
     if not actual_call_id:
         raise HTTPException(status_code=400, detail="call_id is required")
 
+    node = router.owner(actual_call_id, http_request)
+    if node:
+        return await router.forward(http_request, node, stream=True)
+
+    if since is None and last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid Last-Event-ID: {last_event_id}")
+
     task_data = await registry.get_task(actual_call_id)
     if not task_data:
-        raise HTTPException(status_code=404, detail="Task not found or already being streamed")
+        raise HTTPException(status_code=404, detail="Task not found")
     
-    gen = task_data["gen"]
-    tool_name = task_data["tool_name"]
+    return sse_response(task_data.stream, actual_call_id, task_data.tool_name, since=since, coalesce=coalesce, delta=delta)
 
+def sse_response(
+    stream: TaskStream,
+    call_id: str,
+    tool_name: str,
+    since: Optional[int] = None,
+    coalesce: Optional[float] = None,
+    delta: bool = False,
+    first: Optional[EncodedEvent] = None
+) -> StreamingResponse:
+    """The `text/event-stream` response for one subscriber of a task, optionally led by a `first` event."""
     async def event_generator():
-        call_id_var.set(actual_call_id)
+        call_id_var.set(call_id)
         tool_name_var.set(tool_name)
         
-        start_time = time.perf_counter()
-        status = "success"
-        
+        sub = stream.subscribe(since=since, coalesce=coalesce, delta=delta)
         try:
-            async for item in gen:
-                if isinstance(item, ProgressPayload):
-                    TASK_PROGRESS_STEPS_TOTAL.labels(tool_name=tool_name).inc()
-                    event = ProgressEvent(call_id=actual_call_id, type="progress", payload=item)
-                elif isinstance(item, dict) and item.get("type") == "input_request":
-                    event = ProgressEvent(call_id=actual_call_id, type="input_request", payload=item["payload"])
-                else:
-                    event = ProgressEvent(call_id=actual_call_id, type="result", payload=item)
-                
-                yield await format_sse(event)
-                
+            if first is not None:
+                yield first.sse
+            async for event in sub:
+                yield event.sse
         except asyncio.CancelledError:
-            status = "cancelled"
-            logger.info(f"Task {actual_call_id} was cancelled by client")
-            await gen.aclose()
-        except Exception as e:
-            status = "error"
-            logger.error(f"Error during task {actual_call_id} execution: {e}")
-            error_event = ProgressEvent(
-                call_id=actual_call_id, 
-                type="error", 
-                payload={"detail": str(e)}
-            )
-            yield await format_sse(error_event)
+            logger.info(f"SSE client disconnected from task {call_id}")
         finally:
-            duration = time.perf_counter() - start_time
-            TASK_DURATION.labels(tool_name=tool_name).observe(duration)
-            TASKS_TOTAL.labels(tool_name=tool_name, status=status).inc()
-            
-            await registry.remove_task(actual_call_id)
-            logger.info(f"Stream finished for task: {actual_call_id} (duration: {duration:.2f}s, status: {status})")
+            # Keep the task around so the client can resume with Last-Event-ID
+            await release_subscription(stream, sub, linger=SSE_RESUME_GRACE)
+            logger.info(f"Stream finished for task: {call_id} (status: {stream.status})")
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream"
+    )
+
+@app.get("/stream_multi")
+async def stream_multi(
+    http_request: Request,
+    call_id: List[str] = Query([], description="Tasks to stream; repeat the parameter for more."),
+    tool_name: List[str] = Query([], description="Also stream every task of these tools, including ones started later."),
+    mine: bool = Query(False, description="Also stream every task started with this request's API key, including ones started later."),
+    coalesce: Optional[float] = Query(None, gt=0, description="Collapse progress events within this window (seconds) to the latest one, per task."),
+    delta: bool = Query(False, description="Send progress as `progress_delta` events carrying only changed fields, with periodic full keyframes."),
+    authenticated: bool = Depends(verify_api_key)
+):
+    """
+    One SSE stream carrying the events of many tasks, so a dashboard needs a single connection.
+    The first event is `mux_started` with the `mux_id` used to add and remove tasks through
+    `POST /stream_multi/{mux_id}`. Events are the tasks' own event JSON without `id:` lines, since
+    per-task ids would collide on one connection; a `stream_end` event follows each task's last one.
+    Watched tasks count as consumed, and watching never stops a task.
+    """
+    api_key = api_key_from(http_request)
+    mux = StreamMux(
+        coalesce=coalesce,
+        delta=delta,
+        tool_names=tool_name or None,
+        owners={api_key} if mine else None,
+        api_key=api_key,
+        release=release_watcher
+    )
+    for cid in call_id:
+        record = await registry.get_task(cid)
+        if record:
+            mux.attach(cid, record)
+    if mux.filtered:
+        mux.follow(registry)
+    muxes[mux.mux_id] = mux
+
+    async def event_generator():
+        try:
+            async for frame in mux.frames():
+                yield frame
+        except asyncio.CancelledError:
+            logger.info(f"SSE client disconnected from multiplexed stream {mux.mux_id}")
+        finally:
+            muxes.pop(mux.mux_id, None)
+            mux.close()
 
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream"
     )
 
+@app.post("/stream_multi/{mux_id}")
+async def update_stream_multi(
+    mux_id: str,
+    update: MuxUpdateRequest,
+    http_request: Request,
+    authenticated: bool = Depends(verify_api_key)
+):
+    """Adds tasks to, or removes them from, an open multiplexed stream."""
+    mux = muxes.get(mux_id)
+    if not mux or mux.api_key != api_key_from(http_request):
+        raise HTTPException(status_code=404, detail="Multiplexed stream not found")
+    added, not_found = [], []
+    for cid in update.add:
+        record = await registry.get_task(cid)
+        if record is None:
+            not_found.append(cid)
+        elif mux.attach(cid, record):
+            added.append(cid)
+    removed = [cid for cid in update.remove if mux.detach(cid)]
+    return {"added": added, "removed": removed, "not_found": not_found, "call_ids": mux.call_ids}
+
+async def release_subscription(stream: TaskStream, sub: Subscription, linger: float = 0.0):
+    """
+    Detaches a subscriber. Once nobody is attached, the task is dropped from the registry
+    (cancelling it if still running) either right away or, with `linger`, after that many
+    seconds unless a subscriber re-attaches in the meantime.
+    """
+    stream.unsubscribe(sub, cancel_if_idle=linger <= 0)
+    if stream.subscriber_count or not stream.is_local:
+        # Viewers of a task running on another instance never stop it
+        return
+    if linger <= 0:
+        await registry.remove_task(stream.call_id)
+    else:
+        asyncio.create_task(expire_idle_task(stream, linger))
+
+def release_watcher(stream: TaskStream, sub: Subscription):
+    """
+    Detaches a multiplexed viewer. Watching never stops a task, but once nobody is attached a
+    finished task is dropped after the SSE resume grace period, and a running one when it finishes.
+    """
+    stream.unsubscribe(sub, cancel_if_idle=False)
+    if stream.subscriber_count or not stream.is_local:
+        return
+    if stream.finished:
+        asyncio.create_task(expire_idle_task(stream, SSE_RESUME_GRACE))
+    else:
+        stream.task.add_done_callback(
+            lambda _: None if stream.subscriber_count else asyncio.create_task(expire_idle_task(stream, SSE_RESUME_GRACE))
+        )
+
+async def expire_idle_task(stream: TaskStream, linger: float):
+    await asyncio.sleep(linger)
+    if stream.subscriber_count or stream.idle_since is None:
+        return
+    if asyncio.get_running_loop().time() - stream.idle_since < linger:
+        # Someone re-attached and left again since; their own timer will handle it
+        return
+    task_data = await registry.get_task_no_consume(stream.call_id)
+    if task_data and task_data.stream is stream:
+        logger.info(f"Task {stream.call_id} had no subscribers for {linger}s, removing", extra={"call_id": stream.call_id})
+        await registry.remove_task(stream.call_id)
+
 @app.post("/provide_input")
-async def provide_input(request: InputProvideRequest, authenticated: bool = Depends(verify_api_key)):
-    if await input_manager.provide_input(request.call_id, request.value):
+async def provide_input(request: InputProvideRequest, http_request: Request, authenticated: bool = Depends(verify_api_key)):
+    node = router.owner(request.call_id, http_request)
+    if node:
+        return await router.forward(http_request, node)
+    if await registry.provide_input(request.call_id, request.value):
         return {"status": "input accepted"}
     else:
         raise HTTPException(status_code=404, detail=f"No task waiting for input with call_id: {request.call_id}")
@@ -189,6 +489,7 @@ async def provide_input(request: InputProvideRequest, authenticated: bool = Depe
 @app.post("/stop_task/{call_id}")
 @app.post("/stop_task")
 async def stop_task(
+    http_request: Request,
     call_id: Optional[str] = None, 
     cid: Optional[str] = Query(None, alias="call_id"),
     authenticated: bool = Depends(verify_api_key)
@@ -197,17 +498,50 @@ async def stop_task(
     if not actual_call_id:
         raise HTTPException(status_code=400, detail="call_id is required")
 
+    node = router.owner(actual_call_id, http_request)
+    if node:
+        return await router.forward(http_request, node)
+
     task_data = await registry.get_task_no_consume(actual_call_id)
     if not task_data:
         raise HTTPException(status_code=404, detail="Task not found or already finished")
     
-    await task_data["gen"].aclose()
-    
-    if not task_data["consumed"]:
-        await registry.remove_task(actual_call_id)
+    # Removing the task cancels its producer; attached subscribers receive the end of the stream
+    await registry.remove_task(actual_call_id)
         
     return {"status": "stop signal sent"}
 
+@app.post("/stop_tasks")
+async def stop_tasks(
+    request: BatchStopRequest,
+    http_request: Request,
+    authenticated: bool = Depends(verify_api_key)
+):
+    """Stops many tasks at once: the given call_ids plus, with `tool_name`, the caller's own tasks of that tool."""
+    targets = list(dict.fromkeys(request.call_ids))
+    if request.tool_name:
+        api_key = api_key_from(http_request)
+        targets += [
+            call_id for call_id, record in registry.list_tasks()
+            if record.tool_name == request.tool_name and record.owner == api_key and call_id not in targets
+        ]
+    stopped = await registry.remove_tasks(targets)
+    found = set(stopped)
+    return {"stopped": stopped, "not_found": [call_id for call_id in request.call_ids if call_id not in found]}
+
+@app.get("/load")
+async def load():
+    """
+    Current saturation of this instance, for load balancer weighting. Unauthenticated, like /metrics.
+    `saturation` is the smoothed event-loop lag relative to the shedding threshold.
+    """
+    return {
+        **load_controller.snapshot(),
+        "running_tasks": scheduler.running,
+        "queued_tasks": scheduler.queued,
+        "max_concurrent_tasks": scheduler.max_concurrent,
+    }
+
 @app.get("/metrics")
 async def metrics():
     from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
@@ -220,7 +554,10 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     Bi-directional WebSocket endpoint for executing tools and receiving progress.
     """
-    await websocket.accept()
+    # Machine clients can ask for a binary wire format via Sec-WebSocket-Protocol; JSON is the default
+    offered = websocket.scope.get("subprotocols", [])
+    codec = negotiate_codec(offered)
+    await websocket.accept(subprotocol=accepted_subprotocol(codec, offered))
     
     try:
         await verify_api_key_ws(websocket)
@@ -230,23 +567,22 @@ async def websocket_endpoint(websocket: WebSocket):
     logger.info("WebSocket connection established")
     
     active_tasks: Dict[str, asyncio.Task] = {}
-    # Use a lock to ensure only one task can send over the websocket at a time
-    send_lock = asyncio.Lock()
-
-    async def safe_send_json(data: dict):
-        async with send_lock:
-            try:
-                await websocket.send_json(data)
-            except Exception as e:
-                # If the websocket is closed, we might get an error here
-                logger.error(f"Error sending WS message: {e}")
-                raise
+    # All writes go through a single writer coroutine; handlers and task subscriptions only enqueue
+    try:
+        writer = WebSocketWriter(websocket, policy=websocket.query_params.get("overflow", WS_OVERFLOW_POLICY), codec=codec)
+    except ValueError as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+        return
+    if websocket.query_params.get("batch") in ("1", "true"):
+        writer.enable_batching()
+    writer.start()
+    safe_send_json = writer.send_json
 
     try:
         while True:
             try:
                 # Add a heartbeat timeout (client pings periodically)
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=WS_HEARTBEAT_TIMEOUT)
+                data = await asyncio.wait_for(receive_frame(websocket), timeout=WS_HEARTBEAT_TIMEOUT)
                 
                 # Check message size
                 if len(data) > WS_MESSAGE_SIZE_LIMIT:
@@ -257,7 +593,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     })
                     continue
 
-                message = json.loads(data)
+                message = codec.decode(data)
                 if not isinstance(message, dict):
                     logger.warning(f"Received non-dictionary message over WebSocket: {type(message)}")
                     await safe_send_json({
@@ -268,11 +604,11 @@ async def websocket_endpoint(websocket: WebSocket):
             except asyncio.TimeoutError:
                 logger.warning("WebSocket heartbeat timeout exceeded")
                 break
-            except json.JSONDecodeError:
-                logger.warning("Received invalid JSON over WebSocket")
+            except ValueError:
+                logger.warning(f"Received invalid {codec.name} over WebSocket")
                 await safe_send_json({
                     "type": "error",
-                    "payload": {"detail": "Invalid JSON received"}
+                    "payload": {"detail": f"Invalid {codec.name} received"}
                 })
                 continue
             except WebSocketDisconnect:
@@ -289,18 +625,41 @@ async def websocket_endpoint(websocket: WebSocket):
                 await safe_send_json({"type": "pong"})
                 continue
 
+            if msg_type == "hello":
+                # Capability negotiation; anything not understood is left out of the reply
+                capabilities = message.get("capabilities")
+                accepted = {}
+                if isinstance(capabilities, list) and "batch" in capabilities:
+                    accepted["batch"] = writer.enable_batching(**parse_batch_options(message.get("batch")))
+                await safe_send_json({
+                    "type": "hello_success",
+                    "capabilities": accepted,
+                    "request_id": request_id
+                })
+                continue
+
             if msg_type == "list_tools":
                 tools = registry.list_tools()
-                await safe_send_json({
+                response = {
                     "type": "tools_list",
                     "tools": tools,
                     "request_id": request_id
-                })
+                }
+                if message.get("schema") is True:
+                    # Schemas are only sent when the client's copy (identified by its etag) is out of date
+                    schemas, _, etag = registry.tool_schemas()
+                    response["etag"] = etag
+                    if message.get("etag") == etag:
+                        response["not_modified"] = True
+                    else:
+                        response["schemas"] = schemas
+                await safe_send_json(response)
                 continue
 
             if msg_type == "start":
                 tool_name = message.get("tool_name")
                 args = message.get("args", {})
+                coalesce = parse_coalesce(message.get("coalesce"))
                 
                 tool = registry.get_tool(tool_name)
                 if not tool:
@@ -311,19 +670,33 @@ async def websocket_endpoint(websocket: WebSocket):
                     })
                     continue
                 
-                call_id = str(uuid.uuid4())
+                overloaded = ws_overload_error(request_id)
+                if overloaded:
+                    await safe_send_json(overloaded)
+                    continue
+                
+                call_id = new_call_id()
                 
                 try:
-                    gen = tool(**args)
-                    await registry.store_task(call_id, gen, tool_name)
+                    api_key = api_key_from(websocket)
+                    priority = resolve_priority(message.get("priority"), api_key)
+                    stream = await registry.start_task(call_id, tool_name, args, priority=priority, owner=api_key)
                     await registry.mark_consumed(call_id)
-                    await safe_send_json({
+                    started = {
                         "type": "task_started", 
                         "call_id": call_id, 
                         "tool_name": tool_name, 
                         "request_id": request_id
-                    })
-                    task = asyncio.create_task(run_ws_generator(safe_send_json, call_id, tool_name, gen, active_tasks))
+                    }
+                    if is_replay(stream.gen):
+                        started["cached"] = True
+                    if stream.run_call_id != call_id:
+                        started["shared"] = True
+                    await safe_send_json(started)
+                    task = asyncio.create_task(run_ws_generator(
+                        writer.send_event, call_id, tool_name, stream, active_tasks,
+                        coalesce=coalesce, delta=message.get("delta") is True
+                    ))
                     active_tasks[call_id] = task
                 except Exception as e:
                     logger.error(f"Failed to start tool {tool_name} via WS: {e}", extra={"tool_name": tool_name})
@@ -333,13 +706,102 @@ async def websocket_endpoint(websocket: WebSocket):
                         "request_id": request_id,
                         "payload": {"detail": str(e)}
                     })
-                    # If store_task failed but gen was created, it's handled in store_task
             
+            elif msg_type == "start_batch":
+                items = message.get("tasks")
+                if not isinstance(items, list) or len(items) > START_BATCH_MAX:
+                    await safe_send_json({
+                        "type": "error",
+                        "request_id": request_id,
+                        "payload": {"detail": f"tasks must be a list of at most {START_BATCH_MAX} items"}
+                    })
+                    continue
+                
+                overloaded = ws_overload_error(request_id)
+                if overloaded:
+                    await safe_send_json(overloaded)
+                    continue
+                
+                results = await start_batch(
+                    [
+                        (item.get("tool_name"), item.get("args", {}), item.get("priority")) if isinstance(item, dict) else (None, None, None)
+                        for item in items
+                    ],
+                    api_key_from(websocket)
+                )
+                coalesce = parse_coalesce(message.get("coalesce"))
+                for result in results:
+                    if "call_id" not in result:
+                        continue
+                    call_id = result["call_id"]
+                    await registry.mark_consumed(call_id)
+                    record = await registry.get_task_no_consume(call_id)
+                    active_tasks[call_id] = asyncio.create_task(run_ws_generator(
+                        writer.send_event, call_id, result["tool_name"], record.stream, active_tasks,
+                        coalesce=coalesce, delta=message.get("delta") is True
+                    ))
+                await safe_send_json({
+                    "type": "batch_started",
+                    "results": results,
+                    "request_id": request_id
+                })
+
+            elif msg_type == "subscribe":
+                call_id = message.get("call_id")
+                task_data = await registry.get_task(call_id) if call_id else None
+                if not task_data:
+                    await safe_send_json({
+                        "type": "error",
+                        "call_id": call_id,
+                        "request_id": request_id,
+                        "payload": {"detail": f"No active task found with call_id: {call_id}"}
+                    })
+                elif call_id in active_tasks:
+                    await safe_send_json({
+                        "type": "error",
+                        "call_id": call_id,
+                        "request_id": request_id,
+                        "payload": {"detail": f"Already subscribed to task: {call_id}"}
+                    })
+                else:
+                    tool_name = task_data.tool_name
+                    await safe_send_json({
+                        "type": "subscribe_success",
+                        "call_id": call_id,
+                        "tool_name": tool_name,
+                        "request_id": request_id
+                    })
+                    task = asyncio.create_task(run_ws_generator(
+                        writer.send_event, call_id, tool_name, task_data.stream, active_tasks,
+                        coalesce=parse_coalesce(message.get("coalesce")),
+                        delta=message.get("delta") is True
+                    ))
+                    active_tasks[call_id] = task
+
+            elif msg_type == "unsubscribe":
+                call_id = message.get("call_id")
+                if call_id in active_tasks:
+                    active_tasks[call_id].cancel()
+                    await safe_send_json({
+                        "type": "unsubscribe_success",
+                        "call_id": call_id,
+                        "request_id": request_id
+                    })
+                else:
+                    await safe_send_json({
+                        "type": "error",
+                        "call_id": call_id,
+                        "request_id": request_id,
+                        "payload": {"detail": f"Not subscribed to task: {call_id}"}
+                    })
+
             elif msg_type == "stop":
                 call_id = message.get("call_id")
                 if call_id in active_tasks:
                     logger.info(f"Stopping task {call_id} via WebSocket request", extra={"call_id": call_id})
                     active_tasks[call_id].cancel()
+                    # Stop the task itself, not just this connection's subscription
+                    await registry.remove_task(call_id)
                     # Final progress update
                     await safe_send_json({
                         "call_id": call_id,
@@ -360,10 +822,47 @@ async def websocket_endpoint(websocket: WebSocket):
                         "payload": {"detail": f"No active task found with call_id: {call_id}"}
                     })
             
+            elif msg_type == "stop_many":
+                # By call_ids, by tool name, or everything this connection is running ("all": true)
+                requested = message.get("call_ids")
+                if not isinstance(requested, list):
+                    requested = []
+                tool_name = message.get("tool_name")
+                stop_all = message.get("all") is True
+                targets = []
+                for call_id in list(active_tasks):
+                    if stop_all or call_id in requested:
+                        targets.append(call_id)
+                    elif tool_name:
+                        record = await registry.get_task_no_consume(call_id)
+                        if record and record.tool_name == tool_name:
+                            targets.append(call_id)
+                for call_id in targets:
+                    active_tasks[call_id].cancel()
+                stopped = await registry.remove_tasks(targets)
+                for call_id in targets:
+                    await safe_send_json({
+                        "call_id": call_id,
+                        "type": "progress",
+                        "payload": {"step": "Cancelled", "pct": 0, "log": "Task stopped by user."}
+                    })
+                await safe_send_json({
+                    "type": "stop_many_success",
+                    "stopped": stopped,
+                    "not_found": [call_id for call_id in requested if call_id not in targets],
+                    "request_id": request_id
+                })
+
             elif msg_type == "input":
                 call_id = message.get("call_id")
                 value = message.get("value")
-                if await input_manager.provide_input(call_id, value):
+                node = router.owner(call_id)
+                if node:
+                    response = await router.call(node, "/provide_input", {"call_id": call_id, "value": value}, api_key_from(websocket))
+                    accepted = response is not None and response.status_code == 200
+                else:
+                    accepted = bool(call_id) and await registry.provide_input(call_id, value)
+                if accepted:
                     logger.info(f"Input received for task {call_id}", extra={"call_id": call_id})
                     # Command acknowledgment
                     await safe_send_json({
@@ -389,6 +888,8 @@ async def websocket_endpoint(websocket: WebSocket):
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
+    except WebSocketClosed:
+        logger.info("WebSocket closed by writer")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
@@ -396,48 +897,72 @@ async def websocket_endpoint(websocket: WebSocket):
             logger.info(f"Cleaning up {len(active_tasks)} WebSocket tasks due to disconnect/timeout")
             for task in active_tasks.values():
                 task.cancel()
+        await writer.close()
+
+async def receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """Receives the next text or binary frame; the connection's codec decides how to read it."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    text = message.get("text")
+    return text if text is not None else message.get("bytes", b"")
 
-async def run_ws_generator(send_fn, call_id: str, tool_name: str, gen, active_tasks: Dict[str, asyncio.Task]):
+def parse_coalesce(value: Any) -> Optional[float]:
+    """Reads an optional per-subscription coalescing window from a WebSocket message."""
+    try:
+        window = float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+    return window if window and window > 0 else None
+
+def resolve_priority(requested: Any, api_key: Optional[str]) -> int:
+    """A task's admission priority: the one requested if it is an integer, otherwise the API key's default."""
+    if isinstance(requested, int) and not isinstance(requested, bool):
+        return requested
+    return priority_for_api_key(api_key)
+
+def parse_batch_options(options: Any) -> Dict[str, Any]:
+    """Reads the optional batching limits a client sent with its `hello` message."""
+    parsed = {}
+    if not isinstance(options, dict):
+        return parsed
+    for key, cast in (("window", float), ("max_events", int), ("max_bytes", int)):
+        try:
+            if options.get(key) is not None:
+                parsed[key] = cast(options[key])
+        except (TypeError, ValueError):
+            continue
+    return parsed
+
+async def run_ws_generator(
+    send_fn,
+    call_id: str,
+    tool_name: str,
+    stream: TaskStream,
+    active_tasks: Dict[str, asyncio.Task],
+    coalesce: Optional[float] = None,
+    delta: bool = False
+):
     call_id_var.set(call_id)
     tool_name_var.set(tool_name)
     
-    start_time = time.perf_counter()
-    status = "success"
-    
-    logger.info(f"Starting WS execution for task: {call_id}")
+    logger.info(f"Starting WS subscription for task: {call_id}")
+    sub = stream.subscribe(coalesce=coalesce, delta=delta)
+    # Deltas build on every earlier frame, so none of them may be dropped on the way out
+    send = functools.partial(send_fn, droppable=False) if delta else send_fn
     try:
-        async for item in gen:
-            if isinstance(item, ProgressPayload):
-                TASK_PROGRESS_STEPS_TOTAL.labels(tool_name=tool_name).inc()
-                event = ProgressEvent(call_id=call_id, type="progress", payload=item)
-            elif isinstance(item, dict) and item.get("type") == "input_request":
-                event = ProgressEvent(call_id=call_id, type="input_request", payload=item["payload"])
-            else:
-                event = ProgressEvent(call_id=call_id, type="result", payload=item)
-            
-            await send_fn(event.model_dump())
+        async for event in sub:
+            await send(event)
             
     except asyncio.CancelledError:
-        status = "cancelled"
-        logger.info(f"WS task {call_id} cancelled")
-        await gen.aclose()
+        logger.info(f"WS subscription {call_id} cancelled")
     except Exception as e:
-        status = "error"
-        logger.error(f"Error during WS task {call_id}: {e}")
-        event = ProgressEvent(call_id=call_id, type="error", payload={"detail": str(e)})
-        try:
-            await send_fn(event.model_dump())
-        except:
-            pass
+        logger.error(f"Error sending WS events for task {call_id}: {e}")
     finally:
-        duration = time.perf_counter() - start_time
-        TASK_DURATION.labels(tool_name=tool_name).observe(duration)
-        TASKS_TOTAL.labels(tool_name=tool_name, status=status).inc()
-        
-        await registry.remove_task(call_id)
+        await release_subscription(stream, sub)
         active_tasks.pop(call_id, None)
         
-        logger.info(f"WS task finished: {call_id} (duration: {duration:.2f}s, status: {status})")
+        logger.info(f"WS subscription finished: {call_id} (status: {stream.status})")
 
 # Import tools to register them
 from . import dummy_tool
@@ -16,7 +16,7 @@ TASKS_TOTAL = Counter(
 
 ACTIVE_TASKS = Gauge(
     "adk_active_tasks",
-    "Number of tasks currently in the registry",
+    "Number of tasks whose producer is currently running",
     ["tool_name"]
 )
 
@@ -31,5 +31,101 @@ TASK_PROGRESS_STEPS_TOTAL = Counter(
     ["tool_name"]
 )
 
+STREAM_SUBSCRIBERS = Gauge(
+    "adk_stream_subscribers",
+    "Number of SSE/WebSocket subscribers currently attached to running tasks",
+    ["tool_name"]
+)
+
+SUBSCRIBER_DROPPED_EVENTS_TOTAL = Counter(
+    "adk_subscriber_dropped_events_total",
+    "Total number of progress events dropped for subscribers that fell behind",
+    ["tool_name"]
+)
+
+PROGRESS_COALESCED_TOTAL = Counter(
+    "adk_progress_events_coalesced_total",
+    "Total number of progress events collapsed into a later update by coalescing",
+    ["tool_name"]
+)
+
+WS_OUTBOUND_QUEUE_DEPTH = Gauge(
+    "adk_ws_outbound_queue_depth",
+    "Number of frames waiting in WebSocket outbound queues across all connections"
+)
+
+WS_SEND_LATENCY = Histogram(
+    "adk_ws_send_latency_seconds",
+    "Time spent writing a single frame to a WebSocket connection"
+)
+
+WS_OUTBOUND_DROPPED_TOTAL = Counter(
+    "adk_ws_outbound_dropped_total",
+    "Total number of progress frames dropped from full WebSocket outbound queues"
+)
+
+WS_SLOW_CONSUMER_DISCONNECTS_TOTAL = Counter(
+    "adk_ws_slow_consumer_disconnects_total",
+    "Total number of WebSocket connections closed because their outbound queue was full"
+)
+
+WS_BATCH_EVENTS = Histogram(
+    "adk_ws_batch_events",
+    "Number of frames packed into each WebSocket write on batching connections",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250)
+)
+
+TASKS_QUEUED = Gauge(
+    "adk_tasks_queued",
+    "Number of tasks waiting for admission",
+    ["tool_name"]
+)
+
+TASK_QUEUE_WAIT = Histogram(
+    "adk_task_queue_wait_seconds",
+    "Time tasks spent waiting for admission before their tool started",
+    ["tool_name"]
+)
+
+EVENT_LOOP_LAG = Gauge(
+    "adk_event_loop_lag_seconds",
+    "Smoothed delay between when the event loop should have woken a sampling timer and when it did"
+)
+
+LOAD_SHED_TOTAL = Counter(
+    "adk_load_shed_total",
+    "Total number of task starts rejected because the server was overloaded",
+    ["transport"]
+)
+
+RESULT_CACHE_HITS_TOTAL = Counter(
+    "adk_result_cache_hits_total",
+    "Total number of task starts answered from the result cache",
+    ["tool_name"]
+)
+
+RESULT_CACHE_MISSES_TOTAL = Counter(
+    "adk_result_cache_misses_total",
+    "Total number of task starts of cached tools that had to run the tool",
+    ["tool_name"]
+)
+
+RESULT_CACHE_EVICTIONS_TOTAL = Counter(
+    "adk_result_cache_evictions_total",
+    "Total number of result cache entries evicted",
+    ["tool_name", "reason"]
+)
+
+RESULT_CACHE_BYTES = Gauge(
+    "adk_result_cache_bytes",
+    "Encoded size of everything currently held in the result cache"
+)
+
+SINGLE_FLIGHT_JOINS_TOTAL = Counter(
+    "adk_single_flight_joins_total",
+    "Total number of task starts that attached to an identical run already in flight",
+    ["tool_name"]
+)
+
 def get_metrics():
     return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
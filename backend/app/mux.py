@@ -0,0 +1,128 @@
+import asyncio
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, TYPE_CHECKING
+from pydantic_core import to_json
+from .logger import logger
+from .stream import Subscription
+
+if TYPE_CHECKING:
+    from .bridge import TaskRecord
+
+# MUX_QUEUE_SIZE: Frames buffered for a multiplexed SSE response before its per-task subscriptions start to back up.
+MUX_QUEUE_SIZE = 1000
+# MUX_MAX_TASKS: Most tasks one multiplexed stream may carry at once.
+MUX_MAX_TASKS = 500
+
+class StreamMux:
+    """
+    One SSE response carrying the events of many tasks. Every attached task gets its own Subscription
+    (its own bounded queue, coalescing and delta state), and each event's pre-encoded JSON is forwarded
+    without the per-task `id:` line, which would be ambiguous on a shared connection; the frame is built
+    once per event for all viewers. Tasks can be attached and detached while streaming; with `tool_names`
+    or `owners` (API keys) set, tasks matching the filter are attached as they start. Attaching marks a
+    task consumed and a viewer never stops the tasks it watches. `release(stream, sub)` detaches a
+    viewer's subscription, by default without any further cleanup.
+    """
+    def __init__(
+        self,
+        coalesce: Optional[float] = None,
+        delta: bool = False,
+        tool_names: Optional[Iterable[str]] = None,
+        owners: Optional[Iterable[Optional[str]]] = None,
+        api_key: Optional[str] = None,
+        max_tasks: int = MUX_MAX_TASKS,
+        release: Optional[Callable[[Any, Subscription], None]] = None
+    ):
+        self.mux_id = uuid.uuid4().hex
+        self.coalesce = coalesce
+        self.delta = delta
+        self.tool_names: Optional[Set[str]] = set(tool_names) if tool_names else None
+        self.owners: Optional[Set[Optional[str]]] = set(owners) if owners is not None else None
+        # The key that opened the stream; only it may change the stream's task set
+        self.api_key = api_key
+        self.max_tasks = max_tasks
+        self._release = release or (lambda stream, sub: stream.unsubscribe(sub, cancel_if_idle=False))
+        self._frames: "asyncio.Queue[str]" = asyncio.Queue(maxsize=MUX_QUEUE_SIZE)
+        self._readers: Dict[str, asyncio.Task] = {}
+        self._unwatch: Optional[Callable[[], None]] = None
+
+    @property
+    def filtered(self) -> bool:
+        return self.tool_names is not None or self.owners is not None
+
+    @property
+    def call_ids(self) -> List[str]:
+        return list(self._readers)
+
+    def matches(self, record: "TaskRecord") -> bool:
+        if self.tool_names is not None and record.tool_name not in self.tool_names:
+            return False
+        if self.owners is not None and record.owner not in self.owners:
+            return False
+        return True
+
+    def follow(self, registry) -> int:
+        """Attaches the registry's matching tasks and keeps attaching new ones. Returns how many were attached now."""
+        attached = 0
+        for call_id, record in registry.list_tasks():
+            if self.matches(record) and self.attach(call_id, record):
+                attached += 1
+        self._unwatch = registry.watch(self._on_task_started)
+        return attached
+
+    def attach(self, call_id: str, record: "TaskRecord") -> bool:
+        """Starts forwarding a task's events, replaying the ones it retains first. False if already attached or full."""
+        if call_id in self._readers or len(self._readers) >= self.max_tasks:
+            return False
+        # A watched task is in use, so the stale sweep must not reap it
+        record.consumed = True
+        sub = record.stream.subscribe(coalesce=self.coalesce, delta=self.delta)
+        self._readers[call_id] = asyncio.create_task(self._forward(call_id, record.stream, sub))
+        return True
+
+    def detach(self, call_id: str) -> bool:
+        reader = self._readers.pop(call_id, None)
+        if reader is None:
+            return False
+        reader.cancel()
+        return True
+
+    def open_frame(self) -> str:
+        return f"data: {to_json({'type': 'mux_started', 'mux_id': self.mux_id, 'call_ids': self.call_ids}).decode()}\n\n"
+
+    async def frames(self) -> AsyncIterator[str]:
+        """The SSE frames of the response: `mux_started`, then the attached tasks' events as they arrive."""
+        yield self.open_frame()
+        while True:
+            yield await self._frames.get()
+
+    def close(self):
+        if self._unwatch:
+            self._unwatch()
+            self._unwatch = None
+        for reader in self._readers.values():
+            reader.cancel()
+        self._readers.clear()
+
+    def _on_task_started(self, call_id: str, record: "TaskRecord"):
+        if self.matches(record):
+            self.attach(call_id, record)
+
+    async def _forward(self, call_id: str, stream, sub: Subscription):
+        try:
+            async for event in sub:
+                await self._frames.put(event.encoded_as("mux", lambda: f"data: {event.data}\n\n"))
+            # Tells the viewer the task is over, including when it was cancelled without a final event
+            end = {"call_id": call_id, "type": "stream_end", "payload": {"status": stream.status}}
+            await self._frames.put(f"data: {to_json(end).decode()}\n\n")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error forwarding task {call_id} to multiplexed stream {self.mux_id}: {e}")
+        finally:
+            self._release(stream, sub)
+            if self._readers.get(call_id) is asyncio.current_task():
+                del self._readers[call_id]
+
+# mux_id -> open multiplexed stream
+muxes: Dict[str, StreamMux] = {}
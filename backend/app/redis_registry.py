@@ -0,0 +1,282 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Set, Tuple
+from .bridge import InMemoryRegistry, TaskRecord
+from .stream import TaskStream, ForeignTaskStream, Subscription, EncodedEvent, TASK_BUFFER_SIZE
+from .logger import logger
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is only needed when REDIS_URL is set
+    aioredis = None
+
+# REDIS_TASK_TTL: Seconds a running task's keys survive without a new event; only abandoned tasks hit this.
+REDIS_TASK_TTL = int(os.getenv("REDIS_TASK_TTL", "300"))
+# REDIS_FINISHED_TTL: Seconds a finished task stays readable for late viewers and SSE resume.
+REDIS_FINISHED_TTL = int(os.getenv("REDIS_FINISHED_TTL", "300"))
+# REDIS_BLOCK_MS: How long stream readers block in XREAD before re-checking that the task still exists.
+REDIS_BLOCK_MS = 5000
+# REDIS_KEY_PREFIX: Namespace for every key this bridge writes.
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "adk")
+
+def metadata_key(call_id: str) -> str:
+    return f"{REDIS_KEY_PREFIX}:task:{call_id}:metadata"
+
+def events_key(call_id: str) -> str:
+    return f"{REDIS_KEY_PREFIX}:task:{call_id}:events"
+
+def control_key(instance_id: str) -> str:
+    return f"{REDIS_KEY_PREFIX}:control:{instance_id}"
+
+def stream_entries(response: Any) -> List[Tuple[str, Dict[str, str]]]:
+    """Flattens an XREAD reply into (entry_id, fields) pairs."""
+    if not response:
+        return []
+    streams = response.values() if isinstance(response, dict) else (entries for _, entries in response)
+    return [entry for entries in streams for entry in entries]
+
+class RedisMirror:
+    """
+    Copies one task's events into its Redis stream. Event `seq` becomes the entry id (`<seq>-0`),
+    so XREAD from `<Last-Event-ID>-0` is SSE resume. The end of the task is an `end` entry at `<seq>-1`.
+    A background writer pipelines whatever queued up since its last round trip.
+    """
+    def __init__(self, registry: "RedisRegistry", call_id: str):
+        self.client = registry.client
+        self.call_id = call_id
+        self._last_seq = 0
+        self._pending: Deque[Tuple[str, Dict[str, str]]] = deque()
+        self._wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    def push(self, event: EncodedEvent):
+        self._last_seq = event.seq
+        self._pending.append((f"{event.seq}-0", {"type": event.type, "data": event.data}))
+        self._wakeup.set()
+
+    def finish(self, status: str):
+        self._pending.append((f"{self._last_seq}-1", {"type": "end", "status": status}))
+        self._wakeup.set()
+
+    async def _run(self):
+        meta, events = metadata_key(self.call_id), events_key(self.call_id)
+        finished = False
+        try:
+            while not finished:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                pipe = self.client.pipeline(transaction=False)
+                while self._pending:
+                    entry_id, fields = self._pending.popleft()
+                    if fields["type"] == "end":
+                        pipe.hset(meta, mapping={"status": fields["status"]})
+                        finished = True
+                    pipe.xadd(events, fields, id=entry_id, maxlen=TASK_BUFFER_SIZE, approximate=True)
+                ttl = REDIS_FINISHED_TTL if finished else REDIS_TASK_TTL
+                pipe.expire(meta, ttl)
+                pipe.expire(events, ttl)
+                await pipe.execute()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error mirroring task {self.call_id} to Redis: {e}", extra={"call_id": self.call_id})
+
+class RemoteTaskStream(ForeignTaskStream):
+    """A task whose producer runs on another instance, read back from its Redis stream."""
+    def __init__(self, registry: "RedisRegistry", call_id: str, tool_name: str, owner: str, status: str):
+        super().__init__(call_id, tool_name, owner, status)
+        self.registry = registry
+
+    async def stop(self):
+        await self.registry.send_control(self.owner, "stop", self.call_id)
+
+    async def _read(self, sub: Subscription, since: int):
+        client = self.registry.client
+        last_id = f"{since}-0"
+        try:
+            while True:
+                response = await client.xread({events_key(self.call_id): last_id}, count=100, block=REDIS_BLOCK_MS)
+                entries = stream_entries(response)
+                if not entries and not await client.exists(metadata_key(self.call_id)):
+                    logger.warning(f"Task {self.call_id} expired from Redis while being streamed")
+                    return
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    if fields["type"] == "end":
+                        self.status = fields["status"]
+                        return
+                    sub.push(self._decode(int(entry_id.split("-", 1)[0]), fields["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reading task {self.call_id} from Redis: {e}", extra={"call_id": self.call_id})
+        finally:
+            sub.close()
+
+class RedisRegistry(InMemoryRegistry):
+    """
+    Runs producers in this process exactly like InMemoryRegistry, and mirrors every task into Redis
+    so any instance can serve `/stream/{call_id}` or a WS `subscribe` for it:
+
+    - `task:{call_id}:metadata` (hash): tool_name, owner instance, status, created_at, consumed
+    - `task:{call_id}:events` (stream): the task's ring buffer, entry ids are event seqs
+    - `control:{instance_id}` (stream): stop/consumed requests routed to the owning instance
+
+    Task keys carry a TTL instead of being swept: REDIS_TASK_TTL while running (refreshed by every
+    event) and REDIS_FINISHED_TTL once finished. Local producers still use the in-memory stale index.
+    """
+    def __init__(self, client: Any, instance_id: Optional[str] = None):
+        super().__init__()
+        self.client = client
+        self.instance_id = instance_id or os.getenv("INSTANCE_ID") or uuid.uuid4().hex
+        self._mirrors: Set[asyncio.Task] = set()
+        self._listener: Optional[asyncio.Task] = None
+        # Set while start_tasks runs, collecting (call_id, tool_name) whose metadata is written together
+        self._pending_metadata: Optional[List[Tuple[str, str]]] = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisRegistry":
+        if aioredis is None:
+            raise RuntimeError("REDIS_URL is set but the 'redis' package is not installed")
+        return cls(aioredis.from_url(url, decode_responses=True), **kwargs)
+
+    async def store_task(
+        self, call_id: str, gen: AsyncGenerator, tool_name: str, priority: int = 0, owner: Optional[str] = None
+    ) -> TaskStream:
+        self._ensure_listener()
+        stream = await super().store_task(call_id, gen, tool_name, priority, owner)
+        if self._pending_metadata is not None:
+            # Part of a batch start; start_tasks writes every task's metadata in one round trip
+            self._pending_metadata.append((call_id, tool_name))
+        else:
+            await self._write_metadata([(call_id, tool_name)])
+        return stream
+
+    async def start_tasks(self, entries, owner: Optional[str] = None):
+        self._pending_metadata = pending = []
+        try:
+            results = await super().start_tasks(entries, owner=owner)
+        finally:
+            self._pending_metadata = None
+        if pending:
+            await self._write_metadata(pending)
+        return results
+
+    async def remove_tasks(self, call_ids: List[str]) -> List[str]:
+        local = [call_id for call_id in call_ids if call_id in self._active_tasks]
+        removed = await super().remove_tasks(local)
+        for call_id in call_ids:
+            if call_id in local:
+                continue
+            record = await self._remote_record(call_id)
+            if record:
+                if not record.stream.finished:
+                    await record.stream.stop()
+                removed.append(call_id)
+        return removed
+
+    async def _write_metadata(self, tasks: List[Tuple[str, str]]):
+        pipe = self.client.pipeline(transaction=False)
+        for call_id, tool_name in tasks:
+            meta = metadata_key(call_id)
+            pipe.hset(meta, mapping={
+                "tool_name": tool_name,
+                "owner": self.instance_id,
+                "status": "running",
+                "created_at": repr(time.time()),
+                "consumed": "0",
+            })
+            pipe.expire(meta, REDIS_TASK_TTL)
+        await pipe.execute()
+
+    def _create_stream(self, call_id: str, gen: AsyncGenerator, tool_name: str, priority: int = 0) -> TaskStream:
+        stream = super()._create_stream(call_id, gen, tool_name, priority)
+        stream.mirror = RedisMirror(self, call_id)
+        self._mirrors.add(stream.mirror.task)
+        stream.mirror.task.add_done_callback(self._mirrors.discard)
+        return stream
+
+    async def get_task(self, call_id: str) -> Optional[TaskRecord]:
+        record = await super().get_task(call_id)
+        if record:
+            return record
+        record = await self._remote_record(call_id)
+        if record and not record.consumed:
+            record.consumed = True
+            await self._mark_remote_consumed(record)
+        return record
+
+    async def mark_consumed(self, call_id: str):
+        if call_id in self._active_tasks:
+            return await super().mark_consumed(call_id)
+        record = await self._remote_record(call_id)
+        if record and not record.consumed:
+            await self._mark_remote_consumed(record)
+
+    async def get_task_no_consume(self, call_id: str) -> Optional[TaskRecord]:
+        return await super().get_task_no_consume(call_id) or await self._remote_record(call_id)
+
+    async def remove_task(self, call_id: str):
+        if call_id in self._active_tasks:
+            return await super().remove_task(call_id)
+        record = await self._remote_record(call_id)
+        if record and not record.stream.finished:
+            await record.stream.stop()
+
+    async def send_control(self, instance_id: str, op: str, call_id: str):
+        """Routes a request for a task to the instance running its producer."""
+        await self.client.xadd(control_key(instance_id), {"op": op, "call_id": call_id}, maxlen=1000, approximate=True)
+
+    async def close(self):
+        if self._mirrors:
+            # Give mirrors a moment to write the final status of tasks stopped during shutdown
+            await asyncio.wait(list(self._mirrors), timeout=1.0)
+        for task in list(self._mirrors) + ([self._listener] if self._listener else []):
+            task.cancel()
+        self._listener = None
+
+    async def _remote_record(self, call_id: str) -> Optional[TaskRecord]:
+        meta = await self.client.hgetall(metadata_key(call_id))
+        if not meta:
+            return None
+        stream = RemoteTaskStream(self, call_id, meta["tool_name"], meta["owner"], meta["status"])
+        return TaskRecord(
+            gen=None,
+            stream=stream,
+            tool_name=meta["tool_name"],
+            created_at=float(meta["created_at"]),
+            consumed=meta.get("consumed") == "1"
+        )
+
+    async def _mark_remote_consumed(self, record: TaskRecord):
+        await self.client.hset(metadata_key(record.stream.call_id), "consumed", "1")
+        await self.send_control(record.stream.owner, "consumed", record.stream.call_id)
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        # The control stream is per instance id, so reading from the start never sees another process's requests
+        key, last_id = control_key(self.instance_id), "0-0"
+        while True:
+            try:
+                response = await self.client.xread({key: last_id}, block=REDIS_BLOCK_MS)
+                for entry_id, fields in stream_entries(response):
+                    last_id = entry_id
+                    call_id = fields.get("call_id")
+                    if fields.get("op") == "stop":
+                        logger.info(f"Stopping task {call_id} on request from another instance", extra={"call_id": call_id})
+                        await InMemoryRegistry.remove_task(self, call_id)
+                    elif fields.get("op") == "consumed":
+                        await InMemoryRegistry.mark_consumed(self, call_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading Redis control stream: {e}")
+                await asyncio.sleep(1.0)
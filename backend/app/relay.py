@@ -0,0 +1,216 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+from pydantic_core import from_json, to_json
+from .bridge import InMemoryRegistry, TaskRecord
+from .stream import ForeignTaskStream, Subscription
+from .labels import is_label
+from .logger import logger
+
+# WORKER_IPC_DIR: Directory holding one unix socket per worker process. Setting it enables multi-worker mode.
+WORKER_IPC_DIR = os.getenv("WORKER_IPC_DIR")
+# WORKER_ID: This process's label in call_ids and its socket name. Defaults to one derived from the pid,
+# which is unique among the workers of one host (e.g. `uvicorn --workers N`).
+WORKER_ID = os.getenv("WORKER_ID") or f"w{os.getpid()}"
+# RELAY_TIMEOUT: Seconds to wait for another worker to answer a control request (lookup, stop, input).
+RELAY_TIMEOUT = 5.0
+
+def owner_of(call_id: str) -> Optional[str]:
+    """The worker label a call_id was issued by (`<uuid>.<worker>`), or None for plain call_ids."""
+    _, sep, label = call_id.rpartition(".")
+    return label if sep and is_label(label) else None
+
+class RelayTaskStream(ForeignTaskStream):
+    """A task whose producer runs in another worker on this host, streamed over that worker's unix socket."""
+    def __init__(self, registry: "RelayRegistry", call_id: str, tool_name: str, owner: str, status: str):
+        super().__init__(call_id, tool_name, owner, status)
+        self.registry = registry
+
+    async def stop(self):
+        await self.registry.request(self.owner, {"op": "stop", "call_id": self.call_id})
+
+    async def _read(self, sub: Subscription, since: int):
+        writer = None
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.registry.socket_path(self.owner))
+            writer.write(to_json({"op": "stream", "call_id": self.call_id, "since": since}) + b"\n")
+            await writer.drain()
+            # One "<seq> <event json>" line per event, then "end <status>"
+            while line := await reader.readline():
+                head, _, data = line.decode().rstrip("\n").partition(" ")
+                if head == "end":
+                    self.status = data
+                    return
+                sub.push(self._decode(int(head), data))
+            logger.warning(f"Worker {self.owner} closed the stream of task {self.call_id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error relaying task {self.call_id} from worker {self.owner}: {e}", extra={"call_id": self.call_id})
+        finally:
+            if writer:
+                writer.close()
+            sub.close()
+
+class RelayRegistry(InMemoryRegistry):
+    """
+    Multi-worker mode for several worker processes on one host. Each worker runs its own producers like
+    InMemoryRegistry and issues call_ids ending in its label (`<uuid>.<worker>`). A request for another
+    worker's call_id is relayed to that worker over its unix socket (`<ipc_dir>/<worker>.sock`), so
+    `/stream`, `/stop_task`, `/provide_input` and WS `subscribe` work whichever worker the request lands on.
+    """
+    def __init__(self, ipc_dir: str, worker_id: str = WORKER_ID):
+        super().__init__()
+        if not is_label(worker_id):
+            raise ValueError(f"Invalid worker id: {worker_id!r}")
+        self.ipc_dir = ipc_dir
+        self.worker_id = worker_id
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def socket_path(self, worker_id: str) -> str:
+        return os.path.join(self.ipc_dir, f"{worker_id}.sock")
+
+    def new_call_id(self) -> str:
+        return f"{uuid.uuid4()}.{self.worker_id}"
+
+    def is_foreign(self, call_id: str) -> bool:
+        owner = owner_of(call_id)
+        return owner is not None and owner != self.worker_id
+
+    async def start(self):
+        """Listens for requests relayed by the other workers."""
+        if self._server is not None:
+            return
+        os.makedirs(self.ipc_dir, exist_ok=True)
+        path = self.socket_path(self.worker_id)
+        if os.path.exists(path):
+            # Left behind by a previous process with the same id
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._serve, path=path)
+        logger.info(f"Worker {self.worker_id} relaying on {path}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path(self.worker_id))
+            except FileNotFoundError:
+                pass
+
+    async def get_task(self, call_id: str) -> Optional[TaskRecord]:
+        if self.is_foreign(call_id):
+            return await self._remote_record(call_id, consume=True)
+        return await super().get_task(call_id)
+
+    async def get_task_no_consume(self, call_id: str) -> Optional[TaskRecord]:
+        if self.is_foreign(call_id):
+            return await self._remote_record(call_id, consume=False)
+        return await super().get_task_no_consume(call_id)
+
+    async def mark_consumed(self, call_id: str):
+        if self.is_foreign(call_id):
+            await self.request(owner_of(call_id), {"op": "get", "call_id": call_id, "consume": True})
+        else:
+            await super().mark_consumed(call_id)
+
+    async def remove_task(self, call_id: str):
+        if self.is_foreign(call_id):
+            await self.request(owner_of(call_id), {"op": "stop", "call_id": call_id})
+        else:
+            await super().remove_task(call_id)
+
+    async def remove_tasks(self, call_ids: List[str]) -> List[str]:
+        removed = await super().remove_tasks([call_id for call_id in call_ids if not self.is_foreign(call_id)])
+        for call_id in call_ids:
+            if self.is_foreign(call_id):
+                response = await self.request(owner_of(call_id), {"op": "stop", "call_id": call_id})
+                if response and response.get("found"):
+                    removed.append(call_id)
+        return removed
+
+    async def provide_input(self, call_id: str, value: Any) -> bool:
+        if self.is_foreign(call_id):
+            response = await self.request(owner_of(call_id), {"op": "input", "call_id": call_id, "value": value})
+            return bool(response and response.get("accepted"))
+        return await super().provide_input(call_id, value)
+
+    async def request(self, worker_id: str, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Sends one control request to another worker. None if that worker can't be reached."""
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(self.socket_path(worker_id)), RELAY_TIMEOUT)
+            writer.write(to_json(message) + b"\n")
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), RELAY_TIMEOUT)
+            return from_json(line) if line else None
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Worker {worker_id} unreachable for {message.get('op')} of {message.get('call_id')}: {e}")
+            return None
+        finally:
+            if writer:
+                writer.close()
+
+    async def _remote_record(self, call_id: str, consume: bool) -> Optional[TaskRecord]:
+        owner = owner_of(call_id)
+        response = await self.request(owner, {"op": "get", "call_id": call_id, "consume": consume})
+        if not response or not response.get("found"):
+            return None
+        stream = RelayTaskStream(self, call_id, response["tool_name"], owner, response["status"])
+        return TaskRecord(gen=None, stream=stream, tool_name=response["tool_name"], consumed=response["consumed"])
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            message = from_json(line)
+            op, call_id = message.get("op"), message.get("call_id")
+            if op == "stream":
+                await self._serve_stream(call_id, message.get("since") or 0, writer)
+                return
+            if op == "get":
+                record = await InMemoryRegistry.get_task_no_consume(self, call_id)
+                if record and message.get("consume"):
+                    record.consumed = True
+                response = {"found": False} if record is None else {
+                    "found": True, "tool_name": record.tool_name, "status": record.stream.status, "consumed": record.consumed
+                }
+            elif op == "stop":
+                found = call_id in self._active_tasks
+                await InMemoryRegistry.remove_task(self, call_id)
+                response = {"found": found}
+            elif op == "input":
+                response = {"accepted": await InMemoryRegistry.provide_input(self, call_id, message.get("value"))}
+            else:
+                response = {"error": f"Unknown op: {op}"}
+            writer.write(to_json(response) + b"\n")
+            await writer.drain()
+        except asyncio.CancelledError:
+            # Connections still open when the server shuts down; nothing awaits this task
+            pass
+        except Exception as e:
+            logger.error(f"Error serving relayed request: {e}")
+        finally:
+            writer.close()
+
+    async def _serve_stream(self, call_id: str, since: int, writer: asyncio.StreamWriter):
+        record = await InMemoryRegistry.get_task_no_consume(self, call_id)
+        if record is None:
+            writer.write(b"end cancelled\n")
+            await writer.drain()
+            return
+        stream = record.stream
+        sub = stream.subscribe(since=since)
+        try:
+            async for event in sub:
+                writer.write(f"{event.seq} {event.data}\n".encode())
+                await writer.drain()
+            writer.write(f"end {stream.status}\n".encode())
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            # Relayed viewers never stop the task, like viewers on another Redis instance
+            stream.unsubscribe(sub, cancel_if_idle=False)
@@ -0,0 +1,164 @@
+import json
+import os
+from typing import Any, Dict, Optional
+import httpx
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from .labels import is_label
+from .logger import logger
+
+# NODE_ID: This instance's label in call_ids. Setting it enables forwarding requests for other nodes' call_ids.
+NODE_ID = os.getenv("NODE_ID") or None
+# PEERS: Static peer list, e.g. "node-a=http://10.0.0.1:8000,node-b=http://10.0.0.2:8000".
+PEERS = os.getenv("PEERS", "")
+# PEERS_FILE: JSON object mapping node ids to base URLs. Re-read whenever it changes; entries override PEERS.
+PEERS_FILE = os.getenv("PEERS_FILE")
+# FORWARD_TIMEOUT: Seconds to connect to a peer and, except for streams, to get its answer.
+FORWARD_TIMEOUT = float(os.getenv("FORWARD_TIMEOUT", "10"))
+# FORWARD_MAX_CONNECTIONS: Connections kept open to peers, shared by all forwarded requests.
+FORWARD_MAX_CONNECTIONS = int(os.getenv("FORWARD_MAX_CONNECTIONS", "100"))
+
+# Marks a request one node forwarded to another, so it is never forwarded again
+FORWARDED_HEADER = "X-ADK-Forwarded-By"
+# Request and response headers that travel across the hop
+_REQUEST_HEADERS = ("x-api-key", "last-event-id", "accept", "content-type")
+_RESPONSE_HEADERS = ("content-type", "cache-control", "retry-after", "www-authenticate")
+
+def parse_peers(spec: str) -> Dict[str, str]:
+    peers = {}
+    for item in filter(None, (entry.strip() for entry in spec.split(","))):
+        node, _, url = item.partition("=")
+        if is_label(node.strip()) and url.strip():
+            peers[node.strip()] = url.strip().rstrip("/")
+    return peers
+
+def node_of(call_id: str) -> Optional[str]:
+    """The node label of a call_id (`<uuid>.<node>`, or `<uuid>.<node>.<worker>` in multi-worker mode)."""
+    parts = call_id.split(".")
+    return parts[1] if len(parts) > 1 and is_label(parts[1]) else None
+
+class NodeRouter:
+    """
+    Node affinity without shared state. Call_ids name the node that started them, and a request for
+    another node's call_id is forwarded to that node over a pooled HTTP client. The response is
+    passed back unchanged, and SSE streams are relayed as they arrive. Disabled unless a node id is set.
+    """
+    def __init__(
+        self,
+        node_id: Optional[str] = NODE_ID,
+        peers: Optional[Dict[str, str]] = None,
+        peers_file: Optional[str] = PEERS_FILE,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        if node_id is not None and not is_label(node_id):
+            raise ValueError(f"Invalid node id: {node_id!r}")
+        self.node_id = node_id
+        self.peers_file = peers_file
+        self._static_peers = parse_peers(PEERS) if peers is None else dict(peers)
+        self._file_peers: Dict[str, str] = {}
+        self._file_mtime: Optional[float] = None
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.node_id is not None
+
+    def tag(self, call_id: str) -> str:
+        """Inserts this node's label right after the call_id's uuid."""
+        if not self.enabled:
+            return call_id
+        head, sep, rest = call_id.partition(".")
+        return f"{head}.{self.node_id}{sep}{rest}"
+
+    def owner(self, call_id: Optional[str], request: Optional[Request] = None) -> Optional[str]:
+        """The node a request for `call_id` must be forwarded to, or None to serve it here."""
+        if not self.enabled or not call_id:
+            return None
+        if request is not None and request.headers.get(FORWARDED_HEADER):
+            return None
+        node = node_of(call_id)
+        return node if node and node != self.node_id else None
+
+    def peers(self) -> Dict[str, str]:
+        if self.peers_file:
+            try:
+                mtime = os.stat(self.peers_file).st_mtime
+                if mtime != self._file_mtime:
+                    with open(self.peers_file) as f:
+                        loaded = json.load(f)
+                    self._file_peers = {
+                        node: str(url).rstrip("/") for node, url in loaded.items() if is_label(node)
+                    }
+                    self._file_mtime = mtime
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"Cannot read peer list {self.peers_file}: {e}")
+        return {**self._static_peers, **self._file_peers}
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=FORWARD_TIMEOUT,
+                limits=httpx.Limits(max_connections=FORWARD_MAX_CONNECTIONS, max_keepalive_connections=FORWARD_MAX_CONNECTIONS)
+            )
+        return self._client
+
+    def _peer_url(self, node: str, path: str) -> str:
+        base = self.peers().get(node)
+        if base is None:
+            raise HTTPException(status_code=404, detail=f"Task not found: unknown node {node}")
+        return base + path
+
+    async def forward(self, request: Request, node: str, stream: bool = False) -> Response:
+        """
+        Replays `request` on `node` and returns its response. With `stream`, the body is relayed as it
+        arrives and has no read timeout (SSE).
+        """
+        headers = {name: request.headers[name] for name in _REQUEST_HEADERS if name in request.headers}
+        headers[FORWARDED_HEADER] = self.node_id
+        outgoing = self.client().build_request(
+            request.method,
+            self._peer_url(node, request.url.path),
+            params=request.query_params,
+            headers=headers,
+            content=await request.body(),
+            timeout=httpx.Timeout(FORWARD_TIMEOUT, read=None) if stream else FORWARD_TIMEOUT
+        )
+        try:
+            upstream = await self.client().send(outgoing, stream=True)
+        except httpx.HTTPError as e:
+            logger.warning(f"Cannot forward {request.url.path} to node {node}: {e}")
+            raise HTTPException(status_code=502, detail=f"Node {node} is unreachable")
+        response_headers = {name: upstream.headers[name] for name in _RESPONSE_HEADERS if name in upstream.headers}
+        if stream and upstream.status_code == 200:
+            async def relay():
+                try:
+                    async for chunk in upstream.aiter_raw():
+                        yield chunk
+                finally:
+                    await upstream.aclose()
+            return StreamingResponse(relay(), status_code=upstream.status_code, headers=response_headers)
+        try:
+            content = await upstream.aread()
+        finally:
+            await upstream.aclose()
+        return Response(content, status_code=upstream.status_code, headers=response_headers)
+
+    async def call(self, node: str, path: str, payload: Dict[str, Any], api_key: Optional[str] = None) -> Optional[httpx.Response]:
+        """POSTs `payload` to `path` on `node` on behalf of a WebSocket client. None if the node can't be reached."""
+        headers = {FORWARDED_HEADER: self.node_id}
+        if api_key:
+            headers["X-API-Key"] = api_key
+        try:
+            return await self.client().post(self._peer_url(node, path), json=payload, headers=headers)
+        except (httpx.HTTPError, HTTPException) as e:
+            logger.warning(f"Cannot forward {path} to node {node}: {e}")
+            return None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+router = NodeRouter()
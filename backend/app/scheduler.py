@@ -0,0 +1,183 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .logger import logger
+from .metrics import TASKS_QUEUED, TASK_QUEUE_WAIT
+
+# MAX_CONCURRENT_TASKS: Tasks whose tool body may run at once in this process. Further starts are queued.
+MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "1000"))
+# QUEUE_POSITION_INTERVAL: Seconds between `queued` position updates for tasks still waiting.
+QUEUE_POSITION_INTERVAL = float(os.getenv("QUEUE_POSITION_INTERVAL", "1.0"))
+
+# Sort key of a waiting ticket: higher priority first, then first come first served
+QueueKey = Tuple[int, int]
+
+class AdmissionTicket:
+    """One task's place in the admission queue. Created per task by `AdmissionScheduler.ticket`."""
+    __slots__ = ("scheduler", "tool_name", "priority", "limit", "key", "position", "state", "_future", "_on_position")
+
+    def __init__(self, scheduler: "AdmissionScheduler", tool_name: str, priority: int, limit: Optional[int]):
+        self.scheduler = scheduler
+        self.tool_name = tool_name
+        self.priority = priority
+        self.limit = limit
+        self.key: QueueKey = (-priority, 0)
+        self.position = 0
+        # new -> waiting -> running -> released, or new/waiting -> released when withdrawn
+        self.state = "new"
+        self._future: Optional[asyncio.Future] = None
+        self._on_position: Optional[Callable[[int, int], None]] = None
+
+    async def wait(self, on_position: Callable[[int, int], None]):
+        """
+        Returns once the task may run. While queued, `on_position(position, queued)` is called with the
+        ticket's 1-based place in the queue on entry and whenever it changes (at most once per interval).
+        """
+        await self.scheduler._admit(self, on_position)
+
+    def release(self):
+        """Frees the slot, or leaves the queue if the task never got one. Safe to call more than once."""
+        self.scheduler._release(self)
+
+class AdmissionScheduler:
+    """
+    Admission control in front of tool execution: at most `max_concurrent` tasks run at once, and at most
+    a tool's `max_concurrency` of its own. Starts beyond that wait in a priority queue (higher priority
+    first, FIFO within a priority). A tool at its cap never holds back waiters of other tools.
+    """
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_TASKS, position_interval: float = QUEUE_POSITION_INTERVAL):
+        self.max_concurrent = max(1, max_concurrent)
+        self.position_interval = position_interval
+        self.running = 0
+        self._running_by_tool: Dict[str, int] = {}
+        # Per-tool heaps pick the next ticket to admit; the sorted list of all waiters gives positions
+        self._queues: Dict[str, List[Tuple[int, int, AdmissionTicket]]] = {}
+        self._order: List[Tuple[int, int, AdmissionTicket]] = []
+        self._seq = itertools.count()
+        self._enqueued_at: Dict[AdmissionTicket, float] = {}
+        self._reporter: Optional[asyncio.Task] = None
+        self._dirty = False
+        # Labelled metric children, looked up once per tool since admission happens for every task
+        self._wait_metrics: Dict[str, Any] = {}
+
+    @property
+    def queued(self) -> int:
+        return len(self._order)
+
+    def ticket(self, tool_name: str, priority: int = 0, limit: Optional[int] = None) -> AdmissionTicket:
+        return AdmissionTicket(self, tool_name, priority, limit)
+
+    def _has_room(self, tool_name: str, limit: Optional[int]) -> bool:
+        if self.running >= self.max_concurrent:
+            return False
+        return limit is None or self._running_by_tool.get(tool_name, 0) < limit
+
+    def _observe_wait(self, tool_name: str, seconds: float):
+        metric = self._wait_metrics.get(tool_name)
+        if metric is None:
+            metric = self._wait_metrics[tool_name] = TASK_QUEUE_WAIT.labels(tool_name=tool_name)
+        metric.observe(seconds)
+
+    def _start(self, ticket: AdmissionTicket):
+        ticket.state = "running"
+        self.running += 1
+        self._running_by_tool[ticket.tool_name] = self._running_by_tool.get(ticket.tool_name, 0) + 1
+
+    async def _admit(self, ticket: AdmissionTicket, on_position: Callable[[int, int], None]):
+        if ticket.state != "new":
+            return
+        # Any waiter that could run would already have been admitted, so free capacity means no queue for this tool
+        if self._has_room(ticket.tool_name, ticket.limit):
+            self._start(ticket)
+            self._observe_wait(ticket.tool_name, 0.0)
+            return
+
+        ticket.state = "waiting"
+        ticket.key = (-ticket.priority, next(self._seq))
+        ticket._future = asyncio.get_running_loop().create_future()
+        ticket._on_position = on_position
+        entry = (ticket.key[0], ticket.key[1], ticket)
+        heapq.heappush(self._queues.setdefault(ticket.tool_name, []), entry)
+        index = bisect.bisect_left(self._order, entry)
+        self._order.insert(index, entry)
+        self._enqueued_at[ticket] = time.perf_counter()
+        TASKS_QUEUED.labels(tool_name=ticket.tool_name).inc()
+        logger.info(f"Task queued for {ticket.tool_name} at position {index + 1} (priority {ticket.priority})")
+
+        ticket.position = index + 1
+        on_position(ticket.position, len(self._order))
+        self._mark_dirty()
+        await ticket._future
+
+    def _release(self, ticket: AdmissionTicket):
+        if ticket.state == "running":
+            ticket.state = "released"
+            self.running -= 1
+            self._running_by_tool[ticket.tool_name] -= 1
+            self._dispatch()
+        elif ticket.state == "waiting":
+            # Stopped while queued. The heap entry is skipped lazily when it reaches the top
+            ticket.state = "released"
+            self._leave_queue(ticket)
+            self._mark_dirty()
+        else:
+            ticket.state = "released"
+
+    def _leave_queue(self, ticket: AdmissionTicket):
+        entry = (ticket.key[0], ticket.key[1], ticket)
+        index = bisect.bisect_left(self._order, entry)
+        if index < len(self._order) and self._order[index][2] is ticket:
+            del self._order[index]
+        TASKS_QUEUED.labels(tool_name=ticket.tool_name).dec()
+        enqueued_at = self._enqueued_at.pop(ticket, None)
+        if enqueued_at is not None:
+            self._observe_wait(ticket.tool_name, time.perf_counter() - enqueued_at)
+
+    def _dispatch(self):
+        while self.running < self.max_concurrent:
+            best = None
+            for tool_name, heap in list(self._queues.items()):
+                # Skip tickets that were withdrawn, or whose task was cancelled but has not released yet
+                while heap and (heap[0][2].state != "waiting" or heap[0][2]._future.done()):
+                    heapq.heappop(heap)
+                if not heap:
+                    del self._queues[tool_name]
+                    continue
+                if self._has_room(tool_name, heap[0][2].limit) and (best is None or heap[0] < best):
+                    best = heap[0]
+            if best is None:
+                return
+            ticket = best[2]
+            heapq.heappop(self._queues[ticket.tool_name])
+            self._leave_queue(ticket)
+            self._start(ticket)
+            ticket._future.set_result(None)
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty = True
+        loop = asyncio.get_running_loop()
+        if self._order and (self._reporter is None or self._reporter.done() or self._reporter.get_loop() is not loop):
+            self._reporter = loop.create_task(self._report_positions())
+
+    async def _report_positions(self):
+        # One pass over the queue per interval instead of notifying every waiter on every admission
+        while self._order:
+            await asyncio.sleep(self.position_interval)
+            if not self._dirty:
+                continue
+            self._dirty = False
+            total = len(self._order)
+            for index, (_, _, ticket) in enumerate(self._order):
+                if ticket.position != index + 1:
+                    ticket.position = index + 1
+                    try:
+                        ticket._on_position(ticket.position, total)
+                    except Exception as e:
+                        logger.error(f"Error reporting queue position for {ticket.tool_name}: {e}")
+
+scheduler = AdmissionScheduler()
@@ -0,0 +1,712 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Deque, List, Optional, Union, Dict, TYPE_CHECKING
+from pydantic_core import from_json, to_json
+from .bridge import ProgressEvent, ProgressPayload
+from .logger import logger
+from .context import call_id_var, tool_name_var
+from .metrics import (
+    ACTIVE_TASKS, TASK_DURATION, TASKS_TOTAL, TASK_PROGRESS_STEPS_TOTAL,
+    STREAM_SUBSCRIBERS, SUBSCRIBER_DROPPED_EVENTS_TOTAL, PROGRESS_COALESCED_TOTAL
+)
+
+if TYPE_CHECKING:
+    from .scheduler import AdmissionTicket
+
+# TASK_BUFFER_SIZE: Number of recent events retained per task (ring buffer) for late subscribers and SSE resume.
+TASK_BUFFER_SIZE = 1000
+# SUBSCRIBER_QUEUE_SIZE: Maximum number of events queued for a single subscriber before its oldest progress update is dropped.
+SUBSCRIBER_QUEUE_SIZE = 1000
+# DELTA_KEYFRAME_INTERVAL: In delta mode, every Nth progress event is sent in full so clients can resync.
+DELTA_KEYFRAME_INTERVAL = 20
+
+FINISHED_STATUSES = ("success", "error", "cancelled")
+
+class EncodedEvent:
+    """
+    A task event serialized once by the producer.
+    The same `data` string (and SSE frame) is handed to every subscriber.
+    `seq` increases monotonically per call_id and is used as the SSE event id.
+    """
+    __slots__ = ("seq", "call_id", "type", "payload", "data", "_sse", "_encodings")
+
+    def __init__(self, seq: int, call_id: str, type: str, payload: Union[ProgressPayload, Dict[str, Any]], data: str):
+        self.seq = seq
+        self.call_id = call_id
+        self.type = type
+        self.payload = payload
+        self.data = data
+        self._sse: Optional[str] = None
+        self._encodings: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_event(cls, seq: int, event: ProgressEvent) -> "EncodedEvent":
+        return cls(seq, event.call_id, event.type, event.payload, event.model_dump_json())
+
+    @property
+    def sse(self) -> str:
+        """The SSE frame for this event, built on first use and shared afterwards."""
+        if self._sse is None:
+            self._sse = f"id: {self.seq}\ndata: {self.data}\n\n"
+        return self._sse
+
+    def encoded_as(self, name: str, build: Callable[[], Any]) -> Any:
+        """Returns this event in another encoding, building it on first use and sharing it afterwards."""
+        if self._encodings is None:
+            self._encodings = {}
+        encoded = self._encodings.get(name)
+        if encoded is None:
+            encoded = self._encodings[name] = build()
+        return encoded
+
+class EventEncoder:
+    """
+    Writes the `ProgressEvent` envelope for one task directly instead of building and dumping
+    a model per event. The output is byte-for-byte what `ProgressEvent.model_dump_json()` gives:
+    already-validated `ProgressPayload`s are dumped on their own and plain dict payloads are
+    encoded by pydantic_core, then spliced into a pre-encoded envelope head.
+    """
+    __slots__ = ("call_id", "_head")
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self._head = '{"call_id":' + to_json(call_id).decode() + ',"type":"'
+
+    def encode(self, seq: int, event_type: str, payload: Any) -> EncodedEvent:
+        if payload.__class__ is ProgressPayload:
+            body = payload.model_dump_json()
+        elif isinstance(payload, dict) and self._is_plain_dict(payload):
+            body = to_json(payload).decode()
+        else:
+            # Anything else goes through the model so validation and coercion stay identical
+            return EncodedEvent.from_event(seq, ProgressEvent(call_id=self.call_id, type=event_type, payload=payload))
+        return EncodedEvent(seq, self.call_id, event_type, payload, f'{self._head}{event_type}","payload":{body}}}')
+
+    @staticmethod
+    def _is_plain_dict(payload: Dict[Any, Any]) -> bool:
+        # The envelope's Union would coerce a dict shaped like a ProgressPayload, and rejects non-str keys
+        if "step" in payload and "pct" in payload:
+            return False
+        return all(key.__class__ is str for key in payload)
+
+class ProgressCoalescer:
+    """
+    Collapses progress items that arrive within `window` seconds of the last delivered one,
+    keeping only the latest state. Anything that is not progress flushes the held item first
+    and is delivered immediately, so ordering is preserved.
+    """
+    def __init__(self, window: float, deliver: Callable[[Any], None]):
+        self.window = window
+        self.coalesced = 0
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        self._held: Any = None
+        self._next_at = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def push(self, item: Any, is_progress: bool):
+        if not is_progress:
+            self.flush()
+            self._deliver(item)
+            return
+        if self._held is None and self._loop.time() >= self._next_at:
+            self._next_at = self._loop.time() + self.window
+            self._deliver(item)
+            return
+        if self._held is not None:
+            self.coalesced += 1
+        self._held = item
+        if self._timer is None:
+            self._timer = self._loop.call_at(self._next_at, self._release)
+
+    def _release(self):
+        self._timer = None
+        if self._held is not None:
+            item, self._held = self._held, None
+            self._next_at = self._loop.time() + self.window
+            self._deliver(item)
+
+    def flush(self):
+        """Delivers the held progress item (if any) right away."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._held is not None:
+            item, self._held = self._held, None
+            self._deliver(item)
+
+    def discard(self):
+        """Drops the held progress item without delivering it."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._held = None
+
+class DeltaEncoder:
+    """
+    Rewrites a subscriber's progress events as `progress_delta` events carrying only the fields
+    that changed since the last progress event that subscriber received (`base` is its seq).
+    The first progress event, and every `keyframe_interval`th after it, is sent in full.
+    Changed `metadata` keys are sent individually, with removed keys listed in `metadata_removed`.
+    """
+    def __init__(self, keyframe_interval: int = DELTA_KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self._base: Optional[EncodedEvent] = None
+        self._since_keyframe = 0
+
+    def apply(self, event: EncodedEvent) -> EncodedEvent:
+        if event.type != "progress":
+            return event
+        base = self._base
+        self._base = event
+        if base is None or self._since_keyframe + 1 >= self.keyframe_interval:
+            self._since_keyframe = 0
+            return event
+        self._since_keyframe += 1
+        # Subscribers that saw the same base get the same delta, so it is built once per pair
+        return event.encoded_as(f"delta:{base.seq}", lambda: self._delta(base, event))
+
+    @staticmethod
+    def _delta(base: EncodedEvent, event: EncodedEvent) -> EncodedEvent:
+        old, new = base.payload, event.payload
+        changes: Dict[str, Any] = {}
+        for field in ("step", "pct", "log"):
+            value = getattr(new, field)
+            if value != getattr(old, field):
+                changes[field] = value
+        if new.metadata != old.metadata:
+            metadata = {k: v for k, v in new.metadata.items() if k not in old.metadata or old.metadata[k] != v}
+            if metadata:
+                changes["metadata"] = metadata
+            removed = [k for k in old.metadata if k not in new.metadata]
+            if removed:
+                changes["metadata_removed"] = removed
+        data = to_json({"call_id": event.call_id, "type": "progress_delta", "base": base.seq, "payload": changes}).decode()
+        return EncodedEvent(event.seq, event.call_id, "progress_delta", changes, data)
+
+class Subscription:
+    """
+    A single consumer's view of a TaskStream with its own bounded queue.
+    A slow subscriber loses its oldest progress updates instead of holding back the producer or other subscribers.
+    """
+    def __init__(
+        self,
+        stream: "TaskStream",
+        maxsize: int = SUBSCRIBER_QUEUE_SIZE,
+        coalesce: Optional[float] = None,
+        delta: bool = False
+    ):
+        self.stream = stream
+        self.dropped = 0
+        self._maxsize = maxsize
+        self._queue: Deque[EncodedEvent] = deque()
+        self._has_data = asyncio.Event()
+        self._closed = False
+        self.completed = False
+        # Optional per-subscription coalescing, for viewers that only need the latest state
+        self._coalescer = ProgressCoalescer(coalesce, self._enqueue) if coalesce else None
+        # Optional delta encoding, applied as events are consumed so the baseline is what this subscriber received
+        self._delta = DeltaEncoder() if delta else None
+
+    def push(self, event: EncodedEvent):
+        if self._closed:
+            return
+        if self._coalescer:
+            self._coalescer.push(event, event.type == "progress")
+        else:
+            self._enqueue(event)
+
+    def _enqueue(self, event: EncodedEvent):
+        if len(self._queue) >= self._maxsize:
+            for i, queued in enumerate(self._queue):
+                if queued.type == "progress":
+                    del self._queue[i]
+                    self.dropped += 1
+                    SUBSCRIBER_DROPPED_EVENTS_TOTAL.labels(tool_name=self.stream.tool_name).inc()
+                    break
+        self._queue.append(event)
+        self._has_data.set()
+
+    def close(self):
+        """Marks the end of the stream. Already queued events are still delivered."""
+        if self._coalescer and not self._closed:
+            self._coalescer.flush()
+            if self._coalescer.coalesced:
+                PROGRESS_COALESCED_TOTAL.labels(tool_name=self.stream.tool_name).inc(self._coalescer.coalesced)
+        self._closed = True
+        self._has_data.set()
+
+    def __aiter__(self) -> AsyncIterator[EncodedEvent]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[EncodedEvent]:
+        while True:
+            while not self._queue:
+                if self._closed:
+                    self.completed = True
+                    return
+                self._has_data.clear()
+                await self._has_data.wait()
+            event = self._queue.popleft()
+            yield self._delta.apply(event) if self._delta else event
+
+class TaskStream:
+    """
+    Drives a tool's async generator in its own producer task.
+    Each event is serialized once, retained in a bounded backlog and fanned out to every subscriber,
+    so the tool starts working as soon as the task is stored and any number of SSE/WS clients can watch it.
+    With `coalesce`, progress updates within that window collapse to the latest one before they are
+    validated, serialized or sent.
+    A `mirror` (e.g. the Redis registry's) is handed every event via `push(event)` and the final
+    status via `finish(status)`, so other processes can serve the task.
+    With an `admission` ticket the generator only starts once the scheduler admits the task; until then
+    the stream is "queued" and emits `queued` events carrying the task's queue position.
+    """
+    # The producer runs in this process; see ForeignTaskStream for tasks owned by another process
+    is_local = True
+
+    def __init__(
+        self,
+        call_id: str,
+        tool_name: str,
+        gen: AsyncGenerator,
+        buffer_size: int = TASK_BUFFER_SIZE,
+        coalesce: Optional[float] = None,
+        mirror: Optional[Any] = None,
+        admission: Optional["AdmissionTicket"] = None
+    ):
+        self.call_id = call_id
+        self.tool_name = tool_name
+        self.gen = gen
+        self.coalesce = coalesce
+        self.mirror = mirror
+        self.admission = admission
+        self.status = "pending"
+        self._progress_steps = TASK_PROGRESS_STEPS_TOTAL.labels(tool_name=tool_name)
+        self._backlog: Deque[EncodedEvent] = deque(maxlen=buffer_size)
+        self._subscribers: List[Subscription] = []
+        self._last_seq = 0
+        self._encoder = EventEncoder(call_id)
+        self._finished = False
+        self._task: Optional[asyncio.Task] = None
+        # Set by cancel(); the run may still be closing its generator for a while after
+        self._cancel_requested = False
+        # Monotonic time at which the last subscriber left, None while anyone is attached
+        self.idle_since: Optional[float] = None
+        # Requesters sharing this run (single-flight tools only); the run is cancelled when the last one detaches
+        self._aliases: List["TaskAlias"] = []
+
+    def start(self) -> asyncio.Task:
+        """Schedules the producer on the running event loop."""
+        if self._task is None:
+            self.status = "running"
+            ACTIVE_TASKS.labels(tool_name=self.tool_name).inc()
+            self._task = asyncio.create_task(self._produce())
+            self._task.add_done_callback(self._on_producer_done)
+        return self._task
+
+    @property
+    def task(self) -> Optional[asyncio.Task]:
+        return self._task
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @property
+    def joinable(self) -> bool:
+        """True while another single-flight requester may attach: not finished and not being cancelled."""
+        return not self._finished and not self._cancel_requested
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    @property
+    def run_call_id(self) -> str:
+        """The call_id the producer runs (and waits for input) under."""
+        return self.call_id
+
+    def cancel(self):
+        """Requests cancellation of the producer. Safe to call more than once."""
+        self._cancel_requested = True
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def stop(self):
+        """Cancels the producer and waits for the generator to be closed."""
+        self.cancel()
+        if self._task:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def subscribe(
+        self,
+        since: Optional[int] = None,
+        maxsize: int = SUBSCRIBER_QUEUE_SIZE,
+        coalesce: Optional[float] = None,
+        delta: bool = False
+    ) -> Subscription:
+        """
+        Attaches a new subscriber, replaying retained events before live ones.
+        With `since`, only events with a greater seq are replayed (SSE resume via Last-Event-ID).
+        If `since` is older than the ring buffer, replay starts at the oldest retained event.
+        `coalesce` enables progress coalescing for this subscriber only, `delta` delta-encoded progress.
+        """
+        sub = Subscription(self, maxsize=maxsize, coalesce=coalesce, delta=delta)
+        for event in self._backlog:
+            if since is None or event.seq > since:
+                sub.push(event)
+        self.idle_since = None
+        if self._finished:
+            sub.close()
+        else:
+            self._subscribers.append(sub)
+            STREAM_SUBSCRIBERS.labels(tool_name=self.tool_name).inc()
+        return sub
+
+    def unsubscribe(self, sub: Subscription, cancel_if_idle: bool = True):
+        """
+        Detaches a subscriber. Unless `cancel_if_idle` is False, the producer is cancelled
+        once the last subscriber of a running task leaves.
+        """
+        if sub in self._subscribers:
+            self._subscribers.remove(sub)
+            STREAM_SUBSCRIBERS.labels(tool_name=self.tool_name).dec()
+            if not self._subscribers and cancel_if_idle and not self._finished:
+                logger.info(f"Last subscriber left task {self.call_id}, cancelling")
+                self.cancel()
+        if not self._subscribers:
+            self.idle_since = asyncio.get_running_loop().time()
+        sub.close()
+
+    async def events(self) -> AsyncIterator[EncodedEvent]:
+        """Convenience iterator over a fresh subscription."""
+        sub = self.subscribe()
+        try:
+            async for event in sub:
+                yield event
+        finally:
+            self.unsubscribe(sub)
+
+    def _deliver(self, item: Any):
+        if isinstance(item, ProgressPayload):
+            self._emit("progress", item)
+        elif isinstance(item, dict) and item.get("type") == "input_request":
+            self._emit("input_request", item["payload"])
+        else:
+            self._emit("result", item)
+
+    def _emit(self, event_type: str, payload: Any):
+        encoded = self._encoder.encode(self._last_seq + 1, event_type, payload)
+        self._last_seq += 1
+        self._backlog.append(encoded)
+        for sub in self._subscribers:
+            sub.push(encoded)
+        for alias in self._aliases:
+            alias._push(encoded)
+        if self.mirror:
+            self.mirror.push(encoded)
+
+    def _emit_queued(self, position: int, queued: int):
+        self._emit("queued", {"position": position, "queued": queued})
+
+    def _on_producer_done(self, task: asyncio.Task):
+        # A producer cancelled before its first step never enters _produce, so finish the stream here
+        if not self._finished:
+            TASKS_TOTAL.labels(tool_name=self.tool_name, status="cancelled").inc()
+            ACTIVE_TASKS.labels(tool_name=self.tool_name).dec()
+            self.status = "cancelled"
+            self._finished = True
+            self._close_subscribers()
+            if self.mirror:
+                self.mirror.finish(self.status)
+
+    def _close_subscribers(self):
+        for sub in self._subscribers:
+            sub.close()
+        STREAM_SUBSCRIBERS.labels(tool_name=self.tool_name).dec(len(self._subscribers))
+        self._subscribers.clear()
+        self.idle_since = asyncio.get_running_loop().time()
+        for alias in self._aliases:
+            alias._close_subscribers()
+
+    def _detach(self, alias: "TaskAlias"):
+        if alias in self._aliases:
+            self._aliases.remove(alias)
+            if not self._aliases and not self._finished:
+                logger.info(f"Last requester left shared task {self.call_id}, cancelling")
+                self.cancel()
+
+    async def _produce(self):
+        call_id_var.set(self.call_id)
+        tool_name_var.set(self.tool_name)
+
+        start_time = time.perf_counter()
+        status = "success"
+
+        coalescer = ProgressCoalescer(self.coalesce, self._deliver) if self.coalesce else None
+
+        logger.info(f"Starting producer for task: {self.call_id}")
+        try:
+            if self.admission:
+                self.status = "queued"
+                await self.admission.wait(self._emit_queued)
+                self.status = "running"
+                start_time = time.perf_counter()
+            async for item in self.gen:
+                is_progress = isinstance(item, ProgressPayload)
+                if is_progress:
+                    self._progress_steps.inc()
+                if coalescer:
+                    coalescer.push(item, is_progress)
+                else:
+                    self._deliver(item)
+                # Let subscribers and other tasks run between tight yields
+                await asyncio.sleep(0)
+            if coalescer:
+                coalescer.flush()
+        except asyncio.CancelledError:
+            status = "cancelled"
+            logger.info(f"Task {self.call_id} was cancelled")
+            if coalescer:
+                coalescer.discard()
+            await self.gen.aclose()
+        except Exception as e:
+            status = "error"
+            logger.error(f"Error during task {self.call_id} execution: {e}")
+            if coalescer:
+                coalescer.flush()
+            self._emit("error", {"detail": str(e)})
+        finally:
+            if self.admission:
+                self.admission.release()
+            if coalescer and coalescer.coalesced:
+                PROGRESS_COALESCED_TOTAL.labels(tool_name=self.tool_name).inc(coalescer.coalesced)
+            duration = time.perf_counter() - start_time
+            TASK_DURATION.labels(tool_name=self.tool_name).observe(duration)
+            TASKS_TOTAL.labels(tool_name=self.tool_name, status=status).inc()
+            ACTIVE_TASKS.labels(tool_name=self.tool_name).dec()
+
+            self.status = status
+            self._finished = True
+            self._close_subscribers()
+            if self.mirror:
+                self.mirror.finish(status)
+            logger.info(f"Producer finished for task: {self.call_id} (duration: {duration:.2f}s, status: {status})")
+
+
+class TaskAlias:
+    """
+    One requester's handle on a single-flight run: a TaskStream shared by identical starts.
+    The alias has its own call_id, carried by every event it delivers, and its own subscribers,
+    while the producer, backlog and event seq numbers belong to the shared stream.
+    Stopping an alias, or its last subscriber leaving, detaches only that requester;
+    the shared run is cancelled once no alias is left attached.
+    """
+    is_local = True
+
+    def __init__(self, shared: TaskStream, call_id: str):
+        self.shared = shared
+        self.call_id = call_id
+        self.tool_name = shared.tool_name
+        self.gen = shared.gen
+        self.idle_since: Optional[float] = None
+        self._subscribers: List[Subscription] = []
+        self._status: Optional[str] = None
+        self._head = '{"call_id":' + to_json(call_id).decode() + ','
+        self._shared_head = '{"call_id":' + to_json(shared.call_id).decode() + ','
+        shared._aliases.append(self)
+
+    @property
+    def status(self) -> str:
+        return self._status or self.shared.status
+
+    @property
+    def task(self) -> Optional[asyncio.Task]:
+        return self.shared.task
+
+    @property
+    def finished(self) -> bool:
+        return self._status is not None or self.shared.finished
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def last_seq(self) -> int:
+        return self.shared.last_seq
+
+    @property
+    def run_call_id(self) -> str:
+        return self.shared.call_id
+
+    def cancel(self):
+        """Detaches this requester, cancelling the shared run if nobody else is attached."""
+        if self.finished:
+            return
+        self._status = "cancelled"
+        self._close_subscribers()
+        self.shared._detach(self)
+
+    async def stop(self):
+        self.cancel()
+        if not self.shared._aliases:
+            await self.shared.stop()
+
+    def subscribe(
+        self,
+        since: Optional[int] = None,
+        maxsize: int = SUBSCRIBER_QUEUE_SIZE,
+        coalesce: Optional[float] = None,
+        delta: bool = False
+    ) -> Subscription:
+        """Like TaskStream.subscribe, with events relabelled to this alias' call_id."""
+        sub = Subscription(self, maxsize=maxsize, coalesce=coalesce, delta=delta)
+        for event in self.shared._backlog:
+            if since is None or event.seq > since:
+                sub.push(self._relabel(event))
+        self.idle_since = None
+        if self.finished:
+            sub.close()
+        else:
+            self._subscribers.append(sub)
+            STREAM_SUBSCRIBERS.labels(tool_name=self.tool_name).inc()
+        return sub
+
+    def unsubscribe(self, sub: Subscription, cancel_if_idle: bool = True):
+        """Detaches a subscriber. Unless `cancel_if_idle` is False, the alias detaches from the run when its last subscriber leaves."""
+        if sub in self._subscribers:
+            self._subscribers.remove(sub)
+            STREAM_SUBSCRIBERS.labels(tool_name=self.tool_name).dec()
+            if not self._subscribers and cancel_if_idle and not self.finished:
+                logger.info(f"Last subscriber left task {self.call_id}, detaching from shared task {self.shared.call_id}")
+                self.cancel()
+        if not self._subscribers:
+            self.idle_since = asyncio.get_running_loop().time()
+        sub.close()
+
+    async def events(self) -> AsyncIterator[EncodedEvent]:
+        """Convenience iterator over a fresh subscription."""
+        sub = self.subscribe()
+        try:
+            async for event in sub:
+                yield event
+        finally:
+            self.unsubscribe(sub)
+
+    def _push(self, event: EncodedEvent):
+        if self._subscribers:
+            event = self._relabel(event)
+            for sub in self._subscribers:
+                sub.push(event)
+
+    def _close_subscribers(self):
+        for sub in self._subscribers:
+            sub.close()
+        STREAM_SUBSCRIBERS.labels(tool_name=self.tool_name).dec(len(self._subscribers))
+        self._subscribers.clear()
+        self.idle_since = asyncio.get_running_loop().time()
+
+    def _relabel(self, event: EncodedEvent) -> EncodedEvent:
+        if self.call_id == self.shared.call_id:
+            return event
+        # Built once per event and alias, then shared by all of the alias' subscribers
+        return event.encoded_as(f"alias:{self.call_id}", lambda: self._relabelled(event))
+
+    def _relabelled(self, event: EncodedEvent) -> EncodedEvent:
+        if event.data.startswith(self._shared_head):
+            data = self._head + event.data[len(self._shared_head):]
+        else:
+            fields = from_json(event.data)
+            fields["call_id"] = self.call_id
+            data = to_json(fields).decode()
+        return EncodedEvent(event.seq, self.call_id, event.type, event.payload, data)
+
+class ForeignTaskStream(ABC):
+    """
+    A task whose producer runs in another process, streamed back by a backend (Redis, worker relay).
+    Offers the subscribe/unsubscribe side of TaskStream; viewers leaving never stop the task.
+    Backends provide the transport: `_read(sub, since)` feeds one subscriber the events after `since`
+    (setting `status` when the task ends), and `stop()` asks the owner to stop the task.
+    """
+    is_local = False
+
+    def __init__(self, call_id: str, tool_name: str, owner: str, status: str):
+        self.call_id = call_id
+        self.tool_name = tool_name
+        self.owner = owner
+        self.status = status
+        self.idle_since: Optional[float] = None
+        self._readers: Dict[Subscription, asyncio.Task] = {}
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._readers)
+
+    @property
+    def run_call_id(self) -> str:
+        return self.call_id
+
+    def subscribe(
+        self,
+        since: Optional[int] = None,
+        maxsize: int = SUBSCRIBER_QUEUE_SIZE,
+        coalesce: Optional[float] = None,
+        delta: bool = False
+    ) -> Subscription:
+        """Attaches a subscriber that replays the owner's retained events (after `since`) and then follows live ones."""
+        sub = Subscription(self, maxsize=maxsize, coalesce=coalesce, delta=delta)
+        self._readers[sub] = asyncio.create_task(self._read(sub, since or 0))
+        self.idle_since = None
+        return sub
+
+    def unsubscribe(self, sub: Subscription, cancel_if_idle: bool = True):
+        reader = self._readers.pop(sub, None)
+        if reader:
+            reader.cancel()
+        if not self._readers:
+            self.idle_since = asyncio.get_running_loop().time()
+        sub.close()
+
+    async def events(self) -> AsyncIterator[EncodedEvent]:
+        """Convenience iterator over a fresh subscription."""
+        sub = self.subscribe()
+        try:
+            async for event in sub:
+                yield event
+        finally:
+            self.unsubscribe(sub)
+
+    def cancel(self):
+        """Asks the owner to stop the task."""
+        asyncio.create_task(self.stop())
+
+    @abstractmethod
+    async def stop(self):
+        """Asks the owner to stop the task and waits until the request was delivered."""
+
+    @abstractmethod
+    async def _read(self, sub: Subscription, since: int):
+        """Pushes the task's events after `since` to `sub` until it ends, then closes `sub`."""
+
+    def _decode(self, seq: int, data: str) -> EncodedEvent:
+        """Rebuilds an event from the JSON its producer encoded."""
+        event = from_json(data)
+        payload = event["payload"]
+        if event["type"] == "progress":
+            payload = ProgressPayload.model_validate(payload)
+        return EncodedEvent(seq, self.call_id, event["type"], payload, data)
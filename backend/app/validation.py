@@ -0,0 +1,54 @@
+import inspect
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, create_model
+from .logger import logger
+
+def args_model(func: Callable) -> Optional[type]:
+    """
+    A pydantic model of the tool's parameters, built once at registration. It canonicalizes arguments
+    for cache and single-flight keys and provides the tool's JSON Schema; plain calls use `validate_call`.
+    None for signatures a model can't express (*args/**kwargs).
+    """
+    fields = {}
+    for param in inspect.signature(func).parameters.values():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            return None
+        annotation = Any if param.annotation is inspect.Parameter.empty else param.annotation
+        default = ... if param.default is inspect.Parameter.empty else param.default
+        fields[param.name] = (annotation, default)
+    try:
+        return create_model(
+            f"{func.__name__}_args",
+            __config__=ConfigDict(extra="forbid", arbitrary_types_allowed=True),
+            **fields
+        )
+    except Exception as e:
+        logger.warning(f"Cannot build an argument model for {func.__name__}: {e}")
+        return None
+
+def validate_args(model: Optional[type], kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """
+    Validates `kwargs` against the tool's argument model once, for tools keyed by their arguments
+    (result cache, single-flight). Returns the validated values to call the tool with and their
+    canonical JSON: defaults filled in and keys sorted at every level, so `{"a": 1, "b": "2"}`,
+    `{"b": 2, "a": "1"}` and an omitted default share a key. Without a model the arguments pass
+    through unchanged and the tool's own `validate_call` checks them.
+    """
+    if model is None:
+        return kwargs, json.dumps(kwargs, sort_keys=True, default=str)
+    validated: BaseModel = model.model_validate(kwargs)
+    # Iterating the model yields its fields without converting nested models back to dicts
+    return dict(validated), json.dumps(validated.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+
+def parameters_schema(model: Optional[type]) -> Dict[str, Any]:
+    """The JSON Schema of a tool's arguments; a permissive object schema if it has no model or can't be described."""
+    if model is None:
+        return {"type": "object"}
+    try:
+        schema = model.model_json_schema()
+    except Exception as e:
+        logger.warning(f"Cannot build a JSON Schema for {model.__name__}: {e}")
+        return {"type": "object"}
+    schema.pop("title", None)
+    return schema
@@ -0,0 +1,83 @@
+import json
+from typing import Any, Dict, List, Optional, Union
+from pydantic_core import from_json
+from .stream import EncodedEvent
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is an optional dependency
+    msgpack = None
+
+# WebSocket subprotocols a client can offer in Sec-WebSocket-Protocol, in server preference order.
+JSON_SUBPROTOCOL = "adk.json"
+MSGPACK_SUBPROTOCOL = "adk.msgpack"
+
+Frame = Union[str, bytes]
+
+class JsonCodec:
+    """The default wire format: one JSON object per text frame."""
+    name = "JSON"
+    subprotocol = JSON_SUBPROTOCOL
+
+    def encode(self, data: Dict[str, Any]) -> Frame:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    def encode_event(self, event: EncodedEvent) -> Frame:
+        return event.data
+
+    def decode(self, frame: Frame) -> Any:
+        return json.loads(frame)
+
+    def batch(self, frames: List[Frame]) -> Frame:
+        # Frames are already-encoded JSON objects, so the batch is assembled without re-encoding
+        return '{"type":"batch","events":[' + ",".join(frames) + ']}'
+
+class MsgpackCodec:
+    """
+    MessagePack in binary frames, for machine clients. Messages have the same shape as the JSON
+    ones; an event is packed at most once no matter how many connections receive it.
+    """
+    name = "MessagePack"
+    subprotocol = MSGPACK_SUBPROTOCOL
+
+    _BATCH_HEAD = b""
+
+    def __init__(self):
+        if not MsgpackCodec._BATCH_HEAD:
+            MsgpackCodec._BATCH_HEAD = b"\x82" + msgpack.packb("type") + msgpack.packb("batch") + msgpack.packb("events")
+
+    def encode(self, data: Dict[str, Any]) -> Frame:
+        return msgpack.packb(data)
+
+    def encode_event(self, event: EncodedEvent) -> Frame:
+        # Packed from the JSON encoding so both formats carry exactly the same values
+        return event.encoded_as(self.subprotocol, lambda: msgpack.packb(from_json(event.data)))
+
+    def decode(self, frame: Frame) -> Any:
+        if isinstance(frame, str):
+            # Text frames are always JSON, which keeps hand-written debugging messages working
+            return json.loads(frame)
+        try:
+            return msgpack.unpackb(frame)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack: {e}") from e
+
+    def batch(self, frames: List[Frame]) -> Frame:
+        count = len(frames)
+        if count < 16:
+            header = bytes([0x90 | count])
+        elif count < 0x10000:
+            header = b"\xdc" + count.to_bytes(2, "big")
+        else:
+            header = b"\xdd" + count.to_bytes(4, "big")
+        return self._BATCH_HEAD + header + b"".join(frames)
+
+def negotiate_codec(offered: List[str]) -> Union[JsonCodec, MsgpackCodec]:
+    """Picks the wire format from the subprotocols a client offered, falling back to JSON."""
+    if MSGPACK_SUBPROTOCOL in offered and msgpack is not None:
+        return MsgpackCodec()
+    return JsonCodec()
+
+def accepted_subprotocol(codec: Union[JsonCodec, MsgpackCodec], offered: List[str]) -> Optional[str]:
+    """The subprotocol to echo in the handshake; None if the client did not ask for one."""
+    return codec.subprotocol if codec.subprotocol in offered else None
@@ -0,0 +1,131 @@
+import asyncio
+import importlib
+import os
+import signal
+from typing import Any, Dict, Optional, Set
+from .broker import BaseBroker, create_broker
+from .context import call_id_var, tool_name_var
+from .executors import worker_executor, job_queues, WORKER_QUEUE
+from .logger import logger
+
+# WORKER_CONCURRENCY: Most tool runs one worker process executes at once. Further start requests stay queued.
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "16"))
+# WORKER_TOOL_MODULES: Comma-separated modules a worker imports to register its tools, like the API does.
+WORKER_TOOL_MODULES = os.getenv("WORKER_TOOL_MODULES", ".dummy_tool")
+# WORKER_INPUT_GRACE: Seconds a forwarded input waits for the tool to start waiting for it.
+WORKER_INPUT_GRACE = 1.0
+
+def encode_item(item: Any) -> Dict[str, Any]:
+    from .bridge import ProgressPayload
+    if isinstance(item, ProgressPayload):
+        return {"kind": "progress", "item": item.model_dump(mode="json")}
+    return {"kind": "item", "item": item}
+
+class Worker:
+    """
+    Executes executor="worker" tools for any API instance. Takes start requests from the broker's
+    WORKER_QUEUE, runs the tool with the task's call_id in context, sends every item back on the run's
+    events queue and follows its control queue for stops and forwarded input.
+    """
+    def __init__(self, broker: BaseBroker, concurrency: int = WORKER_CONCURRENCY):
+        self.broker = broker
+        self.concurrency = max(1, concurrency)
+        self._loop_task: Optional[asyncio.Task] = None
+        self._runs: Set[asyncio.Task] = set()
+
+    def start(self):
+        self._loop_task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stops taking jobs; runs still in progress end with an error for their API instance."""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        for run in list(self._runs):
+            run.cancel()
+        if self._runs:
+            await asyncio.gather(*self._runs, return_exceptions=True)
+
+    async def run(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        while True:
+            await slots.acquire()
+            try:
+                job = await self.broker.get(WORKER_QUEUE)
+            except BaseException:
+                slots.release()
+                raise
+            run = asyncio.create_task(self._run_job(job))
+            self._runs.add(run)
+            run.add_done_callback(self._runs.discard)
+            run.add_done_callback(lambda _: slots.release())
+
+    async def _run_job(self, job: Dict[str, Any]):
+        call_id, tool_name = job["call_id"], job["tool_name"]
+        call_id_var.set(call_id)
+        tool_name_var.set(tool_name)
+        events, control = job_queues(job["job"])
+        runner = asyncio.create_task(self._drive(tool_name, job["args"], events))
+        follower = asyncio.create_task(self._follow(control, call_id, runner))
+        logger.info(f"Worker running task {call_id}", extra={"call_id": call_id, "tool_name": tool_name})
+        try:
+            await runner
+        except asyncio.CancelledError:
+            if follower.done():
+                # Stopped by the API side, which no longer reads the events queue
+                await self.broker.delete(events)
+            else:
+                runner.cancel()
+                await self.broker.put(events, {"kind": "error", "message": "Worker stopped"})
+        finally:
+            follower.cancel()
+            await self.broker.delete(control)
+
+    async def _drive(self, tool_name: str, args: Dict[str, Any], events: str):
+        tool = worker_executor.local_tool(tool_name)
+        try:
+            if tool is None:
+                raise LookupError(f"Tool not found on worker: {tool_name}")
+            async for item in tool(**args):
+                await self.broker.put(events, encode_item(item))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Tool {tool_name} failed on worker: {e}", extra={"tool_name": tool_name})
+            await self.broker.put(events, {"kind": "error", "message": str(e) or type(e).__name__})
+            return
+        await self.broker.put(events, {"kind": "done"})
+
+    async def _follow(self, control: str, call_id: str, runner: asyncio.Task):
+        from .bridge import input_manager
+        while True:
+            message = await self.broker.get(control)
+            if message.get("cancel"):
+                runner.cancel()
+                return
+            if "input" in message:
+                # The input_request item reaches the client just before the tool starts waiting
+                deadline = asyncio.get_running_loop().time() + WORKER_INPUT_GRACE
+                while not await input_manager.provide_input(call_id, message["input"]):
+                    if asyncio.get_running_loop().time() > deadline:
+                        logger.warning(f"Task {call_id} was not waiting for the forwarded input", extra={"call_id": call_id})
+                        break
+                    await asyncio.sleep(0.01)
+
+async def main():
+    for module in filter(None, (name.strip() for name in WORKER_TOOL_MODULES.split(","))):
+        importlib.import_module(module, package=__package__)
+    broker = create_broker()
+    worker = Worker(broker)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    worker.start()
+    logger.info(f"Worker started on {WORKER_QUEUE} with concurrency {worker.concurrency}")
+    await stopping.wait()
+    await worker.stop()
+    await broker.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple, Union
+from fastapi import WebSocket, status
+from .logger import logger
+from .stream import EncodedEvent
+from .wire import Frame, JsonCodec, MsgpackCodec
+from .metrics import (
+    WS_OUTBOUND_QUEUE_DEPTH, WS_SEND_LATENCY, WS_OUTBOUND_DROPPED_TOTAL,
+    WS_SLOW_CONSUMER_DISCONNECTS_TOTAL, WS_BATCH_EVENTS
+)
+
+# WS_OUTBOUND_QUEUE_SIZE: Maximum number of frames waiting to be written to a single WebSocket connection.
+WS_OUTBOUND_QUEUE_SIZE = int(os.getenv("WS_OUTBOUND_QUEUE_SIZE", "1000"))
+# WS_OVERFLOW_POLICY: What happens when a connection's outbound queue is full.
+#   "block"         - producers wait until the writer has made room (lossless).
+#   "drop_progress" - the oldest queued progress event is dropped; other frames fall back to waiting.
+#   "disconnect"    - the slow consumer is disconnected.
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "block")
+WS_OVERFLOW_POLICIES = ("block", "drop_progress", "disconnect")
+# WS_BATCH_WINDOW: Seconds the writer waits for more frames before flushing a batch (batching is opt-in per connection).
+WS_BATCH_WINDOW = float(os.getenv("WS_BATCH_WINDOW", "0.01"))
+# WS_BATCH_MAX_EVENTS: Maximum number of frames packed into one batch frame.
+WS_BATCH_MAX_EVENTS = int(os.getenv("WS_BATCH_MAX_EVENTS", "100"))
+# WS_BATCH_MAX_BYTES: Approximate upper bound on the size of one batch frame.
+WS_BATCH_MAX_BYTES = int(os.getenv("WS_BATCH_MAX_BYTES", str(64 * 1024)))
+
+class WebSocketClosed(Exception):
+    """Raised when enqueueing on a writer whose connection is gone."""
+
+class WebSocketWriter:
+    """
+    Owns all writes to one WebSocket connection.
+    Producers only enqueue frames; a single writer coroutine drains the bounded queue,
+    so concurrent tasks on one socket never contend on a lock around network I/O.
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        maxsize: int = WS_OUTBOUND_QUEUE_SIZE,
+        policy: str = WS_OVERFLOW_POLICY,
+        codec: Optional[Union[JsonCodec, MsgpackCodec]] = None
+    ):
+        if policy not in WS_OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.websocket = websocket
+        self.codec = codec or JsonCodec()
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        # Entries are (frame, droppable); only progress events are droppable
+        self._queue: Deque[Tuple[Frame, bool]] = deque()
+        self._has_data = asyncio.Event()
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        # Batching settings, None until the client negotiates the capability
+        self.batch: Optional[Dict[str, Any]] = None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    async def send_json(self, data: Dict[str, Any]):
+        """Enqueues a control message (acks, errors). These are never dropped."""
+        await self.send_frame(self.codec.encode(data))
+
+    async def send_frame(self, data: Frame, droppable: bool = False):
+        """Enqueues an already-encoded frame, applying the overflow policy if the queue is full."""
+        while not self._closed and len(self._queue) >= self.maxsize:
+            if self.policy == "disconnect":
+                await self._disconnect_slow_consumer()
+                break
+            if self.policy == "drop_progress" and self._drop_oldest_progress():
+                break
+            self._has_room.clear()
+            await self._has_room.wait()
+        if self._closed:
+            raise WebSocketClosed("WebSocket connection is closed")
+        self._queue.append((data, droppable))
+        WS_OUTBOUND_QUEUE_DEPTH.inc()
+        self._has_data.set()
+
+    async def send_event(self, event: EncodedEvent, droppable: Optional[bool] = None):
+        """Enqueues a task event. Progress events may be dropped under the drop_progress policy unless `droppable=False`."""
+        if droppable is None:
+            droppable = event.type == "progress"
+        await self.send_frame(self.codec.encode_event(event), droppable=droppable)
+
+    async def close(self):
+        """Stops the writer. Frames still queued are discarded."""
+        self._mark_closed()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def enable_batching(
+        self,
+        window: float = WS_BATCH_WINDOW,
+        max_events: int = WS_BATCH_MAX_EVENTS,
+        max_bytes: int = WS_BATCH_MAX_BYTES
+    ) -> Dict[str, Any]:
+        """
+        Packs frames that are ready within `window` seconds (up to `max_events` / `max_bytes`)
+        into a single `{"type": "batch", "events": [...]}` frame. A lone frame is sent unwrapped.
+        """
+        self.batch = {
+            "window": max(0.0, min(window, 1.0)),
+            "max_events": max(1, min(max_events, WS_BATCH_MAX_EVENTS)),
+            "max_bytes": max(1, min(max_bytes, WS_BATCH_MAX_BYTES)),
+        }
+        return self.batch
+
+    def _drop_oldest_progress(self) -> bool:
+        for i, (_, droppable) in enumerate(self._queue):
+            if droppable:
+                del self._queue[i]
+                self.dropped += 1
+                WS_OUTBOUND_QUEUE_DEPTH.dec()
+                WS_OUTBOUND_DROPPED_TOTAL.inc()
+                return True
+        return False
+
+    async def _disconnect_slow_consumer(self):
+        logger.warning(f"WebSocket outbound queue full ({self.maxsize} frames), disconnecting slow consumer")
+        WS_SLOW_CONSUMER_DISCONNECTS_TOTAL.inc()
+        self._mark_closed()
+        try:
+            await self.websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Slow consumer")
+        except Exception:
+            pass
+
+    def _mark_closed(self):
+        if not self._closed:
+            self._closed = True
+            WS_OUTBOUND_QUEUE_DEPTH.dec(len(self._queue))
+            self._queue.clear()
+        # Wake anyone waiting for room or data so they can observe the closure
+        self._has_room.set()
+        self._has_data.set()
+
+    def _pop(self) -> Frame:
+        data, _ = self._queue.popleft()
+        WS_OUTBOUND_QUEUE_DEPTH.dec()
+        self._has_room.set()
+        return data
+
+    async def _collect_batch(self, first: Frame) -> Frame:
+        frames = [first]
+        size = len(first)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch["window"]
+        while len(frames) < self.batch["max_events"] and not self._closed:
+            if not self._queue:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._has_data.clear()
+                try:
+                    await asyncio.wait_for(self._has_data.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                continue
+            if size + len(self._queue[0][0]) > self.batch["max_bytes"]:
+                break
+            data = self._pop()
+            frames.append(data)
+            size += len(data)
+        WS_BATCH_EVENTS.observe(len(frames))
+        if len(frames) == 1:
+            return first
+        return self.codec.batch(frames)
+
+    async def _run(self):
+        try:
+            while True:
+                while not self._queue:
+                    if self._closed:
+                        return
+                    self._has_data.clear()
+                    await self._has_data.wait()
+                data = self._pop()
+                if self.batch is not None:
+                    data = await self._collect_batch(data)
+                start = time.perf_counter()
+                if isinstance(data, bytes):
+                    await self.websocket.send_bytes(data)
+                else:
+                    await self.websocket.send_text(data)
+                WS_SEND_LATENCY.observe(time.perf_counter() - start)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # If the websocket is closed, we might get an error here
+            logger.error(f"Error sending WS message: {e}")
+        finally:
+            self._mark_closed()
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark for registry contention.
+
+Keeps N tasks alive at once and drives every registry operation for all of them concurrently
+on the event loop: store, consuming and non-consuming lookups, a stale sweep alongside lookups,
+and removal.
+
+Usage: python bench_registry.py [tasks]
+"""
+import asyncio
+import sys
+import time
+
+from backend.app.bridge import ToolRegistry
+from backend.app.scheduler import AdmissionScheduler
+
+async def timed(label: str, count: int, ops) -> list:
+    start = time.perf_counter()
+    results = await asyncio.gather(*ops)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {count / elapsed:>12,.0f} ops/sec")
+    return results
+
+async def main(count: int):
+    registry = ToolRegistry()
+    registry.scheduler = AdmissionScheduler(max_concurrent=count)
+    release = asyncio.Event()
+
+    async def waiting_gen():
+        await release.wait()
+        yield {"status": "done"}
+
+    call_ids = [f"bench-{i}" for i in range(count)]
+    print(f"Registry operations with {count:,} live tasks")
+    await timed("store_task", count, [registry.store_task(call_id, waiting_gen(), "bench_tool") for call_id in call_ids])
+    records = await timed("get_task", count, [registry.get_task(call_id) for call_id in call_ids])
+    await timed("mark_consumed", count, [registry.mark_consumed(call_id) for call_id in call_ids])
+    await timed("get_task_no_consume", count, [registry.get_task_no_consume(call_id) for call_id in call_ids])
+    # The stale sweep runs alongside lookups instead of blocking them
+    await timed("stale sweep + lookups", count, [
+        registry.cleanup_stale_tasks(max_age_seconds=3600),
+        *[registry.get_task_no_consume(call_id) for call_id in call_ids]
+    ])
+    await timed("remove_task", count, [registry.remove_task(call_id) for call_id in call_ids])
+    release.set()
+    await asyncio.gather(*[record.stream.task for record in records], return_exceptions=True)
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark for task event serialization.
+
+Compares the previous per-event path (build a ProgressEvent model, dump it, and re-encode
+the dict with stdlib json as `websocket.send_json` did) against the direct envelope encoder.
+
+Usage: python bench_serialization.py [events]
+"""
+import json
+import sys
+import time
+
+from backend.app.bridge import ProgressEvent, ProgressPayload
+from backend.app.stream import EventEncoder
+
+CALL_ID = "550e8400-e29b-41d4-a716-446655440000"
+
+def make_items(count: int):
+    items = []
+    for i in range(count):
+        if i % 10 == 9:
+            items.append(("result", {"status": "complete", "items": i, "summary": "Batch finished"}))
+        else:
+            items.append(("progress", ProgressPayload(
+                step="Analyzing documents", pct=i % 101, log=f"Processed document {i}",
+                metadata={"doc_id": f"doc_{i}", "batch_size": 100}
+            )))
+    return items
+
+def model_ws(items):
+    # Previous WebSocket path: model_dump() then send_json's json.dumps
+    for event_type, payload in items:
+        json.dumps(ProgressEvent(call_id=CALL_ID, type=event_type, payload=payload).model_dump(), separators=(",", ":"))
+
+def model_sse(items):
+    # Previous SSE path
+    for event_type, payload in items:
+        ProgressEvent(call_id=CALL_ID, type=event_type, payload=payload).model_dump_json()
+
+def direct(items):
+    encoder = EventEncoder(CALL_ID)
+    for seq, (event_type, payload) in enumerate(items, 1):
+        encoder.encode(seq, event_type, payload)
+
+def run(name: str, fn, items, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - start)
+    rate = len(items) / best
+    print(f"{name:<28} {rate:>12,.0f} events/sec")
+    return rate
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    items = make_items(count)
+    print(f"Serializing {count:,} events (best of 5)")
+    ws_rate = run("model_dump + json.dumps", model_ws, items)
+    sse_rate = run("model_dump_json", model_sse, items)
+    direct_rate = run("EventEncoder", direct, items)
+    print(f"Speedup: {direct_rate / ws_rate:.1f}x vs WS path, {direct_rate / sse_rate:.1f}x vs SSE path")
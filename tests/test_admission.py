@@ -0,0 +1,144 @@
+import asyncio
+import sys
+import os
+import pytest
+import httpx
+from httpx import ASGITransport
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main, auth
+from backend.app.bridge import ToolRegistry, ProgressPayload
+from backend.app.scheduler import AdmissionScheduler
+
+def make_registry(max_concurrent: int, **tool_options) -> ToolRegistry:
+    registry = ToolRegistry()
+    registry.scheduler = AdmissionScheduler(max_concurrent=max_concurrent, position_interval=0.02)
+    registry.gate = asyncio.Event()
+    registry.order = []
+
+    async def gated_tool(label: str = ""):
+        registry.order.append(label)
+        yield ProgressPayload(step="Running", pct=0)
+        await registry.gate.wait()
+        yield {"label": label}
+
+    registry.register("gated_tool", **tool_options)(gated_tool)
+    registry.register("other_tool")(gated_tool)
+    return registry
+
+async def start(registry: ToolRegistry, call_id: str, tool_name: str = "gated_tool", priority: int = 0):
+    return await registry.store_task(call_id, registry.get_tool(tool_name)(label=call_id), tool_name, priority=priority)
+
+def queued_positions(stream):
+    return [e.payload["position"] for e in stream._backlog if e.type == "queued"]
+
+@pytest.mark.asyncio
+async def test_tasks_beyond_the_cap_wait_in_order():
+    registry = make_registry(max_concurrent=2)
+    streams = [await start(registry, f"t{i}") for i in range(4)]
+    await asyncio.sleep(0.05)
+
+    assert registry.order == ["t0", "t1"]
+    assert registry.scheduler.running == 2
+    assert registry.scheduler.queued == 2
+    assert [s.status for s in streams] == ["running", "running", "queued", "queued"]
+    assert queued_positions(streams[2]) == [1]
+    assert queued_positions(streams[3]) == [2]
+    assert streams[3]._backlog[0].payload == {"position": 2, "queued": 2}
+
+    registry.gate.set()
+    await asyncio.wait_for(asyncio.gather(*(s.task for s in streams)), timeout=2)
+    assert registry.order == ["t0", "t1", "t2", "t3"]
+    assert all(s.status == "success" for s in streams)
+    assert registry.scheduler.running == 0
+    assert registry.scheduler.queued == 0
+
+@pytest.mark.asyncio
+async def test_higher_priority_is_admitted_first():
+    registry = make_registry(max_concurrent=1)
+    running = await start(registry, "busy")
+    await asyncio.sleep(0.01)
+    low = await start(registry, "low", priority=0)
+    await asyncio.sleep(0.01)
+    high = await start(registry, "high", priority=10)
+
+    # The high priority task jumps ahead, and the low priority one is told it moved back
+    await asyncio.sleep(0.05)
+    assert queued_positions(high) == [1]
+    assert queued_positions(low) == [1, 2]
+
+    registry.gate.set()
+    await asyncio.wait_for(asyncio.gather(running.task, low.task, high.task), timeout=2)
+    assert registry.order == ["busy", "high", "low"]
+
+@pytest.mark.asyncio
+async def test_per_tool_cap_does_not_hold_back_other_tools():
+    registry = make_registry(max_concurrent=10, max_concurrency=1)
+    first = await start(registry, "a1")
+    second = await start(registry, "a2")
+    other = await start(registry, "b1", tool_name="other_tool")
+    await asyncio.sleep(0.05)
+
+    assert registry.order == ["a1", "b1"]
+    assert second.status == "queued"
+
+    registry.gate.set()
+    await asyncio.wait_for(asyncio.gather(first.task, second.task, other.task), timeout=2)
+    assert registry.order == ["a1", "b1", "a2"]
+
+@pytest.mark.asyncio
+async def test_stopping_a_queued_task_frees_its_place():
+    registry = make_registry(max_concurrent=1)
+    busy = await start(registry, "busy")
+    await asyncio.sleep(0.01)
+    doomed = await start(registry, "doomed")
+    waiting = await start(registry, "waiting")
+    await asyncio.sleep(0.01)
+    assert queued_positions(waiting) == [2]
+
+    await registry.remove_task("doomed")
+    await asyncio.wait_for(doomed.task, timeout=1)
+    assert doomed.status == "cancelled"
+    assert registry.scheduler.queued == 1
+    await asyncio.sleep(0.05)
+    assert queued_positions(waiting) == [2, 1]
+
+    registry.gate.set()
+    await asyncio.wait_for(asyncio.gather(busy.task, waiting.task), timeout=2)
+    assert registry.order == ["busy", "waiting"]
+    assert registry.scheduler.running == 0
+
+def test_priority_defaults_to_the_api_keys(monkeypatch):
+    monkeypatch.setattr(auth, "API_KEY_PRIORITIES", {"gold-key": 10})
+    assert main.resolve_priority(None, "gold-key") == 10
+    assert main.resolve_priority(None, "other-key") == 0
+    assert main.resolve_priority(None, None) == 0
+    # An explicit integer wins; anything else falls back to the key's priority
+    assert main.resolve_priority(-3, "gold-key") == -3
+    assert main.resolve_priority(True, "gold-key") == 10
+    assert main.resolve_priority("high", "gold-key") == 10
+
+@pytest.mark.asyncio
+async def test_start_task_passes_priority_to_the_registry(monkeypatch):
+    monkeypatch.setattr(auth, "API_KEY_PRIORITIES", {"gold-key": 7})
+    seen = []
+    original = main.registry.store_task
+
+    async def recording_store_task(call_id, gen, tool_name, priority=0, owner=None):
+        seen.append((priority, owner))
+        return await original(call_id, gen, tool_name, priority=priority, owner=owner)
+
+    monkeypatch.setattr(main.registry, "store_task", recording_store_task)
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        for body, headers in (
+            ({"args": {"duration": 0}, "priority": 3}, {}),
+            ({"args": {"duration": 0}}, {"X-API-Key": "gold-key"}),
+        ):
+            response = await client.post("/start_task/long_audit", json=body, headers=headers)
+            assert response.status_code == 200
+            await main.registry.remove_task(response.json()["call_id"])
+
+    # The API key travels with the task into the store as its owner
+    assert seen == [(3, None), (7, "gold-key")]
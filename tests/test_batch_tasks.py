@@ -0,0 +1,101 @@
+import asyncio
+import sys
+import os
+import pytest
+import httpx
+from httpx import ASGITransport
+from fastapi.testclient import TestClient
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ToolRegistry, ProgressPayload
+
+@pytest.fixture
+def batch_registry(monkeypatch):
+    registry = ToolRegistry()
+    registry.gate = asyncio.Event()
+
+    async def fetch(doc: int):
+        yield ProgressPayload(step=f"Fetching {doc}", pct=0)
+        await registry.gate.wait()
+        yield {"doc": doc}
+
+    registry.register("fetch")(fetch)
+    monkeypatch.setattr(main, "registry", registry)
+    return registry
+
+@pytest.mark.asyncio
+async def test_start_tasks_reports_results_in_order(batch_registry):
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        response = await client.post("/start_tasks", json={"tasks": [
+            {"tool_name": "fetch", "args": {"doc": 1}},
+            {"tool_name": "missing", "args": {}},
+            {"tool_name": "fetch", "args": {"doc": "not a number"}},
+            {"tool_name": "fetch", "args": {"doc": 2}, "priority": 5},
+        ]}, headers={"X-API-Key": "k1"})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r.get("error") is None for r in results] == [True, False, False, True]
+        assert results[1] == {"tool_name": "missing", "error": "Tool not found: missing"}
+        assert "doc" in results[2]["error"]
+        assert results[0]["stream_url"] == f"/stream/{results[0]['call_id']}"
+        assert sorted(call_id for call_id, _ in batch_registry.list_tasks()) == sorted([results[0]["call_id"], results[3]["call_id"]])
+        assert all(record.owner == "k1" for _, record in batch_registry.list_tasks())
+
+        batch_registry.gate.set()
+        stream = await client.get(results[3]["stream_url"])
+        assert '"doc":2' in stream.text
+
+        too_many = await client.post("/start_tasks", json={"tasks": [{"tool_name": "fetch"}] * (main.START_BATCH_MAX + 1)})
+        assert too_many.status_code == 422
+
+@pytest.mark.asyncio
+async def test_stop_tasks_by_call_id_and_tool(batch_registry):
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        mine = (await client.post("/start_tasks", json={"tasks": [{"tool_name": "fetch", "args": {"doc": i}} for i in range(3)]},
+                                  headers={"X-API-Key": "k1"})).json()["results"]
+        theirs = (await client.post("/start_task/fetch", json={"args": {"doc": 9}}, headers={"X-API-Key": "k2"})).json()
+
+        stopped = (await client.post("/stop_tasks", json={"call_ids": [mine[0]["call_id"], "unknown"]})).json()
+        assert stopped == {"stopped": [mine[0]["call_id"]], "not_found": ["unknown"]}
+
+        # By tool name, only the caller's own tasks are stopped
+        stopped = (await client.post("/stop_tasks", json={"tool_name": "fetch"}, headers={"X-API-Key": "k1"})).json()
+        assert sorted(stopped["stopped"]) == sorted(r["call_id"] for r in mine[1:])
+        assert [call_id for call_id, _ in batch_registry.list_tasks()] == [theirs["call_id"]]
+        await batch_registry.cleanup_tasks()
+
+def test_ws_start_batch_and_stop_many(batch_registry):
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "start_batch", "request_id": "b1", "tasks": [
+                {"tool_name": "fetch", "args": {"doc": 1}},
+                {"tool_name": "fetch", "args": {"doc": 2}},
+                "not an object",
+            ]})
+            messages = [ws.receive_json() for _ in range(3)]
+            started = next(m for m in messages if m["type"] == "batch_started")
+            assert started["request_id"] == "b1"
+            first, second, bad = started["results"]
+            assert "error" in bad
+            progress = {m["call_id"] for m in messages if m["type"] == "progress"}
+            assert progress <= {first["call_id"], second["call_id"]}
+
+            ws.send_json({"type": "stop_many", "call_ids": [first["call_id"], "unknown"], "request_id": "s1"})
+            ack = None
+            while ack is None:
+                message = ws.receive_json()
+                if message["type"] == "stop_many_success":
+                    ack = message
+            assert ack["stopped"] == [first["call_id"]]
+            assert ack["not_found"] == ["unknown"]
+
+            ws.send_json({"type": "stop_many", "all": True, "request_id": "s2"})
+            ack = None
+            while ack is None:
+                message = ws.receive_json()
+                if message["type"] == "stop_many_success":
+                    ack = message
+            assert ack["stopped"] == [second["call_id"]]
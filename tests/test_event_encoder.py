@@ -0,0 +1,41 @@
+import sys
+import os
+import datetime
+import pytest
+from pydantic import ValidationError
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.bridge import ProgressEvent, ProgressPayload
+from backend.app.stream import EventEncoder
+
+PAYLOADS = [
+    ("progress", ProgressPayload(step="Scanning", pct=40)),
+    ("progress", ProgressPayload(step="Ünïcødé \"quoted\"\n", pct=100, log="done", metadata={"nested": {"a": [1, 2.5, None]}})),
+    ("result", {"status": "complete", "findings": [], "ratio": 0.1, "ok": True}),
+    ("result", {"when": datetime.datetime(2024, 1, 2, 3, 4, 5), "emoji": "🚀"}),
+    ("result", {}),
+    ("input_request", {"prompt": "Continue?"}),
+    ("error", {"detail": "boom"}),
+    # Shaped like a ProgressPayload, so the envelope coerces it
+    ("result", {"step": "Looks like progress", "pct": 5, "extra": 1}),
+    ("result", {"step": "Invalid pct", "pct": 500}),
+]
+
+@pytest.mark.parametrize("event_type,payload", PAYLOADS)
+def test_encoder_matches_model_dump_json(event_type, payload):
+    call_id = 'call-"1"-ü'
+    encoded = EventEncoder(call_id).encode(7, event_type, payload)
+    expected = ProgressEvent(call_id=call_id, type=event_type, payload=payload)
+    assert encoded.data == expected.model_dump_json()
+    assert encoded.seq == 7
+    assert encoded.type == event_type
+    assert encoded.payload == expected.payload
+
+def test_encoder_keeps_model_validation_for_other_shapes():
+    encoder = EventEncoder("call")
+    with pytest.raises(ValidationError):
+        encoder.encode(1, "result", "just a string")
+    with pytest.raises(ValidationError):
+        encoder.encode(1, "result", {1: "int key"})
@@ -0,0 +1,104 @@
+import asyncio
+import sys
+import os
+import time
+import pytest
+import httpx
+from httpx import ASGITransport
+from fastapi.testclient import TestClient
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.load import OverloadController
+
+@pytest.fixture
+def overloaded(monkeypatch):
+    # A long sampling interval keeps a monitor started by the app's lifespan from clearing the forced overload
+    controller = OverloadController(interval=60, shed_lag=0.1, recover_lag=0.05)
+    for _ in range(10):
+        controller.record(0.4)
+    assert controller.overloaded
+    monkeypatch.setattr(main, "load_controller", controller)
+    return controller
+
+def test_controller_sheds_with_hysteresis():
+    controller = OverloadController(shed_lag=0.1, recover_lag=0.05)
+    controller.record(0.05)
+    assert not controller.overloaded
+    assert controller.check("http") is None
+
+    for _ in range(10):
+        controller.record(0.4)
+    assert controller.overloaded
+    assert controller.saturation > 1
+    assert controller.check("http") >= 1.0
+
+    # Dropping under the shedding threshold isn't enough; the lag has to reach the recovery threshold
+    while controller.lag > 0.08:
+        controller.record(0.0)
+    assert controller.overloaded
+    while controller.lag > 0.04:
+        controller.record(0.0)
+    assert not controller.overloaded
+    assert controller.shed == 1
+
+@pytest.mark.asyncio
+async def test_monitor_measures_a_blocked_loop():
+    controller = OverloadController(interval=0.01, shed_lag=0.05, recover_lag=0.01)
+    controller.start()
+    await asyncio.sleep(0.03)
+    for _ in range(5):
+        # Block the loop the way a CPU-bound tool would
+        time.sleep(0.15)
+        await asyncio.sleep(0)
+    assert controller.lag > 0.05
+    assert controller.overloaded
+    await controller.stop()
+
+@pytest.mark.asyncio
+async def test_deferred_start_proceeds_once_load_clears():
+    controller = OverloadController(shed_lag=0.1, recover_lag=0.05, mode="defer", max_defer=1.0)
+    for _ in range(10):
+        controller.record(0.4)
+    admit = asyncio.create_task(controller.admit("http"))
+    await asyncio.sleep(0.05)
+    assert not admit.done()
+    while controller.overloaded:
+        controller.record(0.0)
+    assert await asyncio.wait_for(admit, timeout=1) is None
+
+    for _ in range(10):
+        controller.record(0.4)
+    controller.max_defer = 0.05
+    assert await controller.admit("http") is not None
+
+@pytest.mark.asyncio
+async def test_http_start_is_rejected_with_retry_after(overloaded):
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        response = await client.post("/start_task/long_audit", json={"args": {"duration": 0}})
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+        load = (await client.get("/load")).json()
+        assert load["overloaded"] is True
+        assert load["saturation"] > 1
+        assert load["retry_after"] >= 1
+        assert load["shed_total"] == 1
+        assert {"running_tasks", "queued_tasks", "max_concurrent_tasks"} <= load.keys()
+
+def test_ws_start_is_rejected_but_control_traffic_is_served(overloaded):
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "start", "tool_name": "long_audit", "args": {"duration": 0}, "request_id": "r1"})
+            error = ws.receive_json()
+            assert error["type"] == "error"
+            assert error["request_id"] == "r1"
+            assert error["payload"]["retryable"] is True
+            assert error["payload"]["retry_after"] >= 1
+
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+            ws.send_json({"type": "stop", "call_id": "unknown", "request_id": "r2"})
+            assert ws.receive_json()["request_id"] == "r2"
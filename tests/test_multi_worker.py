@@ -0,0 +1,96 @@
+import asyncio
+import sys
+import os
+import tempfile
+import pytest
+import pytest_asyncio
+import httpx
+from httpx import ASGITransport
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ProgressPayload, input_manager
+from backend.app.context import call_id_var
+from backend.app.relay import RelayRegistry, owner_of
+
+def make_worker(ipc_dir: str, worker_id: str) -> RelayRegistry:
+    registry = RelayRegistry(ipc_dir, worker_id=worker_id)
+
+    async def ask(label: str = ""):
+        yield ProgressPayload(step=label, pct=0)
+        answer = await input_manager.wait_for_input(call_id_var.get(), "Continue?")
+        yield {"label": label, "answer": answer}
+
+    registry.register("ask")(ask)
+    return registry
+
+@pytest_asyncio.fixture
+async def workers():
+    # A short directory keeps socket paths under the unix limit
+    with tempfile.TemporaryDirectory(prefix="adk") as ipc_dir:
+        first, second = make_worker(ipc_dir, "w1"), make_worker(ipc_dir, "w2")
+        await first.start()
+        await second.start()
+        yield first, second
+        for registry in (first, second):
+            await registry.cleanup_tasks()
+            await registry.close()
+
+def test_call_ids_name_their_worker():
+    registry = RelayRegistry("/tmp", worker_id="w7")
+    call_id = registry.new_call_id()
+    assert owner_of(call_id) == "w7"
+    assert owner_of("3f1c2a9e-0000-4000-8000-000000000000") is None
+    assert owner_of("x.../etc") is None
+    assert registry.is_foreign("x.w2") and not registry.is_foreign(call_id)
+    with pytest.raises(ValueError):
+        RelayRegistry("/tmp", worker_id="../w")
+
+@pytest.mark.asyncio
+async def test_stream_and_input_through_another_worker(workers, monkeypatch):
+    first, second = workers
+    call_id = first.new_call_id()
+    await first.start_task(call_id, "ask", {"label": "a"})
+
+    # The request lands on the second worker, which relays to the first
+    monkeypatch.setattr(main, "registry", second)
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        for _ in range(50):
+            answered = await client.post("/provide_input", json={"call_id": call_id, "value": "yes"})
+            if answered.status_code == 200:
+                break
+            await asyncio.sleep(0.01)
+        assert answered.status_code == 200
+        response = await client.get(f"/stream/{call_id}")
+        assert response.status_code == 200
+        assert '"step":"a"' in response.text
+        assert '"answer":"yes"' in response.text
+
+        missing = await client.get("/stream/00000000-0000-4000-8000-000000000000.w1")
+        assert missing.status_code == 404
+        unreachable = await client.post("/provide_input", json={"call_id": "x.w9", "value": 1})
+        assert unreachable.status_code == 404
+
+    assert (await first.get_task_no_consume(call_id)).consumed
+
+@pytest.mark.asyncio
+async def test_stop_through_another_worker(workers):
+    first, second = workers
+    call_id = first.new_call_id()
+    stream = await first.start_task(call_id, "ask", {"label": "b"})
+
+    record = await second.get_task_no_consume(call_id)
+    assert record.gen is None and not record.stream.is_local
+    sub = record.stream.subscribe()
+    event = await asyncio.wait_for(anext(aiter(sub)), timeout=1)
+    assert event.type == "progress" and event.call_id == call_id
+    # A relayed viewer leaving doesn't stop the task
+    record.stream.unsubscribe(sub)
+    await asyncio.sleep(0.05)
+    assert stream.status == "running"
+
+    assert await second.remove_tasks([call_id, "y.w1"]) == [call_id]
+    assert stream.finished
+    assert await second.get_task_no_consume(call_id) is None
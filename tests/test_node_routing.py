@@ -0,0 +1,121 @@
+import asyncio
+import sys
+import os
+import json
+import pytest
+import httpx
+from httpx import ASGITransport
+from fastapi.testclient import TestClient
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ToolRegistry, ProgressPayload, input_manager
+from backend.app.context import call_id_var
+from backend.app.routing import NodeRouter, node_of, parse_peers, FORWARDED_HEADER
+
+@pytest.fixture
+def nodes(monkeypatch):
+    """This process plays node n2; node n1 is the same app reached through the forwarding hop."""
+    registry = ToolRegistry()
+
+    async def ask():
+        yield ProgressPayload(step="Asking", pct=10)
+        yield {"type": "input_request", "payload": {"prompt": "Go?"}}
+        answer = await input_manager.wait_for_input(call_id_var.get(), "Go?")
+        yield {"answer": answer}
+
+    registry.register("ask")(ask)
+    router = NodeRouter("n2", peers={"n1": "http://n1"}, peers_file=None, transport=ASGITransport(app=main.app))
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(main, "router", router)
+    return registry, router
+
+def test_call_ids_name_their_node(tmp_path):
+    router = NodeRouter("n2", peers=parse_peers("n1=http://a:8000/, bad/=http://b"), peers_file=None)
+    assert router.peers() == {"n1": "http://a:8000"}
+    assert router.tag("abc") == "abc.n2"
+    # In multi-worker mode the node comes before the worker label
+    assert router.tag("abc.w7") == "abc.n2.w7"
+    assert node_of("abc.n2.w7") == "n2"
+    assert router.owner("abc.n1") == "n1"
+    assert router.owner("abc.n2.w7") is None
+    assert router.owner("abc") is None
+    assert NodeRouter(None).owner("abc.n1") is None
+
+    peers_file = tmp_path / "peers.json"
+    peers_file.write_text(json.dumps({"n3": "http://c:8000"}))
+    router = NodeRouter("n2", peers={"n1": "http://a"}, peers_file=str(peers_file))
+    assert router.peers() == {"n1": "http://a", "n3": "http://c:8000"}
+    peers_file.write_text(json.dumps({"n4": "http://d"}))
+    os.utime(peers_file, (0, 12345))
+    assert router.peers() == {"n1": "http://a", "n4": "http://d"}
+
+@pytest.mark.asyncio
+async def test_stream_input_and_stop_are_forwarded(nodes):
+    registry, router = nodes
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        started = (await client.post("/start_task/ask")).json()
+        assert node_of(started["call_id"]) == "n2"
+
+        # A task owned by n1, reached from n2 through the hop
+        call_id = "0b7a6c1e-5f31-4c43-9f0e-2d4b6a8c9e10.n1"
+        await registry.start_task(call_id, "ask", {})
+        for _ in range(50):
+            answered = await client.post("/provide_input", json={"call_id": call_id, "value": "yes"})
+            if answered.status_code == 200:
+                break
+            await asyncio.sleep(0.01)
+        assert answered.json() == {"status": "input accepted"}
+        response = await client.get(f"/stream/{call_id}")
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert '"answer":"yes"' in response.text
+
+        other = "1c8b7d2f-6a42-4d54-8a1f-3e5c7b9d0f21.n1"
+        stream = await registry.start_task(other, "ask", {})
+        stopped = await client.post(f"/stop_task/{other}")
+        assert stopped.json() == {"status": "stop signal sent"}
+        await asyncio.sleep(0.01)
+        assert stream.finished
+
+        # A forwarded request is served where it lands, never forwarded again
+        loop = await client.post("/stop_task/x.n1", headers={FORWARDED_HEADER: "n1"})
+        assert loop.status_code == 404
+        unknown = await client.get("/stream/x.n9")
+        assert unknown.status_code == 404
+        assert "unknown node n9" in unknown.json()["detail"]
+    await registry.cleanup_tasks()
+    await router.close()
+
+@pytest.mark.asyncio
+async def test_unreachable_node(monkeypatch):
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+    router = NodeRouter("n2", peers={"n1": "http://n1"}, peers_file=None, transport=httpx.MockTransport(refuse))
+    monkeypatch.setattr(main, "router", router)
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        response = await client.post("/stop_task/x.n1")
+        assert response.status_code == 502
+    assert await router.call("n1", "/provide_input", {"call_id": "x.n1", "value": 1}) is None
+    await router.close()
+
+def test_ws_input_is_forwarded(nodes, monkeypatch):
+    # Tasks started here are labelled as n1's, so their input has to cross the hop
+    monkeypatch.setattr(main, "new_call_id", lambda: "2d9c8e3a-7b53-4e65-9b2a-4f6d8cae1f32.n1")
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "start", "tool_name": "ask", "request_id": "r1"})
+            message = ws.receive_json()
+            call_id = message["call_id"]
+            while message["type"] != "input_request":
+                message = ws.receive_json()
+
+            ws.send_json({"type": "input", "call_id": call_id, "value": "go", "request_id": "i1"})
+            message = ws.receive_json()
+            while message["type"] not in ("input_success", "error"):
+                message = ws.receive_json()
+            assert message == {"type": "input_success", "call_id": call_id, "request_id": "i1"}
+            while message["type"] != "result":
+                message = ws.receive_json()
+            assert message["payload"] == {"answer": "go"}
@@ -0,0 +1,110 @@
+import asyncio
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pydantic import ValidationError
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.bridge import ToolRegistry, ProgressPayload
+from backend.app.executors import process_executor
+
+# Tools run in worker processes, so they must live at module level where the worker can import them
+
+async def cpu_tool(n: int):
+    total = 0
+    for i in range(n):
+        total += sum(j * j for j in range(20000))
+        yield ProgressPayload(step=f"Chunk {i + 1}", pct=(i + 1) * 100 // n, metadata={"pid": os.getpid()})
+    yield {"total": total, "pid": os.getpid()}
+
+async def endless_tool(marker: str):
+    try:
+        while True:
+            yield ProgressPayload(step="Spinning", pct=0)
+            await asyncio.sleep(0.05)
+    finally:
+        with open(marker, "w") as f:
+            f.write("closed")
+
+async def quiet_tool():
+    yield ProgressPayload(step="Waiting", pct=0)
+    await asyncio.sleep(60)
+
+async def failing_tool():
+    yield ProgressPayload(step="About to fail", pct=10)
+    raise ValueError("worker exploded")
+
+@pytest.fixture(scope="module")
+def registry():
+    registry = ToolRegistry()
+    registry.register("cpu_tool", executor="process")(cpu_tool)
+    registry.register("endless_tool", executor="process")(endless_tool)
+    registry.register("failing_tool", executor="process")(failing_tool)
+    registry.register("quiet_tool", executor="process")(quiet_tool)
+    yield registry
+    process_executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_process_tool_streams_from_worker(registry):
+    await process_executor.warm()
+    tool = registry.get_tool("cpu_tool")
+    stream = await registry.store_task("proc-stream", tool(n=3), "cpu_tool")
+    events = [event async for event in stream.events()]
+
+    assert [e.type for e in events] == ["progress", "progress", "progress", "result"]
+    assert events[2].payload.pct == 100
+    result = events[-1].payload
+    assert result["total"] == 3 * sum(j * j for j in range(20000))
+    assert result["pid"] != os.getpid()
+    assert events[0].payload.metadata["pid"] == result["pid"]
+    assert stream.status == "success"
+
+@pytest.mark.asyncio
+async def test_process_tool_validates_arguments_in_api_process(registry):
+    tool = registry.get_tool("cpu_tool")
+    with pytest.raises(ValidationError):
+        tool(n="not a number")
+
+@pytest.mark.asyncio
+async def test_stop_propagates_into_worker(registry, tmp_path):
+    marker = tmp_path / "closed"
+    tool = registry.get_tool("endless_tool")
+    stream = await registry.store_task("proc-stop", tool(marker=str(marker)), "endless_tool")
+    sub = stream.subscribe().__aiter__()
+    assert (await asyncio.wait_for(sub.__anext__(), timeout=30)).type == "progress"
+
+    await registry.remove_task("proc-stop")
+    await asyncio.wait_for(stream.task, timeout=5)
+    assert stream.status == "cancelled"
+
+    # The tool's own cleanup ran inside the worker
+    deadline = time.monotonic() + 5
+    while not marker.exists() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    assert marker.read_text() == "closed"
+
+@pytest.mark.asyncio
+async def test_worker_errors_become_error_events(registry):
+    tool = registry.get_tool("failing_tool")
+    stream = await registry.store_task("proc-error", tool(), "failing_tool")
+    events = [event async for event in stream.events()]
+
+    assert [e.type for e in events] == ["progress", "error"]
+    assert events[-1].payload == {"detail": "worker exploded"}
+
+@pytest.mark.asyncio
+async def test_reading_channels_leaves_default_executor_free(registry):
+    # getaddrinfo and to_thread callers share the default executor; give it a single thread
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+    stream = await registry.store_task("proc-reader", registry.get_tool("quiet_tool")(), "quiet_tool")
+    sub = stream.subscribe().__aiter__()
+    assert (await asyncio.wait_for(sub.__anext__(), timeout=30)).type == "progress"
+
+    # The reader waiting on the quiet task's channel doesn't hold the only default thread
+    assert await asyncio.wait_for(asyncio.to_thread(os.getpid), timeout=0.5) == os.getpid()
+    await registry.remove_task("proc-reader")
+    await asyncio.wait_for(stream.task, timeout=5)
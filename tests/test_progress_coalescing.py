@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import os
+import pytest
+from pydantic import ValidationError
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.bridge import ToolRegistry, ProgressPayload
+from backend.app.stream import TaskStream
+
+@pytest.mark.asyncio
+async def test_tool_level_coalescing_keeps_latest_state():
+    registry = ToolRegistry()
+
+    @registry.register(name="chatty_tool", coalesce=0.05)
+    async def chatty_tool(items: int = 5000):
+        for i in range(items):
+            yield ProgressPayload(step="Item", pct=i * 100 // items, metadata={"item": i})
+        yield {"status": "done", "items": items}
+
+    assert registry.get_tool_options("chatty_tool").coalesce == 0.05
+
+    stream = await registry.store_task("coalesce-tool", registry.get_tool("chatty_tool")(), "chatty_tool")
+    events = [event async for event in stream.events()]
+
+    progress = [e for e in events if e.type == "progress"]
+    assert len(progress) < 100
+    # The first update goes out immediately and the latest state is flushed before the result
+    assert progress[0].payload.metadata["item"] == 0
+    assert progress[-1].payload.metadata["item"] == 4999
+    assert events[-1].type == "result"
+    assert [e.seq for e in events] == list(range(1, len(events) + 1))
+
+@pytest.mark.asyncio
+async def test_non_progress_events_pass_through_immediately():
+    gate = asyncio.Event()
+
+    async def tool():
+        yield ProgressPayload(step="Start", pct=0)
+        yield ProgressPayload(step="Held", pct=10)
+        yield {"type": "input_request", "payload": {"prompt": "Continue?"}}
+        await gate.wait()
+        yield {"status": "done"}
+
+    stream = TaskStream("coalesce-input", "tool", tool(), coalesce=10)
+    sub = stream.subscribe()
+    stream.start()
+
+    received = []
+    async for event in sub:
+        received.append(event)
+        if event.type == "input_request":
+            break
+    # The held progress is flushed ahead of the input request despite the long window
+    assert [(e.type, getattr(e.payload, "step", None)) for e in received] == [
+        ("progress", "Start"), ("progress", "Held"), ("input_request", None)
+    ]
+    gate.set()
+    await asyncio.wait_for(stream.task, timeout=1)
+
+@pytest.mark.asyncio
+async def test_subscription_level_coalescing():
+    release = asyncio.Event()
+
+    async def tool():
+        await release.wait()
+        for i in range(200):
+            yield ProgressPayload(step="Item", pct=i // 2)
+        yield {"status": "done"}
+
+    stream = TaskStream("coalesce-sub", "tool", tool())
+    full = stream.subscribe()
+    latest_only = stream.subscribe(coalesce=10)
+    stream.start()
+    release.set()
+
+    full_events = [event async for event in full]
+    coalesced_events = [event async for event in latest_only]
+    assert len(full_events) == 201
+    assert [e.type for e in coalesced_events] == ["progress", "progress", "result"]
+    assert coalesced_events[1].payload.pct == 99
+
+def test_unknown_tool_option_rejected():
+    registry = ToolRegistry()
+    with pytest.raises(ValidationError):
+        registry.register(name="bad_options", coalesce_ms=10)
+    with pytest.raises(ValidationError):
+        registry.register(name="bad_window", coalesce=0)
@@ -0,0 +1,111 @@
+import asyncio
+import sys
+import os
+import json
+import pytest
+import httpx
+from httpx import ASGITransport
+from fastapi.testclient import TestClient
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.main import app
+from backend.app.bridge import registry, ProgressPayload
+from backend.app.stream import TaskStream, EventEncoder, DeltaEncoder, DELTA_KEYFRAME_INTERVAL
+
+@registry.register(name="delta_tool")
+async def delta_tool(steps: int = 30):
+    for i in range(steps):
+        metadata = {"document": "report.pdf", "stage": "Analyzing", "page": i}
+        if i % 2:
+            metadata["retry"] = True
+        yield ProgressPayload(step="Analyzing", pct=i * 100 // steps, log=f"Page {i}", metadata=metadata)
+    yield {"status": "complete"}
+
+def apply_events(events):
+    """Rebuilds the latest progress state the way a delta-aware client would."""
+    states, state = [], None
+    for event in events:
+        if event["type"] == "progress":
+            state = dict(event["payload"], metadata=dict(event["payload"]["metadata"]))
+        elif event["type"] == "progress_delta":
+            changes = dict(event["payload"])
+            metadata = changes.pop("metadata", {})
+            for key in changes.pop("metadata_removed", []):
+                state["metadata"].pop(key)
+            state.update(changes)
+            state["metadata"].update(metadata)
+        else:
+            continue
+        states.append(json.loads(json.dumps(state)))
+    return states
+
+async def run_delta_tool(call_id: str):
+    stream = TaskStream(call_id, "delta_tool", delta_tool())
+    full = stream.subscribe()
+    delta = stream.subscribe(delta=True)
+    stream.start()
+    full_events = [json.loads(e.data) for e in [event async for event in full]]
+    delta_events = [json.loads(e.data) for e in [event async for event in delta]]
+    return full_events, delta_events
+
+@pytest.mark.asyncio
+async def test_delta_events_rebuild_full_state():
+    full_events, delta_events = await run_delta_tool("delta-rebuild")
+
+    assert apply_events(delta_events) == apply_events(full_events)
+    assert len(json.dumps(delta_events)) < len(json.dumps(full_events))
+    # Keyframes at the start and every DELTA_KEYFRAME_INTERVAL progress events
+    types = [e["type"] for e in delta_events]
+    assert [i for i, t in enumerate(types) if t == "progress"] == [0, DELTA_KEYFRAME_INTERVAL]
+    assert types[-1] == "result"
+
+    second = delta_events[1]
+    assert second["base"] == 1
+    assert second["payload"] == {"log": "Page 1", "pct": 3, "metadata": {"page": 1, "retry": True}}
+    assert delta_events[2]["payload"]["metadata_removed"] == ["retry"]
+
+@pytest.mark.asyncio
+async def test_subscribers_with_same_baseline_share_delta():
+    async def tool():
+        yield ProgressPayload(step="A", pct=0)
+        yield ProgressPayload(step="A", pct=50)
+
+    stream = TaskStream("delta-shared", "tool", tool())
+    first = stream.subscribe(delta=True)
+    second = stream.subscribe(delta=True)
+    await asyncio.wait_for(stream.start(), timeout=1)
+
+    first_events = [event async for event in first]
+    second_events = [event async for event in second]
+    assert first_events[1].type == "progress_delta"
+    assert first_events[1] is second_events[1]
+
+def test_keyframe_interval():
+    encoder = DeltaEncoder(keyframe_interval=3)
+    encoder_for_call = EventEncoder("delta-interval")
+    events = [encoder_for_call.encode(seq, "progress", ProgressPayload(step="S", pct=seq)) for seq in range(1, 8)]
+    assert [encoder.apply(e).type for e in events] == [
+        "progress", "progress_delta", "progress_delta", "progress", "progress_delta", "progress_delta", "progress"
+    ]
+
+@pytest.mark.asyncio
+async def test_sse_delta_mode():
+    async with httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        start_res = await client.post("/start_task/delta_tool", json={"args": {"steps": 5}})
+        call_id = start_res.json()["call_id"]
+        response = await client.get(f"/stream/{call_id}?delta=true")
+        events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [e["type"] for e in events] == ["progress"] + ["progress_delta"] * 4 + ["result"]
+    await registry.remove_task(call_id)
+
+def test_ws_delta_mode():
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "start", "tool_name": "delta_tool", "args": {"steps": 5}, "delta": True, "request_id": "d"})
+        assert websocket.receive_json()["type"] == "task_started"
+        events = []
+        while not events or events[-1]["type"] != "result":
+            events.append(websocket.receive_json())
+    assert [e["type"] for e in events] == ["progress"] + ["progress_delta"] * 4 + ["result"]
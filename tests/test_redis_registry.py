@@ -0,0 +1,201 @@
+import asyncio
+import sys
+import os
+import json
+import pytest
+import pytest_asyncio
+import httpx
+from httpx import ASGITransport
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ProgressPayload
+from backend.app.redis_registry import (
+    RedisRegistry, RemoteTaskStream, REDIS_FINISHED_TTL, REDIS_TASK_TTL, metadata_key, events_key
+)
+
+def parse_id(entry_id: str):
+    major, minor = entry_id.split("-")
+    return int(major), int(minor)
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return record
+
+    async def execute(self):
+        return [await getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+class FakeRedis:
+    """In-memory stand-in for the subset of redis.asyncio the registry uses (decode_responses=True)."""
+    def __init__(self):
+        self.hashes = {}
+        self.streams = {}
+        self.ttl = {}
+        self._changed = asyncio.Event()
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+    async def hset(self, name, key=None, value=None, mapping=None):
+        fields = self.hashes.setdefault(name, {})
+        if key is not None:
+            fields[key] = value
+        fields.update(mapping or {})
+        return 1
+
+    async def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+    async def exists(self, *names):
+        return sum(1 for name in names if name in self.hashes or name in self.streams)
+
+    async def expire(self, name, seconds):
+        if name in self.hashes or name in self.streams:
+            self.ttl[name] = seconds
+            return True
+        return False
+
+    async def delete(self, *names):
+        for name in names:
+            self.hashes.pop(name, None)
+            self.streams.pop(name, None)
+            self.ttl.pop(name, None)
+
+    async def xadd(self, name, fields, id="*", maxlen=None, approximate=True):
+        entries = self.streams.setdefault(name, [])
+        if id == "*":
+            id = f"{parse_id(entries[-1][0])[0] + 1 if entries else 1}-0"
+        if entries and parse_id(id) <= parse_id(entries[-1][0]):
+            raise ValueError("The ID specified in XADD is equal or smaller than the target stream top item")
+        entries.append((id, dict(fields)))
+        if maxlen is not None:
+            del entries[:-maxlen]
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return id
+
+    async def xread(self, streams, count=None, block=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + block / 1000 if block else None
+        while True:
+            result = []
+            for name, last_id in streams.items():
+                entries = [e for e in self.streams.get(name, []) if parse_id(e[0]) > parse_id(last_id)]
+                if entries:
+                    result.append([name, entries[:count] if count else entries])
+            if result or deadline is None:
+                return result
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return []
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return []
+
+async def steps_tool(steps: int = 4):
+    for i in range(steps):
+        yield ProgressPayload(step=f"Step {i + 1}", pct=(i + 1) * 100 // steps, metadata={"i": i})
+    yield {"status": "complete"}
+
+async def waiting_tool(gate: asyncio.Event):
+    yield ProgressPayload(step="Waiting", pct=0)
+    await gate.wait()
+    yield {"status": "complete"}
+
+@pytest_asyncio.fixture
+async def instances():
+    client = FakeRedis()
+    owner, other = RedisRegistry(client, "owner"), RedisRegistry(client, "other")
+    yield client, owner, other
+    await owner.close()
+    await other.close()
+
+@pytest.mark.asyncio
+async def test_task_started_on_one_instance_streams_from_another(instances):
+    client, owner, other = instances
+    local = await owner.store_task("redis-stream", steps_tool(), "steps_tool")
+    local_events = [event async for event in local.events()]
+
+    record = await other.get_task("redis-stream")
+    assert isinstance(record.stream, RemoteTaskStream)
+    assert record.tool_name == "steps_tool"
+    remote_events = [event async for event in record.stream.events()]
+
+    assert [(e.seq, e.type, e.data) for e in remote_events] == [(e.seq, e.type, e.data) for e in local_events]
+    assert remote_events[0].payload.metadata == {"i": 0}
+    assert record.stream.status == "success"
+
+    # Finished tasks stay readable for a while, then Redis expires them
+    await asyncio.sleep(0.05)
+    assert client.ttl[metadata_key("redis-stream")] == REDIS_FINISHED_TTL
+    assert client.ttl[events_key("redis-stream")] == REDIS_FINISHED_TTL
+    assert client.hashes[metadata_key("redis-stream")]["status"] == "success"
+
+    resumed = record.stream.subscribe(since=3)
+    assert [e.seq for e in [event async for event in resumed]] == [4, 5]
+
+    await client.delete(metadata_key("redis-stream"), events_key("redis-stream"))
+    assert await other.get_task("redis-stream") is None
+
+@pytest.mark.asyncio
+async def test_remote_subscriber_follows_live_task_and_can_stop_it(instances):
+    client, owner, other = instances
+    gate = asyncio.Event()
+    local = await owner.store_task("redis-live", waiting_tool(gate), "waiting_tool")
+    assert client.ttl[metadata_key("redis-live")] == REDIS_TASK_TTL
+
+    record = await other.get_task("redis-live")
+    sub = record.stream.subscribe()
+    events = sub.__aiter__()
+    first = await asyncio.wait_for(events.__anext__(), timeout=1)
+    assert first.type == "progress"
+
+    # Consuming on another instance keeps the owner's stale cleanup away from the task
+    await asyncio.sleep(0.05)
+    assert owner._active_tasks["redis-live"].consumed is True
+    await owner.cleanup_stale_tasks(max_age_seconds=0)
+    assert "redis-live" in owner._active_tasks
+
+    # Leaving as a remote viewer does not stop the task
+    await main.release_subscription(record.stream, sub)
+    await events.aclose()
+    assert not local.finished
+
+    await other.remove_task("redis-live")
+    await asyncio.wait_for(local.task, timeout=1)
+    assert local.status == "cancelled"
+    assert "redis-live" not in owner._active_tasks
+
+    await asyncio.sleep(0.05)
+    assert (await other.get_task_no_consume("redis-live")).stream.status == "cancelled"
+
+@pytest.mark.asyncio
+async def test_sse_endpoint_serves_remote_task(instances, monkeypatch):
+    client, owner, other = instances
+    monkeypatch.setattr(main, "registry", other)
+    await owner.store_task("redis-sse", steps_tool(), "steps_tool")
+
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as http:
+        response = await http.get("/stream/redis-sse")
+        assert response.status_code == 200
+        events = [
+            (int(block.split("\n")[0][len("id: "):]), json.loads(block.split("\n")[1][len("data: "):]))
+            for block in response.text.strip().split("\n\n")
+        ]
+        assert [event_id for event_id, _ in events] == [1, 2, 3, 4, 5]
+        assert events[-1][1] == {"call_id": "redis-sse", "type": "result", "payload": {"status": "complete"}}
+
+        resumed = await http.get("/stream/redis-sse", headers={"Last-Event-ID": "4"})
+        assert resumed.text.startswith("id: 5\n")
+
+        assert (await http.get("/stream/missing")).status_code == 404
@@ -2,12 +2,14 @@ import concurrent.futures
 import sys
 import os
 import asyncio
+from collections import Counter
 import pytest
 
 # Add the project root to sys.path to import backend
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.app.bridge import ToolRegistry
+from backend.app.scheduler import AdmissionScheduler
 
 @pytest.mark.asyncio
 async def test_tasks_thread_safety():
@@ -26,7 +28,7 @@ async def test_tasks_thread_safety():
             gen = mock_async_gen()
             await registry.store_task(call_id, gen, "test_tool")
             task_data = await registry.get_task(call_id)
-            if task_data["gen"] != gen:
+            if task_data.gen != gen:
                 raise Exception(f"Task mismatch for {call_id}")
             
             # Since get_task marks as consumed but doesn't remove, 
@@ -66,3 +68,45 @@ async def test_registration_thread_safety():
     tasks = [worker(i) for i in range(num_concurrent)]
     await asyncio.gather(*tasks)
     print("Registration concurrency test passed!")
+
+@pytest.mark.asyncio
+async def test_concurrent_starts_and_removes_lose_no_tasks():
+    """
+    Thousands of starts and removes interleaved on the loop, without a registry-wide lock:
+    every surviving task is stored exactly once under its own call_id and runs exactly once.
+    """
+    registry = ToolRegistry()
+    registry.scheduler = AdmissionScheduler(max_concurrent=20_000)
+    num_tasks = 5_000
+    release = asyncio.Event()
+    runs = Counter()
+
+    async def wait(n: int):
+        runs[n] += 1
+        await release.wait()
+        yield {"n": n}
+
+    registry.register("wait")(wait)
+
+    async def start_and_maybe_remove(n: int):
+        stream = await registry.start_task(f"task-{n}", "wait", {"n": n})
+        await asyncio.sleep(0)
+        if n % 2 == 0:
+            await registry.remove_task(f"task-{n}")
+        return stream
+
+    streams = await asyncio.gather(*(start_and_maybe_remove(n) for n in range(num_tasks)))
+    survivors = {f"task-{n}" for n in range(1, num_tasks, 2)}
+    listed = [call_id for call_id, _ in registry.list_tasks()]
+    assert len(listed) == len(set(listed))
+    assert set(listed) == survivors
+    assert all(record.stream.call_id == call_id for call_id, record in registry.list_tasks())
+
+    release.set()
+    await asyncio.gather(*(stream.task for stream in streams), return_exceptions=True)
+    assert all(streams[n].status == "success" for n in range(1, num_tasks, 2))
+    assert all(streams[n].status == "cancelled" for n in range(0, num_tasks, 2))
+    # Removed tasks may have started before they were stopped; none ran twice
+    assert all(runs[n] == 1 for n in range(1, num_tasks, 2))
+    assert max(runs.values()) == 1
+    await registry.cleanup_tasks()
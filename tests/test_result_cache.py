@@ -0,0 +1,152 @@
+import asyncio
+import sys
+import os
+import pytest
+import httpx
+from httpx import ASGITransport
+from pydantic import ValidationError
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ToolRegistry, ProgressPayload
+from backend.app.cache import result_cache, ResultCache, canonical_args, args_model
+from backend.app.scheduler import AdmissionScheduler
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    result_cache.clear()
+    yield
+    result_cache.clear()
+
+def make_registry(**options):
+    registry = ToolRegistry()
+    registry.runs = 0
+
+    async def scan(target: str, depth: int = 1, options: dict = {}):
+        registry.runs += 1
+        yield ProgressPayload(step="Scanning", pct=50)
+        await asyncio.sleep(0.02)
+        if target == "broken":
+            raise ValueError("scan failed")
+        yield {"target": target, "depth": depth, "run": registry.runs}
+
+    registry.register("scan", **options)(scan)
+    return registry
+
+async def run(registry, call_id, **args):
+    stream = await registry.store_task(call_id, registry.get_tool("scan")(**args), "scan")
+    return [event async for event in stream.events()]
+
+def test_equivalent_arguments_share_a_key():
+    async def tool(a: int, b: str = "x", opts: dict = {}):
+        yield {}
+
+    model = args_model(tool)
+    key = canonical_args(model, {"a": 1, "opts": {"y": 1, "z": 2}})
+    assert canonical_args(model, {"opts": {"z": 2, "y": 1}, "a": "1", "b": "x"}) == key
+    assert canonical_args(model, {"a": 2, "opts": {"y": 1, "z": 2}}) != key
+    with pytest.raises(ValidationError):
+        canonical_args(model, {"a": "not a number"})
+
+@pytest.mark.asyncio
+async def test_hit_answers_from_the_cache():
+    registry = make_registry(cache_ttl=60)
+    first = await run(registry, "c1", target="db", depth=2)
+    assert [e.type for e in first] == ["progress", "result"]
+
+    second = await run(registry, "c2", depth="2", target="db")
+    assert registry.runs == 1
+    # Without cache_replay a hit delivers only the result
+    assert [e.type for e in second] == ["result"]
+    assert second[0].payload == first[-1].payload == {"target": "db", "depth": 2, "run": 1}
+    assert second[0].call_id == "c2"
+
+    await run(registry, "c3", target="web", depth=2)
+    assert registry.runs == 2
+
+@pytest.mark.asyncio
+async def test_hit_can_replay_progress_faster():
+    registry = make_registry(cache_ttl=60, cache_replay=100)
+    await run(registry, "r1", target="db")
+    replayed = await run(registry, "r2", target="db")
+    assert registry.runs == 1
+    assert [e.type for e in replayed] == ["progress", "result"]
+    assert replayed[0].payload.step == "Scanning"
+
+@pytest.mark.asyncio
+async def test_failed_and_cancelled_runs_are_not_cached():
+    registry = make_registry(cache_ttl=60)
+    events = await run(registry, "f1", target="broken")
+    assert events[-1].type == "error"
+    await run(registry, "f2", target="broken")
+    assert registry.runs == 2
+
+    stream = await registry.store_task("f3", registry.get_tool("scan")(target="db"), "scan")
+    await asyncio.sleep(0.01)
+    await registry.remove_task("f3")
+    await asyncio.wait_for(stream.task, timeout=1)
+    assert stream.status == "cancelled"
+    assert len(result_cache) == 0
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_are_bounded():
+    registry = make_registry(cache_ttl=0.05, cache_size=1)
+    await run(registry, "e1", target="a")
+    await run(registry, "e2", target="b")
+    # cache_size=1 evicted "a"
+    await run(registry, "e3", target="a")
+    assert registry.runs == 3
+    await run(registry, "e4", target="a")
+    assert registry.runs == 3
+
+    await asyncio.sleep(0.06)
+    await run(registry, "e5", target="a")
+    assert registry.runs == 4
+
+def test_memory_bound_evicts_least_recently_used():
+    cache = ResultCache(max_bytes=100)
+    cache.put("t", "a", [("result", b"x" * 40, 0.0)], ttl=60, max_entries=10)
+    cache.put("u", "b", [("result", b"x" * 40, 0.0)], ttl=60, max_entries=10)
+    assert cache.get("t", "a") is not None
+    cache.put("t", "c", [("result", b"x" * 40, 0.0)], ttl=60, max_entries=10)
+    # "b" was the least recently used across all tools
+    assert cache.get("u", "b") is None
+    assert cache.get("t", "a") is not None
+    assert cache.size == 80
+    cache.put("t", "huge", [("result", b"x" * 200, 0.0)], ttl=60, max_entries=10)
+    assert cache.get("t", "huge") is None
+
+@pytest.mark.asyncio
+async def test_hits_skip_the_admission_queue():
+    registry = make_registry(cache_ttl=60)
+    await run(registry, "q1", target="db")
+    registry.scheduler = AdmissionScheduler(max_concurrent=1)
+    gate = asyncio.Event()
+
+    async def blocker():
+        await gate.wait()
+        yield {"status": "done"}
+
+    busy = await registry.store_task("busy", blocker(), "blocker")
+    await asyncio.sleep(0.01)
+    events = await asyncio.wait_for(run(registry, "q2", target="db"), timeout=1)
+    assert events[-1].payload["run"] == 1
+    gate.set()
+    await busy.task
+
+@pytest.mark.asyncio
+async def test_start_task_reports_cache_hits(monkeypatch):
+    registry = make_registry(cache_ttl=60)
+    monkeypatch.setattr(main, "registry", registry)
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        first = (await client.post("/start_task/scan", json={"args": {"target": "db"}})).json()
+        assert first["cached"] is False
+        await client.get(first["stream_url"])
+
+        second = (await client.post("/start_task/scan", json={"args": {"target": "db"}})).json()
+        assert second["cached"] is True
+        response = await client.get(second["stream_url"])
+        assert '"type":"result"' in response.text
+        assert registry.runs == 1
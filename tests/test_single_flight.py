@@ -0,0 +1,139 @@
+import asyncio
+import sys
+import os
+import pytest
+import httpx
+from httpx import ASGITransport
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ToolRegistry, ProgressPayload, input_manager
+from backend.app.context import call_id_var
+
+def make_registry(**options):
+    registry = ToolRegistry()
+    registry.runs = 0
+    registry.gate = asyncio.Event()
+
+    async def crawl(url: str, depth: int = 1):
+        registry.runs += 1
+        yield ProgressPayload(step="Crawling", pct=10)
+        await registry.gate.wait()
+        yield {"url": url, "depth": depth}
+
+    registry.register("crawl", single_flight=True, **options)(crawl)
+    return registry
+
+@pytest.mark.asyncio
+async def test_identical_starts_share_one_run():
+    registry = make_registry()
+    first = await registry.start_task("a", "crawl", {"url": "x"})
+    await asyncio.sleep(0.01)
+    second = await registry.start_task("b", "crawl", {"depth": "1", "url": "x"})
+    other = await registry.start_task("c", "crawl", {"url": "y"})
+    assert second.run_call_id == "a"
+    assert other.run_call_id == "c"
+
+    collect = [asyncio.create_task(_collect(s)) for s in (first, second)]
+    await asyncio.sleep(0.01)
+    registry.gate.set()
+    first_events, second_events = await asyncio.wait_for(asyncio.gather(*collect), timeout=1)
+    assert registry.runs == 2
+
+    # Same events and seq numbers, each labelled with the requester's own call_id
+    assert [(e.seq, e.type) for e in first_events] == [(e.seq, e.type) for e in second_events]
+    assert all(e.call_id == "a" for e in first_events)
+    assert all(e.call_id == "b" and '"call_id":"b"' in e.data for e in second_events)
+    assert second_events[-1].payload == {"url": "x", "depth": 1}
+    assert second.status == "success"
+
+    # Finished runs are not joined
+    await asyncio.wait_for(other.task, timeout=1)
+    again = await registry.start_task("d", "crawl", {"url": "x"})
+    assert again.run_call_id == "d"
+    await registry.remove_task("d")
+
+async def _collect(stream):
+    return [event async for event in stream.events()]
+
+@pytest.mark.asyncio
+async def test_run_stops_only_when_the_last_requester_leaves():
+    registry = make_registry()
+    first = await registry.start_task("a", "crawl", {"url": "x"})
+    second = await registry.start_task("b", "crawl", {"url": "x"})
+    third = await registry.start_task("c", "crawl", {"url": "x"})
+    await asyncio.sleep(0.01)
+
+    # Stopping the requester that started the run leaves it going for the others
+    await registry.remove_task("a")
+    await asyncio.sleep(0.01)
+    assert first.status == "cancelled"
+    assert not second.task.done()
+
+    # A subscriber leaving detaches its requester too
+    sub = second.subscribe()
+    second.unsubscribe(sub)
+    assert second.status == "cancelled"
+    assert not third.task.done()
+
+    await registry.remove_task("c")
+    await asyncio.wait_for(third.task, timeout=1)
+    assert third.shared.status == "cancelled"
+    assert registry.runs == 1
+    assert not registry._in_flight
+
+@pytest.mark.asyncio
+async def test_start_does_not_join_a_run_being_cancelled():
+    registry = ToolRegistry()
+    gate = asyncio.Event()
+
+    async def slow_close(url: str):
+        try:
+            yield ProgressPayload(step="Crawling", pct=10)
+            await gate.wait()
+            yield {"url": url}
+        finally:
+            # Cleanup keeps the cancelled run around for a while
+            await asyncio.sleep(0.2)
+
+    registry.register("slow_close", single_flight=True)(slow_close)
+    first = await registry.start_task("a", "slow_close", {"url": "x"})
+    await asyncio.sleep(0.01)
+    await registry.remove_task("a")
+    await asyncio.sleep(0.05)
+    assert not first.shared.finished
+
+    second = await registry.start_task("b", "slow_close", {"url": "x"})
+    assert second.run_call_id == "b"
+    gate.set()
+    events = await asyncio.wait_for(_collect(second), timeout=1)
+    assert events[-1].payload == {"url": "x"}
+    assert second.status == "success"
+    await asyncio.wait_for(first.task, timeout=1)
+    assert first.shared.status == "cancelled"
+
+@pytest.mark.asyncio
+async def test_input_reaches_the_shared_run(monkeypatch):
+    registry = ToolRegistry()
+
+    async def confirm(item: str):
+        answer = await input_manager.wait_for_input(call_id_var.get(), "Proceed?")
+        yield {"item": item, "answer": answer}
+
+    registry.register("confirm", single_flight=True)(confirm)
+    monkeypatch.setattr(main, "registry", registry)
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        first = (await client.post("/start_task/confirm", json={"args": {"item": "x"}})).json()
+        second = (await client.post("/start_task/confirm", json={"args": {"item": "x"}})).json()
+        assert first["shared"] is False
+        assert second["shared"] is True
+        await asyncio.sleep(0.01)
+
+        response = await client.post("/provide_input", json={"call_id": second["call_id"], "value": "yes"})
+        assert response.status_code == 200
+        stream = (await registry.get_task(second["call_id"])).stream
+        events = await asyncio.wait_for(_collect(stream), timeout=1)
+        assert events[-1].payload == {"item": "x", "answer": "yes"}
+        assert events[-1].call_id == second["call_id"]
@@ -0,0 +1,93 @@
+import asyncio
+import sys
+import os
+import json
+import pytest
+import httpx
+from httpx import ASGITransport
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.main import app, release_subscription
+from backend.app.bridge import registry, ProgressPayload
+
+@registry.register(name="resume_tool")
+async def resume_tool(steps: int = 5):
+    for i in range(steps):
+        yield ProgressPayload(step=f"Step {i + 1}", pct=int((i + 1) / steps * 100))
+    yield {"status": "complete"}
+
+def parse_sse(text: str):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((int(fields["id"]), json.loads(fields["data"])))
+    return events
+
+@pytest.mark.asyncio
+async def test_sse_events_carry_ids_and_resume(monkeypatch):
+    monkeypatch.setattr(main, "SSE_RESUME_GRACE", 0.2)
+    async with httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        start_res = await client.post("/start_task/resume_tool", json={"args": {"steps": 5}})
+        call_id = start_res.json()["call_id"]
+
+        first = parse_sse((await client.get(f"/stream/{call_id}")).text)
+        assert [event_id for event_id, _ in first] == [1, 2, 3, 4, 5, 6]
+        assert first[-1][1]["type"] == "result"
+
+        # A client that dropped after event 2 gets only what it missed
+        resumed = parse_sse((await client.get(f"/stream/{call_id}", headers={"Last-Event-ID": "2"})).text)
+        assert [event_id for event_id, _ in resumed] == [3, 4, 5, 6]
+        assert resumed[0][1]["payload"]["step"] == "Step 3"
+
+        via_query = parse_sse((await client.get(f"/stream/{call_id}?since=5")).text)
+        assert [event_id for event_id, _ in via_query] == [6]
+
+        bad = await client.get(f"/stream/{call_id}", headers={"Last-Event-ID": "abc"})
+        assert bad.status_code == 400
+
+        # Once the grace period passes without subscribers, the task is gone
+        await asyncio.sleep(0.4)
+        assert (await client.get(f"/stream/{call_id}")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_disconnected_task_keeps_running_within_grace():
+    gate = asyncio.Event()
+
+    async def tool():
+        yield ProgressPayload(step="Waiting", pct=0)
+        await gate.wait()
+        yield {"status": "complete"}
+
+    stream = await registry.store_task("resume-grace", tool(), "tool")
+    sub = stream.subscribe()
+    await release_subscription(stream, sub, linger=0.2)
+
+    # Nobody is attached, but the task survives until the grace period expires
+    assert stream.subscriber_count == 0
+    await asyncio.sleep(0.05)
+    assert not stream.finished
+
+    resumed = stream.subscribe(since=1)
+    gate.set()
+    events = [event async for event in resumed]
+    assert [e.seq for e in events] == [2]
+    assert stream.status == "success"
+    await registry.remove_task("resume-grace")
+
+@pytest.mark.asyncio
+async def test_abandoned_task_cancelled_after_grace():
+    async def tool():
+        yield ProgressPayload(step="Working", pct=0)
+        await asyncio.sleep(10)
+        yield {"status": "never"}
+
+    stream = await registry.store_task("resume-abandoned", tool(), "tool")
+    sub = stream.subscribe()
+    await release_subscription(stream, sub, linger=0.05)
+
+    await asyncio.wait_for(stream.task, timeout=1)
+    assert stream.status == "cancelled"
+    assert await registry.get_task_no_consume("resume-abandoned") is None
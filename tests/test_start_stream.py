@@ -0,0 +1,57 @@
+import sys
+import os
+import json
+import pytest
+import httpx
+from httpx import ASGITransport
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.main import app
+from backend.app.bridge import registry, ProgressPayload
+
+@registry.register(name="quick_tool")
+async def quick_tool(steps: int = 3):
+    for i in range(steps):
+        yield ProgressPayload(step=f"Step {i + 1}", pct=int((i + 1) / steps * 100))
+    yield {"status": "complete"}
+
+def parse_sse(text: str):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((int(fields["id"]), json.loads(fields["data"])))
+    return events
+
+@pytest.mark.asyncio
+async def test_start_stream_opens_with_task_started():
+    async with httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/start_stream/quick_tool", json={"args": {"steps": 3}})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = parse_sse(response.text)
+        started_id, started = events[0]
+        assert started_id == 0
+        assert started["type"] == "task_started"
+        assert started["payload"] == {"tool_name": "quick_tool", "cached": False, "shared": False}
+        call_id = started["call_id"]
+
+        assert [event_id for event_id, _ in events[1:]] == [1, 2, 3, 4]
+        assert all(event["call_id"] == call_id for _, event in events)
+        assert events[-1][1] == {"call_id": call_id, "type": "result", "payload": {"status": "complete"}}
+
+        # The same task can still be resumed through the two-step endpoint
+        resumed = parse_sse((await client.get(f"/stream/{call_id}", headers={"Last-Event-ID": "3"})).text)
+        assert [event_id for event_id, _ in resumed] == [4]
+
+@pytest.mark.asyncio
+async def test_start_stream_rejects_before_streaming():
+    async with httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        missing = await client.post("/start_stream/no_such_tool", json={"args": {}})
+        assert missing.status_code == 404
+
+        invalid = await client.post("/start_stream/quick_tool", json={"args": {"steps": "many"}})
+        assert invalid.status_code == 400
+        assert not invalid.headers["content-type"].startswith("text/event-stream")
@@ -0,0 +1,122 @@
+import asyncio
+import sys
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.main import app
+from backend.app.bridge import ProgressPayload
+from backend.app.stream import TaskStream
+
+@pytest.mark.asyncio
+async def test_events_are_serialized_once_for_all_subscribers():
+    release = asyncio.Event()
+
+    async def tool():
+        await release.wait()
+        for i in range(3):
+            yield ProgressPayload(step="Item", pct=i)
+        yield {"status": "done"}
+
+    stream = TaskStream("fanout-shared", "tool", tool())
+    stream.start()
+    subs = [stream.subscribe() for _ in range(3)]
+    assert stream.subscriber_count == 3
+    release.set()
+
+    received = await asyncio.gather(*[
+        asyncio.wait_for(_collect(sub), timeout=1) for sub in subs
+    ])
+    assert all(len(events) == 4 for events in received)
+    for position in range(4):
+        # Every subscriber gets the very same encoded object, not a re-serialized copy
+        assert len({id(events[position].data) for events in received}) == 1
+    assert stream.subscriber_count == 0
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_does_not_block_others():
+    release = asyncio.Event()
+
+    async def tool():
+        await release.wait()
+        for i in range(50):
+            yield ProgressPayload(step="Item", pct=i)
+        yield {"status": "done"}
+
+    stream = TaskStream("fanout-slow", "tool", tool())
+    stream.start()
+    slow = stream.subscribe(maxsize=5)
+    fast = stream.subscribe()
+    release.set()
+
+    fast_events = await asyncio.wait_for(_collect(fast), timeout=1)
+    assert len(fast_events) == 51
+
+    # The slow subscriber never read anything, so it lost old progress but kept the result
+    slow_events = await asyncio.wait_for(_collect(slow), timeout=1)
+    assert len(slow_events) == 5
+    assert slow.dropped == 46
+    assert slow_events[-1].type == "result"
+
+@pytest.mark.asyncio
+async def test_last_subscriber_leaving_cancels_task():
+    async def tool():
+        yield ProgressPayload(step="Start", pct=0)
+        await asyncio.sleep(10)
+        yield {"status": "never"}
+
+    stream = TaskStream("fanout-cancel", "tool", tool())
+    stream.start()
+    first = stream.subscribe()
+    second = stream.subscribe()
+
+    stream.unsubscribe(first)
+    await asyncio.sleep(0.01)
+    assert not stream.finished
+
+    stream.unsubscribe(second)
+    await asyncio.wait_for(stream.task, timeout=1)
+    assert stream.status == "cancelled"
+
+def test_websocket_subscribe_to_running_task():
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as owner, client.websocket_connect("/ws") as viewer:
+        owner.send_json({
+            "type": "start",
+            "tool_name": "long_audit",
+            "args": {"duration": 1},
+            "request_id": "fanout_start"
+        })
+        data = owner.receive_json()
+        while data["type"] != "task_started":
+            data = owner.receive_json()
+        call_id = data["call_id"]
+
+        viewer.send_json({"type": "subscribe", "call_id": call_id, "request_id": "fanout_sub"})
+        data = viewer.receive_json()
+        assert data["type"] == "subscribe_success"
+        assert data["request_id"] == "fanout_sub"
+
+        results = []
+        for websocket in (owner, viewer):
+            for _ in range(20):
+                data = websocket.receive_json()
+                if data["type"] == "result":
+                    results.append(data["call_id"])
+                    break
+        assert results == [call_id, call_id]
+
+def test_websocket_subscribe_unknown_task():
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "subscribe", "call_id": "missing", "request_id": "sub_missing"})
+        data = websocket.receive_json()
+        assert data["type"] == "error"
+        assert data["request_id"] == "sub_missing"
+        assert "No active task found" in data["payload"]["detail"]
+
+async def _collect(sub):
+    return [event async for event in sub]
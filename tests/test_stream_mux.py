@@ -0,0 +1,164 @@
+import asyncio
+import sys
+import os
+import json
+import pytest
+import httpx
+from httpx import ASGITransport
+from starlette.requests import Request
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ToolRegistry, ProgressPayload
+from backend.app.mux import StreamMux, muxes
+
+def make_registry():
+    registry = ToolRegistry()
+    registry.gate = asyncio.Event()
+
+    async def job(label: str = ""):
+        yield ProgressPayload(step=label, pct=50)
+        await registry.gate.wait()
+        yield {"label": label}
+
+    registry.register("job")(job)
+    registry.register("other")(job)
+    return registry
+
+async def read(mux: StreamMux, count: int):
+    frames = mux.frames()
+    events = []
+    async for frame in frames:
+        events.append(json.loads(frame.split("data: ", 1)[1]))
+        if len(events) == count:
+            break
+    await frames.aclose()
+    return events
+
+@pytest.mark.asyncio
+async def test_mux_carries_many_tasks_and_follows_filters():
+    registry = make_registry()
+    await registry.start_task("a", "job", {"label": "a"})
+    await registry.start_task("b", "other", {"label": "b"})
+    await asyncio.sleep(0.01)
+
+    mux = StreamMux(tool_names=["job"])
+    mux.attach("b", await registry.get_task_no_consume("b"))
+    assert mux.follow(registry) == 1
+    # Tasks matching the filter are picked up as they start
+    await registry.start_task("c", "job", {"label": "c"})
+    await registry.start_task("d", "other", {"label": "d"})
+    await asyncio.sleep(0.01)
+    assert sorted(mux.call_ids) == ["a", "b", "c"]
+
+    registry.gate.set()
+    events = await asyncio.wait_for(read(mux, 1 + 3 * 3), timeout=1)
+    assert events[0]["type"] == "mux_started"
+    by_task = {}
+    for event in events[1:]:
+        by_task.setdefault(event["call_id"], []).append(event["type"])
+    assert by_task == {cid: ["progress", "result", "stream_end"] for cid in ("a", "b", "c")}
+    mux.close()
+    assert not registry._watchers
+
+@pytest.mark.asyncio
+async def test_watching_never_stops_a_task():
+    registry = make_registry()
+    stream = await registry.start_task("a", "job", {"label": "a"})
+    mux = StreamMux()
+    mux.attach("a", await registry.get_task_no_consume("a"))
+    await asyncio.sleep(0.01)
+    assert mux.detach("a")
+    await asyncio.sleep(0.01)
+    assert stream.subscriber_count == 0
+    assert stream.status == "running"
+
+    mux.attach("a", await registry.get_task_no_consume("a"))
+    await asyncio.sleep(0.01)
+    mux.close()
+    await asyncio.sleep(0.01)
+    assert stream.status == "running"
+    await registry.remove_task("a")
+
+@pytest.mark.asyncio
+async def test_owner_filter_and_mid_stream_updates(monkeypatch):
+    registry = make_registry()
+    monkeypatch.setattr(main, "registry", registry)
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        mine = (await client.post("/start_task/job", json={"args": {"label": "m"}}, headers={"X-API-Key": "k1"})).json()
+        theirs = (await client.post("/start_task/job", json={"args": {"label": "t"}}, headers={"X-API-Key": "k2"})).json()
+        assert (await registry.get_task_no_consume(mine["call_id"])).owner == "k1"
+
+        mux = StreamMux(owners={"k1"}, api_key="k1")
+        mux.follow(registry)
+        muxes[mux.mux_id] = mux
+        try:
+            assert mux.call_ids == [mine["call_id"]]
+
+            url = f"/stream_multi/{mux.mux_id}"
+            # Only the key that opened the stream may change it
+            denied = await client.post(url, json={"add": [theirs["call_id"]]}, headers={"X-API-Key": "k2"})
+            assert denied.status_code == 404
+
+            update = (await client.post(
+                url, json={"add": [theirs["call_id"], "missing"], "remove": [mine["call_id"]]}, headers={"X-API-Key": "k1"}
+            )).json()
+            assert update["added"] == [theirs["call_id"]]
+            assert update["removed"] == [mine["call_id"]]
+            assert update["not_found"] == ["missing"]
+            assert update["call_ids"] == [theirs["call_id"]]
+        finally:
+            muxes.pop(mux.mux_id, None)
+            mux.close()
+        await registry.cleanup_tasks()
+
+@pytest.mark.asyncio
+async def test_stream_multi_endpoint_streams_and_cleans_up(monkeypatch):
+    registry = make_registry()
+    monkeypatch.setattr(main, "registry", registry)
+    await registry.start_task("a", "job", {"label": "a"})
+    registry.gate.set()
+
+    request = Request({"type": "http", "method": "GET", "path": "/stream_multi", "headers": [], "query_string": b""})
+    response = await main.stream_multi(
+        request, call_id=["a", "missing"], tool_name=[], mine=False, coalesce=None, delta=False, authenticated=True
+    )
+    assert response.media_type == "text/event-stream"
+    frames = response.body_iterator
+    started = json.loads((await frames.__anext__()).split("data: ", 1)[1])
+    assert started["call_ids"] == ["a"]
+    assert started["mux_id"] in muxes
+    types = [json.loads((await frames.__anext__()).split("data: ", 1)[1])["type"] for _ in range(3)]
+    assert types == ["progress", "result", "stream_end"]
+    await frames.aclose()
+    assert started["mux_id"] not in muxes
+
+@pytest.mark.asyncio
+async def test_watched_task_survives_stale_sweep_and_is_dropped_when_done(monkeypatch):
+    registry = make_registry()
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(main, "SSE_RESUME_GRACE", 0.01)
+    stream = await registry.start_task("a", "job", {"label": "a"})
+    mux = StreamMux(release=main.release_watcher)
+    mux.attach("a", await registry.get_task_no_consume("a"))
+    await asyncio.sleep(0.01)
+
+    await registry.cleanup_stale_tasks(max_age_seconds=-1)
+    assert stream.status == "running"
+
+    # Frames carry no per-task ids, which would collide on the shared connection
+    frames = mux.frames()
+    await frames.__anext__()
+    assert (await frames.__anext__()).startswith("data: ")
+
+    # Nobody is attached once the viewer leaves; the record goes once the task has finished
+    mux.close()
+    await asyncio.sleep(0.02)
+    assert await registry.get_task_no_consume("a") is not None
+    registry.gate.set()
+    await asyncio.sleep(0.05)
+    assert stream.status == "success"
+    assert await registry.get_task_no_consume("a") is None
+    await frames.aclose()
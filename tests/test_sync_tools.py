@@ -0,0 +1,189 @@
+import asyncio
+import sys
+import os
+import threading
+import time
+import pytest
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.bridge import ToolRegistry, ProgressPayload
+from backend.app.context import call_id_var
+from backend.app import executors
+from backend.app.executors import cancellation_requested
+
+@pytest.mark.asyncio
+async def test_sync_generator_runs_on_a_thread_without_blocking_the_loop():
+    registry = ToolRegistry()
+
+    @registry.register("blocking_tool")
+    def blocking_tool(pause: float):
+        yield ProgressPayload(step="Reading", pct=50, metadata={"thread": threading.get_ident(), "call_id": call_id_var.get()})
+        time.sleep(pause)
+        yield {"status": "done"}
+
+    ticks = 0
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    stream = await registry.store_task("sync-basic", registry.get_tool("blocking_tool")(pause=0.3), "blocking_tool")
+    events = [event async for event in stream.events()]
+    ticking.cancel()
+
+    assert [e.type for e in events] == ["progress", "result"]
+    assert events[0].payload.metadata == {"thread": events[0].payload.metadata["thread"], "call_id": "sync-basic"}
+    assert events[0].payload.metadata["thread"] != threading.get_ident()
+    assert stream.status == "success"
+    # The loop kept running while the tool slept
+    assert ticks >= 10
+
+@pytest.mark.asyncio
+async def test_items_reach_the_loop_in_batches(monkeypatch):
+    registry = ToolRegistry()
+    wakes = 0
+    original_wake = executors._ThreadBridge._wake
+
+    def counting_wake(self):
+        nonlocal wakes
+        wakes += 1
+        original_wake(self)
+
+    monkeypatch.setattr(executors._ThreadBridge, "_wake", counting_wake)
+
+    @registry.register("chatty_tool")
+    def chatty_tool(count: int):
+        for i in range(count):
+            yield ProgressPayload(step="Line", pct=i * 100 // count)
+        yield {"lines": count}
+
+    stream = await registry.store_task("sync-batch", registry.get_tool("chatty_tool")(count=2000), "chatty_tool")
+    events = [event async for event in stream.events()]
+
+    assert len(events) == 2001
+    assert events[-1].payload == {"lines": 2000}
+    assert wakes < 2001 // 2
+
+@pytest.mark.asyncio
+async def test_max_threads_caps_concurrent_runs():
+    registry = ToolRegistry()
+    release = threading.Event()
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    @registry.register("capped_tool", max_threads=2)
+    def capped_tool():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        yield ProgressPayload(step="Holding", pct=0)
+        release.wait(5)
+        with lock:
+            running -= 1
+        yield {"status": "done"}
+
+    streams = [
+        await registry.store_task(f"sync-cap-{i}", registry.get_tool("capped_tool")(), "capped_tool")
+        for i in range(4)
+    ]
+    await asyncio.sleep(0.2)
+    assert running == 2
+
+    release.set()
+    await asyncio.wait_for(asyncio.gather(*(s.task for s in streams)), timeout=5)
+    assert peak == 2
+    assert all(s.status == "success" for s in streams)
+
+@pytest.mark.asyncio
+async def test_stop_closes_the_generator_on_its_thread():
+    registry = ToolRegistry()
+    polling = threading.Event()
+    closed = threading.Event()
+    saw_cancel = threading.Event()
+
+    @registry.register("endless_sync_tool")
+    def endless_sync_tool():
+        try:
+            while True:
+                yield ProgressPayload(step="Polling", pct=0)
+                polling.set()
+                for _ in range(50):
+                    if cancellation_requested():
+                        saw_cancel.set()
+                        return
+                    time.sleep(0.01)
+        finally:
+            closed.set()
+
+    stream = await registry.store_task("sync-stop", registry.get_tool("endless_sync_tool")(), "endless_sync_tool")
+    sub = stream.subscribe().__aiter__()
+    assert (await asyncio.wait_for(sub.__anext__(), timeout=1)).type == "progress"
+    # Stop while the tool is between yields, so it has to notice on its own
+    assert await asyncio.to_thread(polling.wait, 1)
+
+    await registry.remove_task("sync-stop")
+    await asyncio.wait_for(stream.task, timeout=1)
+    assert stream.status == "cancelled"
+    assert await asyncio.to_thread(closed.wait, 2)
+    assert saw_cancel.is_set()
+
+@pytest.mark.asyncio
+async def test_stop_while_queued_for_a_thread_never_starts_the_tool(monkeypatch):
+    monkeypatch.setattr(executors, "thread_executor", executors.ThreadExecutor(max_workers=1))
+    registry = ToolRegistry()
+    release = threading.Event()
+    trace = []
+
+    @registry.register("traced_tool")
+    def traced_tool(name: str):
+        trace.append(("start", name))
+        yield ProgressPayload(step="Holding", pct=0)
+        release.wait(5)
+        trace.append(("after-first-yield", name))
+        yield {"name": name}
+
+    first = await registry.store_task("sync-a", registry.get_tool("traced_tool")(name="A"), "traced_tool")
+    sub = first.subscribe().__aiter__()
+    assert (await asyncio.wait_for(sub.__anext__(), timeout=1)).type == "progress"
+    # The only thread is busy, so B waits in the pool's queue until it is stopped
+    queued = await registry.store_task("sync-b", registry.get_tool("traced_tool")(name="B"), "traced_tool")
+    await asyncio.sleep(0.05)
+    await registry.remove_task("sync-b")
+    await asyncio.wait_for(queued.task, timeout=1)
+
+    release.set()
+    await asyncio.wait_for(first.task, timeout=1)
+    # The pool's thread is free again; B would have run by now
+    assert await asyncio.to_thread(executors.thread_executor._ensure_started().submit(lambda: None).result, 1) is None
+    assert trace == [("start", "A"), ("after-first-yield", "A")]
+    assert queued.status == "cancelled"
+    executors.thread_executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_sync_tool_errors_become_error_events():
+    registry = ToolRegistry()
+
+    @registry.register("broken_sync_tool")
+    def broken_sync_tool():
+        yield ProgressPayload(step="Parsing", pct=10)
+        raise ValueError("bad file")
+
+    stream = await registry.store_task("sync-error", registry.get_tool("broken_sync_tool")(), "broken_sync_tool")
+    events = [event async for event in stream.events()]
+    assert [e.type for e in events] == ["progress", "error"]
+    assert events[-1].payload == {"detail": "bad file"}
+
+def test_thread_executor_requires_a_generator():
+    registry = ToolRegistry()
+
+    async def async_tool():
+        yield {"status": "done"}
+
+    with pytest.raises(TypeError):
+        registry.register("async_tool", executor="thread")(async_tool)
@@ -0,0 +1,94 @@
+import asyncio
+import sys
+import os
+import pytest
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.bridge import ToolRegistry, ProgressPayload
+from backend.app.stream import TaskStream
+
+@pytest.mark.asyncio
+async def test_producer_starts_at_store_time():
+    """
+    The tool should start running as soon as the task is stored, before any consumer attaches.
+    """
+    registry = ToolRegistry()
+    started = asyncio.Event()
+
+    async def tool():
+        started.set()
+        yield ProgressPayload(step="Working", pct=50)
+        yield {"status": "done"}
+
+    await registry.store_task("producer-start", tool(), "tool")
+    await asyncio.wait_for(started.wait(), timeout=1)
+
+    task_data = await registry.get_task("producer-start")
+    events = [event async for event in task_data.stream.events()]
+    assert [e.type for e in events] == ["progress", "result"]
+    assert task_data.stream.status == "success"
+    await registry.remove_task("producer-start")
+
+@pytest.mark.asyncio
+async def test_producer_runs_ahead_of_slow_reader():
+    """
+    A reader that has not consumed anything yet should not hold the tool back while the buffer has room.
+    """
+    async def tool():
+        for i in range(50):
+            yield ProgressPayload(step="Item", pct=i)
+        yield {"status": "done"}
+
+    stream = TaskStream("producer-ahead", "tool", tool())
+    await asyncio.wait_for(stream.start(), timeout=1)
+    assert stream.finished
+
+    events = [event async for event in stream.events()]
+    assert len(events) == 51
+    assert events[-1].type == "result"
+
+@pytest.mark.asyncio
+async def test_backlog_is_bounded():
+    """
+    Only the most recent events are retained for subscribers that attach after the fact.
+    """
+    async def tool():
+        for i in range(10):
+            yield ProgressPayload(step="Item", pct=i)
+        yield {"status": "done"}
+
+    stream = TaskStream("producer-bounded", "tool", tool(), buffer_size=3)
+    await asyncio.wait_for(stream.start(), timeout=1)
+
+    events = [event async for event in stream.events()]
+    assert len(events) == 3
+    assert [e.payload.pct for e in events[:2]] == [8, 9]
+    assert events[-1].type == "result"
+
+@pytest.mark.asyncio
+async def test_producer_error_and_cancel():
+    async def failing_tool():
+        yield ProgressPayload(step="Start", pct=0)
+        raise ValueError("boom")
+
+    stream = TaskStream("producer-error", "tool", failing_tool())
+    stream.start()
+    events = [event async for event in stream.events()]
+    assert events[-1].type == "error"
+    assert events[-1].payload["detail"] == "boom"
+    assert stream.status == "error"
+
+    async def slow_tool():
+        yield ProgressPayload(step="Start", pct=0)
+        await asyncio.sleep(10)
+        yield {"status": "never"}
+
+    stream = TaskStream("producer-cancel", "tool", slow_tool())
+    stream.start()
+    await asyncio.sleep(0.05)
+    await stream.stop()
+    events = [event async for event in stream.events()]
+    assert [e.type for e in events] == ["progress"]
+    assert stream.status == "cancelled"
@@ -8,6 +8,7 @@ import pytest
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.app.bridge import ToolRegistry
+from backend.app.scheduler import AdmissionScheduler
 
 @pytest.mark.asyncio
 async def test_timeout_cleanup():
@@ -55,12 +56,63 @@ async def test_get_task_pops():
     assert call_id in active_tasks
     
     task_data = await registry.get_task(call_id)
-    assert task_data["gen"] == gen
+    assert task_data.gen == gen
     
     # get_task marks it as consumed, but doesn't remove it from _active_tasks immediately.
     # removal happens in remove_task which is called by the stream finally block.
     assert call_id in active_tasks
-    assert active_tasks[call_id]["consumed"] is True
+    assert active_tasks[call_id].consumed is True
     
-    # Second call should return None
-    assert await registry.get_task(call_id) is None
\ No newline at end of file
+    # A second subscriber may attach to the same task
+    assert await registry.get_task(call_id) is task_data
+
+@pytest.mark.asyncio
+async def test_stale_cleanup_only_visits_due_tasks():
+    registry = ToolRegistry()
+    # All 10k tasks are admitted, so the sweep isn't competing with queue position updates
+    registry.scheduler = AdmissionScheduler(max_concurrent=20_000)
+    release = asyncio.Event()
+
+    async def idle_gen():
+        await release.wait()
+        yield {"status": "done"}
+
+    await registry.store_task("due-unconsumed", idle_gen(), "mock_tool")
+    await registry.store_task("due-consumed", idle_gen(), "mock_tool")
+    await registry.get_task("due-consumed")
+    await registry.store_task("due-removed", idle_gen(), "mock_tool")
+    await registry.remove_task("due-removed")
+    # The sleeps only separate creation times around the cutoff; nothing below is timed
+    await asyncio.sleep(0.05)
+    boundary = time.time()
+    await asyncio.sleep(0.05)
+    for i in range(10_000):
+        await registry.store_task(f"fresh-{i}", idle_gen(), "mock_tool")
+
+    removed = []
+    remove_task = registry.remove_task
+
+    async def recording_remove_task(call_id):
+        removed.append(call_id)
+        await remove_task(call_id)
+
+    registry.remove_task = recording_remove_task
+    assert len(registry._expiry) == 10_003
+    # Everything created before the boundary is due
+    await registry.cleanup_stale_tasks(max_age_seconds=time.time() - boundary)
+
+    # The sweep visited the three due entries and stopped only the unconsumed one;
+    # the 10k fresh tasks never left the index
+    assert len(registry._expiry) == 10_000
+    assert removed == ["due-unconsumed"]
+    assert await registry.get_task_no_consume("due-unconsumed") is None
+    assert await registry.get_task_no_consume("due-consumed") is not None
+    assert len(registry._active_tasks) == 10_001
+
+    # A sweep with nothing due visits nothing
+    await registry.cleanup_stale_tasks(max_age_seconds=60)
+    assert len(registry._expiry) == 10_000
+    assert removed == ["due-unconsumed"]
+
+    release.set()
+    await registry.cleanup_tasks()
@@ -0,0 +1,109 @@
+import sys
+import os
+import pytest
+import httpx
+from httpx import ASGITransport
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, ValidationError
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app import main
+from backend.app.bridge import ToolRegistry
+from backend.app.validation import args_model, validate_args
+
+class Target(BaseModel):
+    host: str
+    port: int = 443
+
+async def probe(target: Target, retries: int = 1, tags: list = []):
+    """Probes a target."""
+    yield {"target": target, "retries": retries, "tags": tags}
+
+def test_validate_args_coerces_and_rejects():
+    model = args_model(probe)
+    values, key = validate_args(model, {"target": {"host": "a"}, "retries": "3"})
+    assert values == {"target": Target(host="a"), "retries": 3, "tags": []}
+    assert key == validate_args(model, {"retries": 3, "target": {"port": 443, "host": "a"}})[1]
+    with pytest.raises(ValidationError):
+        validate_args(model, {"target": {"host": "a"}, "retries": "many"})
+    with pytest.raises(ValidationError):
+        validate_args(model, {"target": {"host": "a"}, "unexpected": 1})
+
+@pytest.mark.asyncio
+async def test_keyed_tools_validate_once(monkeypatch):
+    registry = ToolRegistry()
+    registry.register("plain")(probe)
+    registry.register("cached", cache_ttl=60)(probe)
+    registry.register("shared", single_flight=True)(probe)
+    calls = []
+    validate = BaseModel.model_validate.__func__
+    for name in ("cached", "shared"):
+        model = registry._arg_models[name]
+        monkeypatch.setattr(model, "model_validate", classmethod(lambda cls, obj, **kw: calls.append(obj) or validate(cls, obj, **kw)))
+
+    # Other tools are called through validate_call
+    gen = registry.get_tool("plain")(target={"host": "a"}, retries="3")
+    assert gen.ag_frame.f_locals["retries"] == 3
+    with pytest.raises(ValidationError):
+        registry.get_tool("plain")(target={"host": "a"}, unexpected=1)
+
+    for name in ("cached", "shared"):
+        stream = await registry.start_task(f"{name}-1", name, {"target": {"host": "a"}, "retries": "3"})
+        events = [event async for event in stream.events()]
+        assert events[-1].payload["retries"] == 3
+        with pytest.raises(ValidationError):
+            await registry.start_task(f"{name}-2", name, {"target": {"host": "a"}, "unexpected": 1})
+    assert len(calls) == 4
+    await registry.cleanup_tasks()
+
+@pytest.mark.asyncio
+async def test_schema_endpoint_serves_etag(monkeypatch):
+    registry = ToolRegistry()
+    registry.register("probe")(probe)
+    monkeypatch.setattr(main, "registry", registry)
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as client:
+        response = await client.get("/tools/schema")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        [tool] = response.json()["tools"]
+        assert tool["name"] == "probe"
+        assert tool["description"] == "Probes a target."
+        assert tool["parameters"]["required"] == ["target"]
+        assert tool["parameters"]["properties"]["retries"] == {"default": 1, "title": "Retries", "type": "integer"}
+        assert tool["parameters"]["additionalProperties"] is False
+
+        cached = await client.get("/tools/schema", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        # Weak comparison and the wildcard, as for any If-None-Match
+        for header in (f'"other", W/{etag}', "*"):
+            assert (await client.get("/tools/schema", headers={"If-None-Match": header})).status_code == 304
+        assert (await client.get("/tools/schema", headers={"If-None-Match": 'W/"other"'})).status_code == 200
+        assert registry.tool_schemas()[1] is registry.tool_schemas()[1]
+
+        # A new registration changes the document and its ETag
+        async def other(x: int):
+            yield {}
+        registry.register("other")(other)
+        changed = await client.get("/tools/schema", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert [t["name"] for t in changed.json()["tools"]] == ["probe", "other"]
+
+def test_ws_list_tools_with_schemas():
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_json({"type": "list_tools", "schema": True, "request_id": "l1"})
+            listed = ws.receive_json()
+            assert {t["name"] for t in listed["schemas"]} == set(listed["tools"])
+            assert listed["etag"]
+
+            ws.send_json({"type": "list_tools", "schema": True, "etag": listed["etag"], "request_id": "l2"})
+            again = ws.receive_json()
+            assert again["not_modified"] is True
+            assert "schemas" not in again
+
+            ws.send_json({"type": "list_tools", "request_id": "l3"})
+            assert "etag" not in ws.receive_json()
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+import os
+import tempfile
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.bridge import ToolRegistry, ProgressPayload, input_manager
+from backend.app.broker import MemoryBroker, SocketBroker, BrokerServer
+from backend.app.context import call_id_var
+from backend.app.executors import worker_executor, WORKER_QUEUE
+from backend.app.worker import Worker
+
+@pytest.mark.asyncio
+async def test_memory_broker_hands_each_message_to_one_getter():
+    broker = MemoryBroker()
+    await broker.put("q", {"n": 1})
+    await broker.put("q", {"n": 0}, front=True)
+    assert [await broker.get("q"), await broker.get("q")] == [{"n": 0}, {"n": 1}]
+
+    first = asyncio.create_task(broker.get("q"))
+    second = asyncio.create_task(broker.get("q"))
+    await asyncio.sleep(0)
+    await broker.put("q", {"n": 2})
+    # The first getter gives up after being handed the message: it goes to the next getter
+    first.cancel()
+    assert await asyncio.wait_for(second, timeout=1) == {"n": 2}
+    assert broker.pending("q") == 0
+
+@pytest_asyncio.fixture
+async def tier(monkeypatch):
+    # API and worker talk through a broker server on a unix socket, as separate processes would
+    with tempfile.TemporaryDirectory(prefix="adk") as directory:
+        url = f"unix://{directory}/broker.sock"
+        server = BrokerServer(url)
+        await server.start()
+        monkeypatch.setattr(worker_executor, "broker", SocketBroker(url))
+        worker_broker = SocketBroker(url)
+        worker = Worker(worker_broker, concurrency=2)
+        worker.start()
+
+        registry = ToolRegistry()
+        registry.stopped = asyncio.Event()
+
+        async def remote_job(n: int, fail: bool = False):
+            yield ProgressPayload(step="Working", pct=10)
+            if fail:
+                raise RuntimeError("remote failure")
+            if n < 0:
+                try:
+                    await asyncio.sleep(10)
+                finally:
+                    registry.stopped.set()
+            yield {"type": "input_request", "payload": {"prompt": "Scale?"}}
+            scale = await input_manager.wait_for_input(call_id_var.get(), "Scale?")
+            yield {"n": n * scale}
+
+        def sync_job(n: int):
+            yield ProgressPayload(step="Sync", pct=50)
+            yield {"n": n}
+
+        registry.register("remote_job", executor="worker")(remote_job)
+        registry.register("sync_job", executor="worker")(sync_job)
+        yield registry, server
+        await registry.cleanup_tasks()
+        await worker.stop()
+        await worker_broker.close()
+        await worker_executor.broker.close()
+        await server.close()
+
+@pytest.mark.asyncio
+async def test_worker_runs_tool_and_forwards_input(tier):
+    registry, server = tier
+    stream = await registry.start_task("w1", "remote_job", {"n": 3})
+    seen = []
+    async for event in stream.events():
+        seen.append(event.type)
+        if event.type == "progress":
+            assert event.payload == ProgressPayload(step="Working", pct=10)
+        elif event.type == "input_request":
+            assert event.call_id == "w1"
+            # Forwarded to the worker, which shares this process's input_manager only in tests
+            assert await worker_executor.provide_input("w1", 2)
+            assert not await worker_executor.provide_input("w1", 2)
+        elif event.type == "result":
+            assert event.payload == {"n": 6}
+    assert seen == ["progress", "input_request", "result"]
+    assert stream.status == "success"
+
+    stream = await registry.start_task("w2", "sync_job", {"n": 5})
+    assert [event.payload for event in [e async for e in stream.events()]][-1] == {"n": 5}
+
+@pytest.mark.asyncio
+async def test_worker_errors_validation_and_stop(tier):
+    registry, server = tier
+    with pytest.raises(ValidationError):
+        await registry.start_task("bad", "remote_job", {"n": "many"})
+    assert server.broker.pending(WORKER_QUEUE) == 0
+
+    stream = await registry.start_task("w3", "remote_job", {"n": 1, "fail": True})
+    events = [event async for event in stream.events()]
+    assert events[-1].type == "error"
+    assert "remote failure" in events[-1].payload["detail"]
+
+    stream = await registry.start_task("w4", "remote_job", {"n": -1})
+    sub = stream.subscribe()
+    assert (await asyncio.wait_for(anext(aiter(sub)), timeout=1)).type == "progress"
+    await registry.remove_task("w4")
+    # The stop reaches the tool on the worker
+    await asyncio.wait_for(registry.stopped.wait(), timeout=1)
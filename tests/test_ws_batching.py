@@ -0,0 +1,105 @@
+import asyncio
+import sys
+import os
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.main import app
+from backend.app.bridge import registry, ProgressPayload
+from backend.app.ws_writer import WebSocketWriter
+
+@registry.register(name="burst_tool")
+async def burst_tool(items: int = 50):
+    for i in range(items):
+        yield ProgressPayload(step="Item", pct=i * 100 // items)
+    yield {"status": "complete", "items": items}
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data: str):
+        self.sent.append(json.loads(data))
+
+def receive_until_result(websocket):
+    """Collects frames until the task result arrives, unpacking batches."""
+    frames, events = [], []
+    while not events or events[-1].get("type") != "result":
+        frame = websocket.receive_json()
+        frames.append(frame)
+        events.extend(frame["events"] if frame["type"] == "batch" else [frame])
+    return frames, events
+
+@pytest.mark.asyncio
+async def test_writer_packs_ready_frames_within_limits():
+    ws = RecordingWebSocket()
+    writer = WebSocketWriter(ws, maxsize=100)
+    writer.enable_batching(window=0.05, max_events=4)
+    writer.start()
+
+    for i in range(10):
+        await writer.send_json({"type": "progress", "n": i})
+    await asyncio.sleep(0.2)
+
+    assert [len(frame["events"]) for frame in ws.sent] == [4, 4, 2]
+    assert [e["n"] for frame in ws.sent for e in frame["events"]] == list(range(10))
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_writer_batch_respects_byte_limit_and_sends_lone_frames_unwrapped():
+    ws = RecordingWebSocket()
+    writer = WebSocketWriter(ws, maxsize=100)
+    # Each frame is 37 bytes, so two fit in a batch
+    writer.enable_batching(window=0.01, max_bytes=80)
+    writer.start()
+
+    for i in range(3):
+        await writer.send_json({"type": "progress", "pad": "x" * 10})
+    await asyncio.sleep(0.1)
+    await writer.send_json({"type": "pong"})
+    await asyncio.sleep(0.1)
+
+    assert [frame["type"] for frame in ws.sent] == ["batch", "progress", "pong"]
+    assert len(ws.sent[0]["events"]) == 2
+    await writer.close()
+
+def test_hello_negotiates_batching():
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({
+            "type": "hello",
+            "capabilities": ["batch", "telepathy"],
+            "batch": {"window": 0.05, "max_events": 20},
+            "request_id": "hello_1"
+        })
+        data = websocket.receive_json()
+        assert data["type"] == "hello_success"
+        assert data["request_id"] == "hello_1"
+        assert data["capabilities"] == {"batch": {"window": 0.05, "max_events": 20, "max_bytes": 64 * 1024}}
+
+        websocket.send_json({"type": "start", "tool_name": "burst_tool", "args": {"items": 50}, "request_id": "burst"})
+        frames, events = receive_until_result(websocket)
+
+    assert any(frame["type"] == "batch" for frame in frames)
+    assert len(frames) < len(events)
+    assert all(len(frame["events"]) <= 20 for frame in frames if frame["type"] == "batch")
+    assert events[0]["type"] == "task_started"
+    assert [e["payload"]["pct"] for e in events if e["type"] == "progress"] == [i * 2 for i in range(50)]
+
+def test_batching_via_connect_param_and_default_is_unbatched():
+    client = TestClient(app)
+    with client.websocket_connect("/ws?batch=1") as websocket:
+        websocket.send_json({"type": "start", "tool_name": "burst_tool", "args": {"items": 30}, "request_id": "burst"})
+        frames, events = receive_until_result(websocket)
+        assert any(frame["type"] == "batch" for frame in frames)
+        assert len(events) == 32
+
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "start", "tool_name": "burst_tool", "args": {"items": 30}, "request_id": "burst"})
+        frames, events = receive_until_result(websocket)
+        assert frames == events
+        assert len(frames) == 32
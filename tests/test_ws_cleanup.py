@@ -40,7 +40,7 @@ async def test_websocket_marks_consumed():
         # 3. Check registry state directly
         task_data = await registry.get_task_no_consume(call_id)
         assert task_data is not None
-        assert task_data["consumed"] is True, "WebSocket task should be marked as consumed immediately"
+        assert task_data.consumed is True, "WebSocket task should be marked as consumed immediately"
 
 @pytest.mark.asyncio
 async def test_websocket_not_reaped_by_cleanup():
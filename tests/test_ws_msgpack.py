@@ -0,0 +1,74 @@
+import asyncio
+import sys
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+msgpack = pytest.importorskip("msgpack")
+
+from backend.app.main import app
+from backend.app.bridge import registry, ProgressEvent, ProgressPayload
+from backend.app.stream import EventEncoder
+from backend.app.wire import MsgpackCodec, JsonCodec, negotiate_codec
+
+@registry.register(name="msgpack_tool")
+async def msgpack_tool(items: int = 3):
+    for i in range(items):
+        yield ProgressPayload(step="Item", pct=i * 100 // items, metadata={"i": i})
+    yield {"status": "complete", "items": items}
+
+def test_msgpack_subprotocol_round_trip():
+    client = TestClient(app)
+    with client.websocket_connect("/ws", subprotocols=["adk.msgpack", "adk.json"]) as websocket:
+        assert websocket.accepted_subprotocol == "adk.msgpack"
+        websocket.send_bytes(msgpack.packb({"type": "start", "tool_name": "msgpack_tool", "args": {"items": 3}, "request_id": "mp"}))
+
+        started = msgpack.unpackb(websocket.receive_bytes())
+        assert started["type"] == "task_started"
+        assert started["request_id"] == "mp"
+
+        events = []
+        while not events or events[-1]["type"] != "result":
+            events.append(msgpack.unpackb(websocket.receive_bytes()))
+        assert [e["payload"]["metadata"]["i"] for e in events[:-1]] == [0, 1, 2]
+        assert events[0] == {
+            "call_id": started["call_id"],
+            "type": "progress",
+            "payload": {"step": "Item", "pct": 0, "log": None, "metadata": {"i": 0}}
+        }
+        assert events[-1]["payload"] == {"status": "complete", "items": 3}
+
+        websocket.send_bytes(b"\xc1")
+        error = msgpack.unpackb(websocket.receive_bytes())
+        assert error["payload"]["detail"] == "Invalid MessagePack received"
+
+def test_json_stays_default():
+    client = TestClient(app)
+    with client.websocket_connect("/ws", subprotocols=["adk.json"]) as websocket:
+        assert websocket.accepted_subprotocol == "adk.json"
+        websocket.send_json({"type": "ping"})
+        assert websocket.receive_json() == {"type": "pong"}
+
+    with client.websocket_connect("/ws", subprotocols=["something.else"]) as websocket:
+        assert websocket.accepted_subprotocol is None
+        websocket.send_json({"type": "ping"})
+        assert websocket.receive_json() == {"type": "pong"}
+
+def test_msgpack_event_is_packed_once_and_batches_splice():
+    codec = MsgpackCodec()
+    event = EventEncoder("call").encode(1, "progress", ProgressPayload(step="Item", pct=5))
+    first = codec.encode_event(event)
+    assert codec.encode_event(event) is first
+    assert msgpack.unpackb(first) == ProgressEvent(call_id="call", type="progress", payload=ProgressPayload(step="Item", pct=5)).model_dump()
+
+    for count in (2, 15, 16, 300):
+        frames = [codec.encode({"n": i}) for i in range(count)]
+        assert msgpack.unpackb(codec.batch(frames)) == {"type": "batch", "events": [{"n": i} for i in range(count)]}
+
+def test_negotiation_prefers_msgpack_only_when_offered():
+    assert isinstance(negotiate_codec(["adk.msgpack"]), MsgpackCodec)
+    assert isinstance(negotiate_codec(["adk.json"]), JsonCodec)
+    assert isinstance(negotiate_codec([]), JsonCodec)
@@ -8,7 +8,7 @@ from backend.app.main import app
 @pytest.mark.asyncio
 async def test_ws_concurrency_stress():
     """
-    Stress test to ensure the WebSocket send_lock handles many concurrent tasks sending messages.
+    Stress test to ensure many concurrent task subscriptions can feed a single connection's sender.
     """
     from fastapi.testclient import TestClient
     from backend.app.main import app
@@ -23,6 +23,7 @@ async def test_ws_concurrency_stress():
     
     from backend.app.main import run_ws_generator
     from backend.app.bridge import ProgressPayload
+    from backend.app.stream import TaskStream
     
     mock_messages = []
     async def mock_send(data):
@@ -39,7 +40,9 @@ async def test_ws_concurrency_stress():
     active_tasks = {}
     for i in range(10):
         call_id = str(uuid.uuid4())
-        tasks.append(run_ws_generator(mock_send, call_id, "fast_tool", fast_tool(), active_tasks))
+        stream = TaskStream(call_id, "fast_tool", fast_tool())
+        stream.start()
+        tasks.append(run_ws_generator(mock_send, call_id, "fast_tool", stream, active_tasks))
 
     await asyncio.gather(*tasks)
     
@@ -0,0 +1,116 @@
+import asyncio
+import sys
+import os
+import json
+import pytest
+
+# Add the project root to sys.path to import backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.ws_writer import WebSocketWriter, WebSocketClosed
+from backend.app.stream import EncodedEvent
+from backend.app.bridge import ProgressEvent, ProgressPayload
+
+class SlowWebSocket:
+    """Records frames and only sends while the gate is open."""
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.closed_with = None
+
+    async def send_text(self, data: str):
+        await self.gate.wait()
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.closed_with = code
+
+def progress(seq: int) -> EncodedEvent:
+    return EncodedEvent.from_event(seq, ProgressEvent(
+        call_id="writer", type="progress", payload=ProgressPayload(step="Item", pct=seq)
+    ))
+
+@pytest.mark.asyncio
+async def test_writer_preserves_order():
+    ws = SlowWebSocket()
+    ws.gate.set()
+    writer = WebSocketWriter(ws, maxsize=10)
+    writer.start()
+
+    await writer.send_json({"type": "task_started"})
+    for seq in range(1, 4):
+        await writer.send_event(progress(seq))
+    await writer.send_json({"type": "stop_success"})
+    while writer.depth:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+
+    assert [m["type"] for m in ws.sent] == ["task_started", "progress", "progress", "progress", "stop_success"]
+    assert [m["payload"]["pct"] for m in ws.sent[1:4]] == [1, 2, 3]
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_block_policy_waits_for_room():
+    ws = SlowWebSocket()
+    writer = WebSocketWriter(ws, maxsize=2, policy="block")
+    writer.start()
+
+    await writer.send_event(progress(1))
+    await asyncio.sleep(0)  # frame 1 is now in flight
+    for seq in range(2, 4):
+        await writer.send_event(progress(seq))
+    # The queue is now full behind the in-flight frame
+    blocked = asyncio.create_task(writer.send_event(progress(4)))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    ws.gate.set()
+    await asyncio.wait_for(blocked, timeout=1)
+    while writer.depth:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+    assert [m["payload"]["pct"] for m in ws.sent] == [1, 2, 3, 4]
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_drop_progress_policy_keeps_control_frames():
+    ws = SlowWebSocket()
+    writer = WebSocketWriter(ws, maxsize=3, policy="drop_progress")
+    writer.start()
+
+    await writer.send_event(progress(1))
+    await asyncio.sleep(0)  # frame 1 is now in flight
+    await writer.send_json({"type": "task_started"})
+    for seq in range(2, 10):
+        await writer.send_event(progress(seq))
+    assert writer.depth == 3
+    assert writer.dropped == 6
+
+    ws.gate.set()
+    while writer.depth:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+    assert ws.sent[1] == {"type": "task_started"}
+    assert [m["payload"]["pct"] for m in ws.sent if m["type"] == "progress"] == [1, 8, 9]
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_consumer():
+    ws = SlowWebSocket()
+    writer = WebSocketWriter(ws, maxsize=2, policy="disconnect")
+    writer.start()
+
+    await writer.send_event(progress(1))
+    await asyncio.sleep(0)  # frame 1 is now in flight
+    for seq in range(2, 4):
+        await writer.send_event(progress(seq))
+    with pytest.raises(WebSocketClosed):
+        await writer.send_event(progress(4))
+    assert writer.closed
+    assert ws.closed_with == 1008
+    assert writer.depth == 0
+    await writer.close()
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        WebSocketWriter(SlowWebSocket(), policy="spill")